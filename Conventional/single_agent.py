@@ -11,14 +11,23 @@ This serves as the baseline for comparison with multi-agent approaches.
 """
 
 import os
+import re
 import json
 import subprocess
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import tool
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Local project generator (same logic as Top-Down approach), imported once at startup
+from project_generator import generate_projects as _generate_projects
 
 # Load environment variables
 load_dotenv()
@@ -37,6 +46,31 @@ if not os.getenv("GROQ_API_KEY"):
     print("="*70)
     raise ValueError("GROQ_API_KEY environment variable is required")
 
+
+def json_loads(data):
+    """Parse JSON text, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_compact(data: Any) -> str:
+    """Serialize data to compact JSON for embedding in prompts."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"))
+
+
+def write_json(filepath: str, data: Any):
+    """Write data as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
 # Metrics tracking
 class MetricsTracker:
     """Track metrics for comparison with other approaches."""
@@ -121,9 +155,7 @@ class MetricsTracker:
     
     def save(self, filepath: str):
         """Save metrics to JSON file."""
-        metrics = self.get_metrics()
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(metrics, f, indent=2)
+        write_json(filepath, self.get_metrics())
     
     def print_summary(self):
         """Print a summary matching paper format."""
@@ -174,6 +206,17 @@ logs_dir = "logs"
 os.makedirs(logs_dir, exist_ok=True)
 
 
+# Serializes appends to generated route files so the header is written exactly once
+_routes_file_lock = threading.Lock()
+
+# Number of recent messages (after the system prompt) resent on each requirements turn
+MAX_HISTORY_MESSAGES = 10
+
+# Locates the opening brace of the finalized requirements object in an agent reply
+_REQ_JSON_RE = re.compile(r'\{[^{}]*"detailed_description"\s*:')
+_json_decoder = json.JSONDecoder()
+
+
 def log_and_print(message: str, log_file: str):
     """Helper to print and log simultaneously."""
     print(message)
@@ -181,6 +224,18 @@ def log_and_print(message: str, log_file: str):
         f.write(message + '\n')
 
 
+def extract_fenced(text: str) -> str:
+    """Return the body of the first ``` fenced block (language tag dropped), or text unchanged."""
+    start = text.find("```")
+    if start < 0:
+        return text
+    body_start = text.find("\n", start)
+    if body_start < 0:
+        return text
+    end = text.find("```", body_start)
+    return text[body_start + 1:end] if end > 0 else text[body_start + 1:]
+
+
 def invoke_with_metrics(agent, messages, log_file: str = None, is_coding: bool = False):
     """Invoke agent and track token usage in metrics."""
     if agent is None:
@@ -215,6 +270,115 @@ def invoke_with_metrics(agent, messages, log_file: str = None, is_coding: bool =
     return response
 
 
+# Prompt templates: static text is built once, only the fields are filled per call
+_DESIGN_PROMPT_TMPL = """Design a complete software application based on these requirements.
+
+Application Description: {description}
+
+Features: {features_json}
+
+Design the complete application including:
+1. All frontend pages/screens needed
+2. UI requirements for each page
+3. All backend API endpoints needed
+4. Full API specifications (request/response)
+
+Return a complete JSON design in this exact format:
+{{
+    "frontend": {{
+        "pages": [
+            {{
+                "page_name": "Page Name",
+                "description": "Page description",
+                "requirements": ["requirement1", "requirement2"],
+                "backend_endpoints": [
+                    {{
+                        "endpoint_name": "Endpoint Name",
+                        "method": "GET|POST|PUT|DELETE",
+                        "path": "/api/resource",
+                        "description": "Endpoint description",
+                        "request_body": "Request body structure",
+                        "response": "Response structure"
+                    }}
+                ]
+            }}
+        ],
+        "is_complete": true
+    }},
+    "backend": {{
+        "endpoints": [
+            {{
+                "endpoint_name": "Endpoint Name",
+                "method": "GET|POST|PUT|DELETE",
+                "path": "/api/resource",
+                "description": "Endpoint description",
+                "request_body": "Request body structure",
+                "response": "Response structure"
+            }}
+        ],
+        "is_complete": true
+    }}
+}}
+
+Be comprehensive and detailed. Include ALL pages and endpoints needed for the application."""
+
+_FRONTEND_PROMPT_TMPL = """Implement a production-quality React component for this page.
+
+APPLICATION CONTEXT: {description}
+
+PAGE: {page_name}
+Description: {page_description}
+
+REQUIREMENTS:
+{requirements_json}
+
+BACKEND ENDPOINTS:
+{endpoints_json}
+
+Create a complete React functional component with:
+1. React hooks (useState, useEffect, useCallback where appropriate)
+2. Error handling and loading states
+3. Form validation if forms are present
+4. Axios for API calls (backend at http://localhost:5000)
+5. Proper comments and documentation
+6. Semantic HTML and accessibility
+7. Handle edge cases
+
+Return ONLY the complete React component code (JSX), nothing else. Start with imports."""
+
+_BACKEND_PROMPT_TMPL = """Implement a production-quality Flask route handler for this endpoint.
+
+APPLICATION CONTEXT: {description}
+
+ENDPOINT SPECIFICATION:
+{endpoint_json}
+
+Create a complete Flask route with:
+1. Proper error handling (try-except)
+2. Input validation
+3. Correct HTTP status codes
+4. Database operations using SQLAlchemy (if needed)
+5. Proper docstrings
+6. Handle edge cases
+
+Return ONLY Python code for the route handler. Use SQLite with SQLAlchemy.
+Format as: @app.route('...', methods=['...'])\ndef ...(): ..."""
+
+_FIX_PROMPT_TMPL = """Fix the following bug in this {language} code.
+
+BUG: {error}
+{line_info}
+
+APPLICATION CONTEXT: {description}
+
+CURRENT CODE:
+```{language}
+{original_code}
+```
+
+Return ONLY the complete fixed code, nothing else. No explanations."""
+
+
 def gather_requirements_interactive() -> Dict[str, Any]:
     """
     Phase 1: Single agent gathers requirements interactively.
@@ -252,13 +416,9 @@ Be thorough and ask specific questions.""")
     
     # Initial greeting
     agent = get_single_agent()
-    initial_response = invoke_with_metrics(
-        agent,
-        conversation_history + [HumanMessage(content="Hello, I'd like to discuss my application idea.")],
-        log_file
-    )
-    print(f"\nAgent: {initial_response.content}\n")
     conversation_history.append(HumanMessage(content="Hello, I'd like to discuss my application idea."))
+    initial_response = invoke_with_metrics(agent, conversation_history, log_file)
+    print(f"\nAgent: {initial_response.content}\n")
     conversation_history.append(initial_response)
     
     # Interactive loop
@@ -275,22 +435,22 @@ Be thorough and ask specific questions.""")
         response = invoke_with_metrics(agent, conversation_history, log_file)
         print(f"\nAgent: {response.content}\n")
         conversation_history.append(response)
+        # Keep the system prompt as a stable prefix and only the most recent turns after it
+        if len(conversation_history) > MAX_HISTORY_MESSAGES + 1:
+            del conversation_history[1:-MAX_HISTORY_MESSAGES]
         
         # Try to extract JSON from response if user has confirmed
         content = response.content.strip()
-        if "{" in content and "detailed_description" in content:
+        match = _REQ_JSON_RE.search(content)
+        if match:
             try:
-                # Extract JSON from response
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = content[json_start:json_end]
-                    parsed = json.loads(json_str)
-                    if "detailed_description" in parsed and "features" in parsed:
-                        requirements = parsed
-                        requirements["is_finalized"] = True
-                        print("\n✓ Requirements finalized!")
-                        break
+                # Decode the JSON object starting at the matched brace
+                parsed, _ = _json_decoder.raw_decode(content, match.start())
+                if isinstance(parsed, dict) and "detailed_description" in parsed and "features" in parsed:
+                    requirements = parsed
+                    requirements["is_finalized"] = True
+                    print("\n✓ Requirements finalized!")
+                    break
             except json.JSONDecodeError:
                 pass
         
@@ -319,56 +479,10 @@ def design_application(description: str, features: List[str]) -> Dict[str, Any]:
     print("Phase 2: Application Design (Frontend + Backend)")
     print("-" * 70)
     
-    design_prompt = f"""Design a complete software application based on these requirements.
-
-Application Description: {description}
-
-Features: {json.dumps(features, indent=2)}
-
-Design the complete application including:
-1. All frontend pages/screens needed
-2. UI requirements for each page
-3. All backend API endpoints needed
-4. Full API specifications (request/response)
-
-Return a complete JSON design in this exact format:
-{{
-    "frontend": {{
-        "pages": [
-            {{
-                "page_name": "Page Name",
-                "description": "Page description",
-                "requirements": ["requirement1", "requirement2"],
-                "backend_endpoints": [
-                    {{
-                        "endpoint_name": "Endpoint Name",
-                        "method": "GET|POST|PUT|DELETE",
-                        "path": "/api/resource",
-                        "description": "Endpoint description",
-                        "request_body": "Request body structure",
-                        "response": "Response structure"
-                    }}
-                ]
-            }}
-        ],
-        "is_complete": true
-    }},
-    "backend": {{
-        "endpoints": [
-            {{
-                "endpoint_name": "Endpoint Name",
-                "method": "GET|POST|PUT|DELETE",
-                "path": "/api/resource",
-                "description": "Endpoint description",
-                "request_body": "Request body structure",
-                "response": "Response structure"
-            }}
-        ],
-        "is_complete": true
-    }}
-}}
-
-Be comprehensive and detailed. Include ALL pages and endpoints needed for the application."""
+    design_prompt = _DESIGN_PROMPT_TMPL.format_map({
+        "description": description,
+        "features_json": json_dumps_compact(features),
+    })
 
     log_and_print(f"\n[Agent Request] Designing application...", log_file)
     
@@ -384,7 +498,7 @@ Be comprehensive and detailed. Include ALL pages and endpoints needed for the ap
         json_end = content.rfind("}") + 1
         if json_start >= 0 and json_end > json_start:
             json_str = content[json_start:json_end]
-            design = json.loads(json_str)
+            design = json_loads(json_str)
             
             # Ensure structure is complete
             if "frontend" not in design:
@@ -410,11 +524,7 @@ def generate_project_scaffolding(design: Dict[str, Any], react_path: str = "fron
     print("Phase 3: Project Scaffolding Generation")
     print("-" * 70)
     
-    # Import local project generator
-    from project_generator import generate_projects
-    
-    project_paths = generate_projects(design)
-    return project_paths
+    return _generate_projects(design)
 
 
 def implement_all_code(design: Dict[str, Any], react_path: str, flask_path: str, description: str):
@@ -462,29 +572,13 @@ def implement_frontend_page(page: Dict, project_path: str, all_endpoints: List[D
                 endpoint_specs.append(full_ep)
                 break
     
-    prompt = f"""Implement a production-quality React component for this page.
-
-APPLICATION CONTEXT: {description}
-
-PAGE: {page_name}
-Description: {page.get('description', '')}
-
-REQUIREMENTS:
-{json.dumps(requirements, indent=2)}
-
-BACKEND ENDPOINTS:
-{json.dumps(endpoint_specs, indent=2)}
-
-Create a complete React functional component with:
-1. React hooks (useState, useEffect, useCallback where appropriate)
-2. Error handling and loading states
-3. Form validation if forms are present
-4. Axios for API calls (backend at http://localhost:5000)
-5. Proper comments and documentation
-6. Semantic HTML and accessibility
-7. Handle edge cases
-
-Return ONLY the complete React component code (JSX), nothing else. Start with imports."""
+    prompt = _FRONTEND_PROMPT_TMPL.format_map({
+        "description": description,
+        "page_name": page_name,
+        "page_description": page.get('description', ''),
+        "requirements_json": json_dumps_compact(requirements),
+        "endpoints_json": json_dumps_compact(endpoint_specs),
+    })
 
     try:
         agent = get_single_agent()
@@ -492,11 +586,7 @@ Return ONLY the complete React component code (JSX), nothing else. Start with im
         component_code = response.content.strip()
         
         # Clean code blocks
-        if "```" in component_code:
-            component_code = component_code.split("```")[1]
-            if component_code.startswith("jsx") or component_code.startswith("javascript"):
-                component_code = component_code.split('\n', 1)[1]
-            component_code = component_code.split("```")[0]
+        component_code = extract_fenced(component_code)
         
         # Add imports if missing
         if "import React" not in component_code:
@@ -527,23 +617,10 @@ def implement_backend_endpoint(endpoint: Dict, project_path: str, description: s
     path = endpoint.get('path', '')
     method = endpoint.get('method', 'GET')
     
-    prompt = f"""Implement a production-quality Flask route handler for this endpoint.
-
-APPLICATION CONTEXT: {description}
-
-ENDPOINT SPECIFICATION:
-{json.dumps(endpoint, indent=2)}
-
-Create a complete Flask route with:
-1. Proper error handling (try-except)
-2. Input validation
-3. Correct HTTP status codes
-4. Database operations using SQLAlchemy (if needed)
-5. Proper docstrings
-6. Handle edge cases
-
-Return ONLY Python code for the route handler. Use SQLite with SQLAlchemy.
-Format as: @app.route('...', methods=['...'])\ndef ...(): ..."""
+    prompt = _BACKEND_PROMPT_TMPL.format_map({
+        "description": description,
+        "endpoint_json": json_dumps_compact(endpoint),
+    })
 
     try:
         agent = get_single_agent()
@@ -551,10 +628,7 @@ Format as: @app.route('...', methods=['...'])\ndef ...(): ..."""
         code = response.content.strip()
         
         # Clean code blocks
-        if "```python" in code:
-            code = code.split("```python")[1].split("```")[0]
-        elif "```" in code:
-            code = code.split("```")[1].split("```")[0]
+        code = extract_fenced(code)
         
         # Determine file path based on resource
         path_parts = path.strip('/').split('/')
@@ -562,13 +636,12 @@ Format as: @app.route('...', methods=['...'])\ndef ...(): ..."""
         resource_file = os.path.join(project_path, "routes", f"{resource}_routes.py")
         os.makedirs(os.path.dirname(resource_file), exist_ok=True)
         
-        # Append to file or create new
-        if os.path.exists(resource_file):
-            with open(resource_file, 'a', encoding='utf-8') as f:
-                f.write("\n\n" + code)
-        else:
-            with open(resource_file, 'w', encoding='utf-8') as f:
+        # Append to file, writing the import header only when the file is new
+        with _routes_file_lock, open(resource_file, 'a', encoding='utf-8') as f:
+            if f.tell() == 0:
                 f.write("from flask import Flask, request, jsonify\n\n" + code)
+            else:
+                f.write("\n\n" + code)
         
         # Track metrics
         lines = len(code.split('\n'))
@@ -765,33 +838,20 @@ def fix_bug(bug: Dict, description: str, log_file: str) -> int:
             original_code = f.read()
         original_lines = len(original_code.split('\n'))
         
-        prompt = f"""Fix the following bug in this {language} code.
-
-BUG: {error}
-{f"Line: {bug['line']}" if bug.get('line') else ""}
-
-APPLICATION CONTEXT: {description}
-
-CURRENT CODE:
-```{language}
-{original_code}
-```
-
-Return ONLY the complete fixed code, nothing else. No explanations."""
+        prompt = _FIX_PROMPT_TMPL.format_map({
+            "language": language,
+            "error": error,
+            "line_info": f"Line: {bug['line']}" if bug.get('line') else "",
+            "description": description,
+            "original_code": original_code,
+        })
 
         agent = get_single_agent()
         response = invoke_with_metrics(agent, [HumanMessage(content=prompt)], log_file, is_coding=True)
         fixed_code = response.content.strip()
         
         # Clean code blocks
-        if "```" in fixed_code:
-            parts = fixed_code.split("```")
-            if len(parts) >= 2:
-                fixed_code = parts[1]
-                if fixed_code.startswith(language) or fixed_code.startswith("python") or fixed_code.startswith("javascript"):
-                    fixed_code = fixed_code.split('\n', 1)[1] if '\n' in fixed_code else fixed_code
-                if len(parts) > 2:
-                    fixed_code = fixed_code.split("```")[0]
+        fixed_code = extract_fenced(fixed_code)
         
         # Write fixed code
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -836,8 +896,8 @@ def run_experiment(spec_file: str = None, description: str = None, features: Lis
     
     # Load specification
     if spec_file:
-        with open(spec_file, 'r', encoding='utf-8') as f:
-            spec = json.load(f)
+        with open(spec_file, 'rb') as f:
+            spec = json_loads(f.read())
         description = spec.get("detailed_description", spec.get("description", ""))
         features = spec.get("features", [])
         log_and_print(f"Loaded specification from: {spec_file}", log_file)
@@ -858,8 +918,7 @@ def run_experiment(spec_file: str = None, description: str = None, features: Lis
     
     # Save design
     design_path = os.path.join(logs_dir, f"conventional_design_{timestamp}.json")
-    with open(design_path, 'w', encoding='utf-8') as f:
-        json.dump(design, f, indent=2)
+    write_json(design_path, design)
     
     # Phase 3: Generate scaffolding
     print("\n[Phase 3] Generating project scaffolding...")
@@ -919,8 +978,7 @@ def main():
     # Save design
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     design_path = os.path.join(logs_dir, f"conventional_design_{timestamp}.json")
-    with open(design_path, 'w', encoding='utf-8') as f:
-        json.dump(design, f, indent=2)
+    write_json(design_path, design)
     print(f"\n✓ Design saved to: {design_path}")
     
     # Ask if user wants to generate projects
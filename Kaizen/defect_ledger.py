@@ -4,10 +4,17 @@ Tracks defects, improvements, and waste elimination throughout PDCA cycles.
 """
 
 import os
+import sys
 import json
+import atexit
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, Optional
 from enum import Enum
+from types import MappingProxyType
 
 
 class DefectSeverity(Enum):
@@ -28,58 +35,341 @@ class DefectStatus(Enum):
     CLOSED = "closed"
 
 
+# Shared read-only placeholders for records without metadata or verification notes
+_EMPTY_METADATA: Mapping[str, Any] = MappingProxyType({})
+_NO_NOTES = ()
+
+# fdatasync skips metadata-only flushes; not every platform provides it
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode read-only mappings (the shared empty metadata) as plain JSON objects."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _encode_event(event: Dict[str, Any]) -> str:
+    """Serialize one ledger event as a compact JSON line (UTF-8 kept as-is, no escaping pass)."""
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=_json_default) + "\n"
+
+
+# Statuses that count as unresolved
+_OPEN_STATUSES = frozenset((DefectStatus.OPEN.value, DefectStatus.IN_PROGRESS.value))
+
+# Terminal transitions that are fsynced; other events rely on OS buffering
+_FSYNC_STATUSES = frozenset((DefectStatus.VERIFIED, DefectStatus.CLOSED))
+
+# Low-cardinality defect fields that are interned so records share one string object
+_INTERNED_FIELDS = ('severity', 'status', 'category', 'detected_by', 'component')
+
+# Severity values in declaration order, resolved once instead of per statistics call
+_SEVERITY_VALUES = tuple(severity.value for severity in DefectSeverity)
+
+
+# Encodes a single string as a JSON literal (C fast path for str)
+_encode_json_str = json.JSONEncoder(ensure_ascii=False).encode
+
+_KNOWN_SEVERITIES = frozenset(_SEVERITY_VALUES)
+_KNOWN_STATUSES = frozenset(status.value for status in DefectStatus)
+
+
+def _encode_defect_event(defect: Dict[str, Any]) -> str:
+    """
+    Serialize a 'defect' event with a template specialized to the defect schema.
+    
+    Produces the same line as _encode_event for freshly added defects; records with
+    metadata, notes, a resolution, or non-enum values fall back to the generic encoder.
+    """
+    severity = defect['severity']
+    status = defect['status']
+    if (defect['metadata'] or defect['verification_notes'] or defect['resolved_at'] is not None
+            or defect['resolved_by'] is not None or severity not in _KNOWN_SEVERITIES
+            or status not in _KNOWN_STATUSES or type(defect['id']) is not int):
+        return _encode_event({'event': 'defect', 'data': defect})
+    return (
+        f'{{"event":"defect","data":{{"id":{defect["id"]},'
+        f'"description":{_encode_json_str(defect["description"])},'
+        f'"component":{_encode_json_str(defect["component"])},'
+        f'"severity":"{severity}","status":"{status}",'
+        f'"detected_by":{_encode_json_str(defect["detected_by"])},'
+        f'"detected_at":{_encode_json_str(defect["detected_at"])},'
+        f'"category":{_encode_json_str(defect["category"])},'
+        f'"metadata":{{}},"resolved_by":null,"resolved_at":null,"verification_notes":[]}}}}\n'
+    )
+
+
+def _synchronized(method):
+    """Run a ledger method while holding the instance lock."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class DefectLedger:
     """
     Central defect ledger for tracking issues, improvements, and waste elimination.
     Supports transparency and continuous learning across all agent groups.
     """
     
-    def __init__(self, ledger_path: str = None):
+    def __init__(self, ledger_path: str = None, flush_interval: int = 10):
         """
         Initialize the defect ledger.
         
+        The ledger is persisted as an append-only JSON-Lines event log: each
+        mutation appends one event line, and loading replays the events.
+        
         Args:
-            ledger_path: Path to save/load ledger JSON file
+            ledger_path: Path to save/load ledger JSON-Lines file
+            flush_interval: Number of events coalesced into one write (1 writes on every change)
         """
-        self.ledger_path = ledger_path or os.path.join("logs", f"defect_ledger_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+        self.ledger_path = ledger_path or os.path.join("logs", f"defect_ledger_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
         
         self.defects: List[Dict[str, Any]] = []
         self.improvements: List[Dict[str, Any]] = []
         self.waste_eliminations: List[Dict[str, Any]] = []
         self.defect_counter = 0
+        self._defect_by_id: Dict[int, Dict[str, Any]] = {}
+        
+        # Incrementally maintained indexes for open-defect queries and statistics
+        self._open_ids: set = set()
+        self._open_defects_cache: Optional[List[Dict[str, Any]]] = None  # Unfiltered get_open_defects result
+        self._open_by_component: Optional[Dict[str, List[Dict[str, Any]]]] = None  # Open defects grouped by component
+        self._pending_improvements_by_component: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._severity_counts: Counter = Counter()
+        self._status_counts: Counter = Counter()
+        
+        # Write batching: events are serialized immediately and written in groups
+        self._pending_lines: List[str] = []
+        self._flush_interval = max(1, flush_interval)
+        self._batch_depth = 0
+        self._batch_now: Optional[str] = None  # Shared timestamp for events in a batch
+        self._fp = None  # Long-lived append handle, opened on first write
+        self._sync_requested = False  # A pending event needs fsync on the next flush
+        
+        # Implementation agents run in worker threads and share the ledger
+        self._lock = threading.RLock()
         
         # Load existing ledger if it exists
         self._load_ledger()
+        
+        # Make sure batched changes reach disk on interpreter exit
+        atexit.register(self.close)
     
-    def _load_ledger(self):
-        """Load existing ledger from file if it exists."""
-        if os.path.exists(self.ledger_path):
-            try:
-                with open(self.ledger_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.defects = data.get('defects', [])
-                    self.improvements = data.get('improvements', [])
-                    self.waste_eliminations = data.get('waste_eliminations', [])
-                    self.defect_counter = data.get('defect_counter', len(self.defects))
-            except Exception as e:
-                print(f"[WARNING] Failed to load defect ledger: {e}")
+    @_synchronized
+    def __enter__(self):
+        """Start a batch: writes are deferred until the outermost block exits."""
+        if self._batch_depth == 0:
+            self._batch_now = datetime.now().isoformat()
+        self._batch_depth += 1
+        return self
+    
+    @_synchronized
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._batch_now = None
+            self.flush()
+        return False
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group the ledger changes of one phase: events are kept in memory and
+        written with a single flush when the block exits.
+        """
+        with self:
+            yield self
     
-    def _save_ledger(self):
-        """Save ledger to file."""
+    def _now(self) -> str:
+        """Timestamp for a new event; all events in one batch share the batch start time."""
+        return self._batch_now or datetime.now().isoformat()
+    
+    def _append_event(self, event: Dict[str, Any], sync: bool = False):
+        """
+        Queue one event line and write once enough events have accumulated.
+        
+        Args:
+            event: Event to append
+            sync: Event is a critical transition; write it (or the enclosing batch) with fsync
+        """
+        self._append_line(_encode_event(event), sync)
+    
+    def _append_line(self, line: str, sync: bool = False):
+        """Queue an already encoded event line; see _append_event."""
+        self._pending_lines.append(line)
+        if sync:
+            self._sync_requested = True
+        if self._batch_depth == 0 and (sync or len(self._pending_lines) >= self._flush_interval):
+            self.flush()
+    
+    @_synchronized
+    def flush(self, sync: bool = False):
+        """
+        Append pending events to the ledger file if there are any.
+        
+        Args:
+            sync: Also fsync the file so the events survive an OS crash
+        """
+        sync = sync or self._sync_requested
+        if not self._pending_lines and not sync:
+            return
         try:
-            data = {
-                'defects': self.defects,
-                'improvements': self.improvements,
-                'waste_eliminations': self.waste_eliminations,
-                'defect_counter': self.defect_counter,
-                'last_updated': datetime.now().isoformat()
-            }
-            with open(self.ledger_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            if self._fp is None:
+                self._ensure_ledger_dir()
+                self._fp = open(self.ledger_path, 'a', buffering=1 << 16, encoding='utf-8')
+            self._fp.write("".join(self._pending_lines))
+            self._fp.flush()
+            if sync:
+                os.fsync(self._fp.fileno())
+                self._sync_requested = False
+            self._pending_lines.clear()
         except Exception as e:
             print(f"[WARNING] Failed to save defect ledger: {e}")
     
+    def _ensure_ledger_dir(self):
+        """Create the ledger directory; deferred until the first write."""
+        directory = os.path.dirname(self.ledger_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    @_synchronized
+    def close(self):
+        """Flush pending events and close the ledger file handle."""
+        self.flush()
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+    
+    @_synchronized
+    def compact(self, sync: bool = False):
+        """
+        Rewrite the log as one event per record, dropping superseded status events.
+        
+        The new log is written to a temporary file and swapped in with os.replace,
+        so a crash mid-compaction leaves the previous log intact.
+        
+        Args:
+            sync: fdatasync the new log before swapping it in
+        """
+        lines = [_encode_defect_event(d) for d in self.defects]
+        lines.extend(_encode_event({'event': 'improvement', 'data': i}) for i in self.improvements)
+        lines.extend(_encode_event({'event': 'waste', 'data': w}) for w in self.waste_eliminations)
+        payload = "".join(lines)
+        try:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+            self._ensure_ledger_dir()
+            tmp_path = self.ledger_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(payload.encode('utf-8'))
+                if sync:
+                    f.flush()
+                    _fdatasync(f.fileno())
+            os.replace(tmp_path, self.ledger_path)
+            self._pending_lines.clear()
+            self._sync_requested = False
+        except Exception as e:
+            print(f"[WARNING] Failed to compact defect ledger: {e}")
+    
+    def pretty_dump(self, path: str):
+        """
+        Write the current ledger state as one indented JSON document for human reading.
+        
+        Args:
+            path: Path of the JSON file to write
+        """
+        data = {
+            'defects': self.defects,
+            'improvements': self.improvements,
+            'waste_eliminations': self.waste_eliminations,
+            'defect_counter': self.defect_counter,
+            'last_updated': datetime.now().isoformat()
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, indent=2, ensure_ascii=False, default=_json_default))
+    
+    def _load_ledger(self):
+        """Load existing ledger from file by replaying its events."""
+        try:
+            # Stream the log line by line so only the reduced state is kept in memory
+            with open(self.ledger_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        self._replay_event(json.loads(line))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[WARNING] Failed to load defect ledger: {e}")
+        self._rebuild_indexes()
+    
+    def _replay_event(self, event: Dict[str, Any]):
+        """Apply one logged event to the in-memory state."""
+        kind = event.get('event')
+        if kind == 'defect':
+            defect = event['data']
+            for key in _INTERNED_FIELDS:
+                if isinstance(defect.get(key), str):
+                    defect[key] = sys.intern(defect[key])
+            if not defect.get('metadata'):
+                defect['metadata'] = _EMPTY_METADATA
+            if not defect.get('verification_notes'):
+                defect['verification_notes'] = _NO_NOTES
+            self.defects.append(defect)
+            self._defect_by_id[defect['id']] = defect
+            self.defect_counter = max(self.defect_counter, defect['id'])
+        elif kind == 'status':
+            defect = self._defect_by_id.get(event['id'])
+            if defect is not None:
+                self._apply_status(defect, event)
+        elif kind == 'improvement':
+            improvement = event['data']
+            if not improvement.get('metadata'):
+                improvement['metadata'] = _EMPTY_METADATA
+            self.improvements.append(improvement)
+        elif kind == 'waste':
+            self.waste_eliminations.append(event['data'])
+    
+    def _rebuild_indexes(self):
+        """Recompute the open-defect and count indexes from self.defects in one pass."""
+        open_ids = set()
+        severity_counts = Counter()
+        status_counts = Counter()
+        # Local bindings keep attribute lookups out of the loop
+        add_open = open_ids.add
+        open_statuses = _OPEN_STATUSES
+        for d in self.defects:
+            status = d['status']
+            status_counts[status] += 1
+            severity_counts[d['severity']] += 1
+            if status in open_statuses:
+                add_open(d['id'])
+        self._open_ids = open_ids
+        self._open_defects_cache = None
+        self._open_by_component = None
+        self._pending_improvements_by_component = None
+        self._severity_counts = severity_counts
+        self._status_counts = status_counts
+    
+    @staticmethod
+    def _apply_status(defect: Dict[str, Any], event: Dict[str, Any]):
+        """Apply a status event to a defect record."""
+        defect['status'] = sys.intern(event['status'])
+        if event.get('resolved_at'):
+            defect['resolved_by'] = event.get('resolved_by')
+            defect['resolved_at'] = event['resolved_at']
+        if event.get('note'):
+            notes = defect['verification_notes']
+            if isinstance(notes, tuple):
+                # First note: swap the shared empty sentinel for a real list
+                notes = defect['verification_notes'] = list(notes)
+            notes.append(event['note'])
+    
+    @_synchronized
     def add_defect(
         self,
         description: str,
@@ -110,20 +400,27 @@ class DefectLedger:
             'component': component,
             'severity': severity.value,
             'status': DefectStatus.OPEN.value,
-            'detected_by': detected_by,
-            'detected_at': datetime.now().isoformat(),
-            'category': category,
-            'metadata': metadata or {},
+            'detected_by': sys.intern(detected_by),
+            'detected_at': self._now(),
+            'category': sys.intern(category),
+            'metadata': metadata or _EMPTY_METADATA,
             'resolved_by': None,
             'resolved_at': None,
-            'verification_notes': []
+            'verification_notes': _NO_NOTES
         }
         
         self.defects.append(defect)
-        self._save_ledger()
+        self._defect_by_id[defect['id']] = defect
+        self._open_ids.add(defect['id'])
+        self._open_defects_cache = None
+        self._open_by_component = None
+        self._severity_counts[defect['severity']] += 1
+        self._status_counts[defect['status']] += 1
+        self._append_line(_encode_defect_event(defect))
         
         return self.defect_counter
     
+    @_synchronized
     def update_defect_status(
         self,
         defect_id: int,
@@ -143,22 +440,35 @@ class DefectLedger:
         Returns:
             True if defect was found and updated
         """
-        for defect in self.defects:
-            if defect['id'] == defect_id:
-                defect['status'] = status.value
-                if status == DefectStatus.RESOLVED or status == DefectStatus.VERIFIED:
-                    defect['resolved_by'] = resolved_by
-                    defect['resolved_at'] = datetime.now().isoformat()
-                if verification_notes:
-                    defect['verification_notes'].append({
-                        'note': verification_notes,
-                        'added_at': datetime.now().isoformat(),
-                        'added_by': resolved_by or 'system'
-                    })
-                self._save_ledger()
-                return True
-        return False
+        defect = self._defect_by_id.get(defect_id)
+        if defect is None:
+            return False
+        
+        now = self._now()
+        event = {'event': 'status', 'id': defect_id, 'status': status.value}
+        if status == DefectStatus.RESOLVED or status == DefectStatus.VERIFIED:
+            event['resolved_by'] = resolved_by
+            event['resolved_at'] = now
+        if verification_notes:
+            event['note'] = {
+                'note': verification_notes,
+                'added_at': now,
+                'added_by': resolved_by or 'system'
+            }
+        self._status_counts[defect['status']] -= 1
+        self._status_counts[status.value] += 1
+        if status.value in _OPEN_STATUSES:
+            self._open_ids.add(defect_id)
+        else:
+            self._open_ids.discard(defect_id)
+        self._open_defects_cache = None
+        self._open_by_component = None
+        
+        self._apply_status(defect, event)
+        self._append_event(event, sync=status in _FSYNC_STATUSES)
+        return True
     
+    @_synchronized
     def add_improvement(
         self,
         description: str,
@@ -185,17 +495,19 @@ class DefectLedger:
             'description': description,
             'component': component,
             'suggested_by': suggested_by,
-            'suggested_at': datetime.now().isoformat(),
+            'suggested_at': self._now(),
             'impact': impact,
             'status': 'pending',
-            'metadata': metadata or {}
+            'metadata': metadata or _EMPTY_METADATA
         }
         
         self.improvements.append(improvement)
-        self._save_ledger()
+        self._pending_improvements_by_component = None
+        self._append_event({'event': 'improvement', 'data': improvement})
         
         return improvement['id']
     
+    @_synchronized
     def add_waste_elimination(
         self,
         waste_type: str,
@@ -220,15 +532,16 @@ class DefectLedger:
             'waste_type': waste_type,
             'description': description,
             'eliminated_by': eliminated_by,
-            'eliminated_at': datetime.now().isoformat(),
+            'eliminated_at': self._now(),
             'savings': savings
         }
         
         self.waste_eliminations.append(elimination)
-        self._save_ledger()
+        self._append_event({'event': 'waste', 'data': elimination})
         
         return elimination['id']
     
+    @_synchronized
     def get_open_defects(self, component: str = None, severity: DefectSeverity = None) -> List[Dict[str, Any]]:
         """
         Get all open defects, optionally filtered by component or severity.
@@ -240,19 +553,57 @@ class DefectLedger:
         Returns:
             List of open defects
         """
-        open_defects = [
-            d for d in self.defects
-            if d['status'] in [DefectStatus.OPEN.value, DefectStatus.IN_PROGRESS.value]
-        ]
+        defect_by_id = self._defect_by_id
+        severity_value = severity.value if severity else None
+        
+        # The unfiltered list is reused until the open set changes
+        if not component and not severity_value:
+            if self._open_defects_cache is None:
+                self._open_defects_cache = [defect_by_id[defect_id] for defect_id in sorted(self._open_ids)]
+            return list(self._open_defects_cache)
         
-        if component:
-            open_defects = [d for d in open_defects if component in d['component']]
+        if not component:
+            return [defect_by_id[defect_id] for defect_id in sorted(self._open_ids)
+                    if defect_by_id[defect_id]['severity'] == severity_value]
         
-        if severity:
-            open_defects = [d for d in open_defects if d['severity'] == severity.value]
+        # Component filters are substring matches, so scan the component keys
+        # rather than every open defect
+        if self._open_by_component is None:
+            by_component: Dict[str, List[Dict[str, Any]]] = {}
+            for defect_id in sorted(self._open_ids):
+                d = defect_by_id[defect_id]
+                by_component.setdefault(d['component'], []).append(d)
+            self._open_by_component = by_component
+        groups = [defects for key, defects in self._open_by_component.items() if component in key]
+        if len(groups) == 1:
+            candidates = groups[0]
+        else:
+            candidates = sorted((d for defects in groups for d in defects), key=lambda d: d['id'])
         
-        return open_defects
+        if severity_value:
+            return [d for d in candidates if d['severity'] == severity_value]
+        return list(candidates)
     
+    @_synchronized
+    def get_pending_improvements(self, component: str) -> List[Dict[str, Any]]:
+        """
+        Get pending improvement suggestions for one component.
+        
+        Args:
+            component: Exact component name (e.g., "frontend/HomePage")
+        
+        Returns:
+            List of pending improvements, oldest first
+        """
+        if self._pending_improvements_by_component is None:
+            by_component: Dict[str, List[Dict[str, Any]]] = {}
+            for improvement in self.improvements:
+                if improvement.get('status') == 'pending':
+                    by_component.setdefault(improvement.get('component'), []).append(improvement)
+            self._pending_improvements_by_component = by_component
+        return list(self._pending_improvements_by_component.get(component, ()))
+    
+    @_synchronized
     def get_statistics(self) -> Dict[str, Any]:
         """
         Get statistics about defects, improvements, and waste elimination.
@@ -260,16 +611,16 @@ class DefectLedger:
         Returns:
             Dictionary with statistics
         """
+        return self._statistics(len(self._open_ids))
+    
+    def _statistics(self, open_defects: int) -> Dict[str, Any]:
+        """Build the statistics dict given an already known open-defect count."""
         total_defects = len(self.defects)
-        open_defects = len(self.get_open_defects())
-        resolved_defects = len([d for d in self.defects if d['status'] == DefectStatus.RESOLVED.value])
-        verified_defects = len([d for d in self.defects if d['status'] == DefectStatus.VERIFIED.value])
+        resolved_defects = self._status_counts[DefectStatus.RESOLVED.value]
+        verified_defects = self._status_counts[DefectStatus.VERIFIED.value]
         
-        severity_counts = {}
-        for severity in DefectSeverity:
-            severity_counts[severity.value] = len([
-                d for d in self.defects if d['severity'] == severity.value
-            ])
+        severity_totals = self._severity_counts
+        severity_counts = {value: severity_totals[value] for value in _SEVERITY_VALUES}
         
         return {
             'total_defects': total_defects,
@@ -282,6 +633,7 @@ class DefectLedger:
             'total_waste_eliminations': len(self.waste_eliminations)
         }
     
+    @_synchronized
     def export_report(self, report_path: str = None) -> str:
         """
         Export a comprehensive defect report.
@@ -292,9 +644,11 @@ class DefectLedger:
         Returns:
             Report content as string
         """
-        stats = self.get_statistics()
+        # One open-defect query feeds both the statistics and the listing
+        open_defects = self.get_open_defects()
+        stats = self._statistics(len(open_defects))
         
-        report = f"""
+        parts = [f"""
 DEFECT LEDGER REPORT
 {'='*70}
 Generated: {datetime.now().isoformat()}
@@ -320,12 +674,11 @@ Total Waste Eliminations: {stats['total_waste_eliminations']}
 
 OPEN DEFECTS
 {'-'*70}
-"""
+"""]
         
-        open_defects = self.get_open_defects()
         if open_defects:
             for defect in open_defects:
-                report += f"""
+                parts.append(f"""
 ID: {defect['id']}
 Component: {defect['component']}
 Severity: {defect['severity']}
@@ -334,15 +687,15 @@ Detected By: {defect['detected_by']}
 Description: {defect['description']}
 Category: {defect['category']}
 ---
-"""
+""")
         else:
-            report += "No open defects.\n"
+            parts.append("No open defects.\n")
         
         if report_path:
             with open(report_path, 'w', encoding='utf-8') as f:
-                f.write(report)
+                f.writelines(parts)
         
-        return report
+        return "".join(parts)
 
 
 
@@ -11,12 +11,16 @@ Key differences from Top down:
 """
 
 import os
-import time
+import asyncio
 import subprocess
 import json
 import re
+import shlex
+import shutil
+import hashlib
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union, Callable
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
@@ -24,10 +28,142 @@ from langchain_core.messages import HumanMessage
 # Import Kaizen modules
 from defect_ledger import DefectLedger, DefectSeverity, DefectStatus
 from rate_limiter import RateLimiter
-from kaizen_orchestrator import get_agent, invoke_with_rate_limit, log_and_print
+from kaizen_orchestrator import get_agent, get_logger, invoke_with_rate_limit, log_and_print
 
 load_dotenv()
 
+# Error parsing patterns, compiled once and shared by all debugger instances
+_PY_FILE_RE = re.compile(r'File "([^"]+)", line (\d+)')
+_PY_ERR_RE = re.compile(r'(\w+Error): (.+?)(?:\n|$)')
+_JS_FILE_RE = re.compile(r'(?:\.\/)?src[\/\\][\w\/\\.-]+\.(?:js|jsx|ts|tsx)')
+_JS_LINE_RE = re.compile(r'Line (\d+):|line (\d+)|:(\d+):\d+')
+_JS_ERR_RE = re.compile(r'(SyntaxError|TypeError|ReferenceError|Error): (.+?)(?:\n|$)')
+
+# Step types the fix-plan prompt allows
+_STEP_TYPES = ("MODIFY_FILE", "FILESYSTEM")
+
+# Fallback for plans returned as numbered text: "1. MODIFY_FILE: description"
+_STEP_LINE_RE = re.compile(r'^\s*\d+\.\s*(MODIFY_FILE|FILESYSTEM)\s*:\s*(.*)$', re.IGNORECASE | re.MULTILINE)
+_INLINE_CODE_RE = re.compile(r'`([^`]+)`')
+
+# Tracebacks and compile errors sit at the end of the output; only this much is scanned
+_ERROR_TAIL = 8192
+
+# Commands that exist only inside a shell (cmd.exe on Windows, sh elsewhere), so
+# FILESYSTEM steps, which run without one, cannot execute them
+_SHELL_BUILTINS = (
+    frozenset({"assoc", "cd", "chdir", "cls", "copy", "del", "dir", "echo", "erase", "md", "mkdir",
+               "mklink", "move", "rd", "ren", "rename", "rmdir", "set", "type"})
+    if os.name == 'nt' else
+    frozenset({".", "alias", "cd", "export", "source", "unset"})
+)
+
+
+def _command_argv(command: str) -> List[str]:
+    """
+    Split a FILESYSTEM step's command into an argv that runs without a shell.
+    The program is resolved with shutil.which (npm is npm.cmd on Windows), and
+    on Windows the quote characters non-POSIX splitting leaves in tokens are
+    removed. Raises ValueError for shell builtins and unknown programs.
+    """
+    if os.name == 'nt':
+        argv = [token.replace('"', '') for token in shlex.split(command, posix=False)]
+    else:
+        argv = shlex.split(command)
+    if not argv:
+        raise ValueError("empty command")
+    program = shutil.which(argv[0])
+    if program is None:
+        if argv[0].lower() in _SHELL_BUILTINS:
+            raise ValueError(f"'{argv[0]}' is a shell builtin and FILESYSTEM steps run without a shell")
+        raise ValueError(f"program not found: {argv[0]}")
+    return [program] + argv[1:]
+
+
+def _strip_fences(text: str) -> str:
+    """Strip a surrounding markdown code fence from an LLM response."""
+    text = text.strip()
+    if text.startswith('```'):
+        text = '\n'.join(text.split('\n')[1:-1])
+    return text
+
+
+def _parse_step_lines(text: str) -> Dict[str, Any]:
+    """
+    Parse a fix plan written as numbered "STEP_TYPE: description" lines.
+    The analysis is whatever precedes the first step; a FILESYSTEM step's
+    command is taken from inline backticks when present.
+    """
+    steps = []
+    analysis = ''
+    for match in _STEP_LINE_RE.finditer(text):
+        if not steps:
+            analysis = text[:match.start()].strip()
+        description = match.group(2).strip()
+        step = {"type": match.group(1).upper(), "description": description}
+        command_match = _INLINE_CODE_RE.search(description)
+        if command_match:
+            step["command"] = command_match.group(1)
+        steps.append(step)
+    return {"analysis": analysis, "steps": steps}
+
+
+def _has_fix_steps(text: str) -> bool:
+    """cache_if check: the reply holds a fix plan (JSON or numbered lines) with at least one step."""
+    try:
+        fix_plan = json.loads(_strip_fences(text))
+    except json.JSONDecodeError:
+        fix_plan = _parse_step_lines(text)
+    return isinstance(fix_plan, dict) and bool(fix_plan.get('steps'))
+
+
+# Process-wide LRU of LLM response texts, keyed by prompt hash
+_LLM_CACHE_SIZE = 256
+_llm_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+async def _invoke_cached(agent, prompt: Union[str, Callable[[], str]], log_file: str = None,
+                         estimated_tokens: int = 1000, cache_key: str = None,
+                         cache_if: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+    """
+    Invoke the agent through the Kaizen rate limiter, reusing the response
+    for a prompt that was already answered in this process.
+    The prompt may be a callable; with an explicit cache_key it is only built on a miss.
+    A response cache_if rejects is returned but cached neither here nor in the LLM cache.
+    The blocking API call runs in a worker thread so concurrent fixes overlap.
+    Returns the response text, or None if the call failed.
+    """
+    if cache_key is None:
+        if callable(prompt):
+            prompt = prompt()
+        cache_key = prompt
+    key = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+    cached = _llm_cache.get(key)
+    if cached is not None:
+        _llm_cache.move_to_end(key)
+        log_and_print("    (using cached LLM response)", log_file)
+        return cached
+    
+    if callable(prompt):
+        prompt = prompt()
+    response = await asyncio.to_thread(
+        invoke_with_rate_limit,
+        agent,
+        [HumanMessage(content=prompt)],
+        log_file,
+        estimated_tokens=estimated_tokens,
+        cache_if=cache_if
+    )
+    if not response:
+        return None
+    if cache_if is not None and not cache_if(response.content):
+        return response.content
+    
+    _llm_cache[key] = response.content
+    if len(_llm_cache) > _LLM_CACHE_SIZE:
+        _llm_cache.popitem(last=False)
+    return response.content
+
 
 class KaizenRuntimeDebugger:
     """
@@ -43,45 +179,108 @@ class KaizenRuntimeDebugger:
         self.rate_limiter = rate_limiter
         self.log_file = log_file
         
+        # Debugger log lines go through the shared buffered logger and are flushed at iteration boundaries
+        self._log_fh = get_logger(log_file) if log_file else None
+        
         # Process tracking
         self.frontend_process = None
         self.backend_process = None
         
+        # Live process output, filled by background drain tasks
+        self._output = {"frontend": deque(), "backend": deque()}
+        self._drain_tasks = {"frontend": [], "backend": []}
+        
         # Fix tracking
         self.fixes_applied = []
-        self.errors_detected = []
+        self.errors_detected = deque(maxlen=500)  # Most recent errors only
+        self._errors_count = 0
+        
+        # Signatures of errors already recorded (and sent for a fix) in an earlier
+        # check; a crash re-detected after a restart is not recorded or fixed again
+        self._seen_signatures: set = set()
+        self.repeated_errors = 0  # Known errors skipped by the last check
+        
+        # Open runtime defect ids by (component path, category), seeded from the ledger
+        self._open_by_component: Dict[tuple, List[int]] = {}
+        if defect_ledger:
+            for defect in defect_ledger.get_open_defects():
+                if defect.get('category') == 'runtime_error':
+                    self._open_by_component.setdefault((defect.get('component'), 'runtime_error'), []).append(defect['id'])
         
         # Ports
         self.frontend_port = 3000
         self.backend_port = 5000
+        
+        # Concurrent fixes: cap in-flight LLM work, serialize edits per file
+        self._fix_sem = asyncio.Semaphore(2)
+        self._file_locks: Dict[str, asyncio.Lock] = {}
+    
+    def log(self, message: str):
+        """
+        Print a message and append it to the buffered debugger log through
+        log_and_print, so it stays in order with lines queued by worker threads.
+        """
+        log_and_print(message, self._log_fh)
+    
+    def flush_log(self):
+        """Flush buffered log lines to the log file."""
+        if self._log_fh:
+            self._log_fh.flush()
+    
+    def close_log(self):
+        """Flush the debugger log and release it (the shared handle stays open)."""
+        if self._log_fh:
+            self._log_fh.flush()
+            self._log_fh = None
     
-    def start_projects(self) -> Dict[str, bool]:
+    async def start_projects(self) -> Dict[str, bool]:
         """Start both frontend and backend projects."""
-        log_and_print("\n[Kaizen Debugger] Starting projects for runtime testing...", self.log_file)
+        self.log("\n[Kaizen Debugger] Starting projects for runtime testing...")
         
         results = {"frontend": False, "backend": False}
         
         # Start backend first
-        log_and_print("  [Backend] Starting Flask server...", self.log_file)
-        self.backend_process = self._start_backend()
+        self.log("  [Backend] Starting Flask server...")
+        self.backend_process = await self._start_backend()
         results["backend"] = self.backend_process is not None
         
-        # Wait a bit for backend to start
+        # Wait until the backend accepts connections
         if results["backend"]:
-            time.sleep(5)
+            await self._wait_port(self.backend_port, self.backend_process, timeout=15)
         
         # Start frontend
-        log_and_print("  [Frontend] Starting Vite dev server...", self.log_file)
-        self.frontend_process = self._start_frontend()
+        self.log("  [Frontend] Starting Vite dev server...")
+        self.frontend_process = await self._start_frontend()
         results["frontend"] = self.frontend_process is not None
         
         # Wait for frontend to start
         if results["frontend"]:
-            time.sleep(10)  # Vite needs more time
+            await self._wait_port(self.frontend_port, self.frontend_process, timeout=30)  # Vite needs more time
         
         return results
     
-    def _start_backend(self) -> Optional[subprocess.Popen]:
+    async def _wait_port(self, port: int, process: asyncio.subprocess.Process, timeout: float = 15) -> bool:
+        """
+        Poll a local TCP port until it accepts connections.
+        Returns False on timeout or if the process exits first.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        while loop.time() < deadline:
+            if process.returncode is not None:
+                return False
+            try:
+                _, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.close()
+                return True
+            except OSError:
+                await asyncio.sleep(0.1)
+        
+        self.log(f"    ⚠ Port {port} not ready after {timeout}s")
+        return False
+    
+    async def _start_backend(self) -> Optional[asyncio.subprocess.Process]:
         """Start Flask backend server."""
         try:
             # Determine Python executable
@@ -91,77 +290,135 @@ class KaizenRuntimeDebugger:
                 python_exe = os.path.join(self.flask_path, "venv", "bin", "python")
             
             if not os.path.exists(python_exe):
-                log_and_print(f"    ⚠ Virtual environment not found, using system Python", self.log_file)
+                self.log(f"    ⚠ Virtual environment not found, using system Python")
                 python_exe = "python"
             
             app_py = os.path.join(self.flask_path, "app.py")
             
-            process = subprocess.Popen(
-                f'"{python_exe}" "{app_py}"',
-                shell=True,
+            process = await asyncio.create_subprocess_exec(
+                python_exe,
+                app_py,
                 cwd=self.flask_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
             
-            log_and_print(f"    ✓ Backend process started (PID: {process.pid})", self.log_file)
+            self._watch_output("backend", process)
+            self.log(f"    ✓ Backend process started (PID: {process.pid})")
             return process
             
         except Exception as e:
-            log_and_print(f"    ✗ Failed to start backend: {e}", self.log_file)
+            self.log(f"    ✗ Failed to start backend: {e}")
             return None
     
-    def _start_frontend(self) -> Optional[subprocess.Popen]:
+    async def _start_frontend(self) -> Optional[asyncio.subprocess.Process]:
         """Start Vite frontend server."""
         try:
-            process = subprocess.Popen(
-                "npm run dev",
-                shell=True,
+            # Resolve npm once (npm.cmd on Windows) so no shell is needed
+            npm = shutil.which("npm") or "npm"
+            process = await asyncio.create_subprocess_exec(
+                npm,
+                "run",
+                "dev",
                 cwd=self.react_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
             
-            log_and_print(f"    ✓ Frontend process started (PID: {process.pid})", self.log_file)
+            self._watch_output("frontend", process)
+            self.log(f"    ✓ Frontend process started (PID: {process.pid})")
             return process
             
         except Exception as e:
-            log_and_print(f"    ✗ Failed to start frontend: {e}", self.log_file)
+            self.log(f"    ✗ Failed to start frontend: {e}")
             return None
     
-    def check_runtime_errors(self) -> Dict[str, List[Dict[str, Any]]]:
+    def _watch_output(self, component: str, process: asyncio.subprocess.Process):
+        """Start draining a process's stdout/stderr into a bounded buffer."""
+        buffer = deque(maxlen=1024)
+        self._output[component] = buffer
+        self._drain_tasks[component] = [
+            asyncio.create_task(self._drain(stream, buffer))
+            for stream in (process.stdout, process.stderr)
+        ]
+    
+    async def _drain(self, stream: asyncio.StreamReader, buffer: deque):
+        """Append output chunks to the buffer until the stream hits EOF."""
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                break
+            buffer.append(chunk)
+    
+    async def _read_output(self, component: str, process_exited: bool) -> str:
+        """Return the tail of the component's buffered output as text."""
+        if process_exited and self._drain_tasks[component]:
+            # Let the drainers reach EOF so the crash trace is complete
+            await asyncio.wait(self._drain_tasks[component], timeout=1)
+        
+        # Join only the newest chunks that cover the scanned tail
+        chunks = []
+        size = 0
+        for chunk in reversed(self._output[component]):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= _ERROR_TAIL:
+                break
+        chunks.reverse()
+        return b''.join(chunks)[-_ERROR_TAIL:].decode(errors='replace')
+    
+    async def check_runtime_errors(self) -> Dict[str, List[Dict[str, Any]]]:
         """
         Check for runtime errors in both projects.
         Returns errors categorized by component.
         """
-        log_and_print("\n[Kaizen Debugger] Checking for runtime errors...", self.log_file)
+        self.log("\n[Kaizen Debugger] Checking for runtime errors...")
         
         errors = {"frontend": [], "backend": []}
+        self.repeated_errors = 0
         
         # Check backend
         if self.backend_process:
-            backend_errors = self._check_backend_errors()
+            backend_errors = self._new_errors(await self._check_backend_errors())
             errors["backend"] = backend_errors
             if backend_errors:
-                log_and_print(f"  [Backend] Found {len(backend_errors)} runtime errors", self.log_file)
+                self.log(f"  [Backend] Found {len(backend_errors)} runtime errors")
             else:
-                log_and_print(f"  [Backend] ✓ No runtime errors detected", self.log_file)
+                self.log(f"  [Backend] ✓ No runtime errors detected")
         
         # Check frontend
         if self.frontend_process:
-            frontend_errors = self._check_frontend_errors()
+            frontend_errors = self._new_errors(await self._check_frontend_errors())
             errors["frontend"] = frontend_errors
             if frontend_errors:
-                log_and_print(f"  [Frontend] Found {len(frontend_errors)} runtime errors", self.log_file)
+                self.log(f"  [Frontend] Found {len(frontend_errors)} runtime errors")
             else:
-                log_and_print(f"  [Frontend] ✓ No runtime errors detected", self.log_file)
+                self.log(f"  [Frontend] ✓ No runtime errors detected")
+        
+        if self.repeated_errors:
+            self.log(f"  Skipped {self.repeated_errors} errors already recorded in an earlier check")
         
+        self._errors_count += len(errors["frontend"]) + len(errors["backend"])
         self.errors_detected.extend(errors["frontend"] + errors["backend"])
+        self.flush_log()
         return errors
     
-    def _check_backend_errors(self) -> List[Dict[str, Any]]:
+    def _new_errors(self, errors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop errors whose component, type, file, line and message match one seen
+        in this or an earlier check, and remember the signatures of the rest.
+        """
+        new = []
+        for error in errors:
+            key = (error.get('component'), error.get('type'), error.get('file'), error.get('line'), error.get('message'))
+            if key in self._seen_signatures:
+                self.repeated_errors += 1
+                continue
+            self._seen_signatures.add(key)
+            new.append(error)
+        return new
+    
+    async def _check_backend_errors(self) -> List[Dict[str, Any]]:
         """Check for Python/Flask runtime errors."""
         errors = []
         
@@ -169,31 +426,31 @@ class KaizenRuntimeDebugger:
             return errors
         
         try:
-            # Check if process crashed
-            if self.backend_process.poll() is not None:
-                stdout, stderr = self.backend_process.communicate()
-                error_output = stderr if stderr else stdout
-                
-                if error_output:
-                    error_details = self._parse_python_error(error_output)
-                    if error_details:
-                        errors.append(error_details)
-                    else:
-                        # Fallback for unparseable errors
-                        errors.append({
-                            "type": "runtime_crash",
-                            "component": "backend",
-                            "message": "Backend server crashed",
-                            "details": error_output[-2000:],
-                            "severity": DefectSeverity.CRITICAL.value
-                        })
+            # A crash or a traceback logged by the running server
+            crashed = self.backend_process.returncode is not None
+            error_output = await self._read_output("backend", crashed)
+            
+            if error_output and (crashed or 'Traceback' in error_output):
+                error_details = self._parse_python_error(error_output)
+                if not error_details:
+                    # Fallback for unparseable errors, whether the server crashed or is still running
+                    error_details = {
+                        "type": "runtime_crash" if crashed else "runtime_error",
+                        "component": "backend",
+                        "message": "Backend server crashed" if crashed else "Backend server logged an error",
+                        "details": error_output[-2000:],
+                        "severity": (DefectSeverity.CRITICAL if crashed else DefectSeverity.HIGH).value
+                    }
+                errors.append(error_details)
+                # Clear only once the error is recorded, so the next check scans new output only
+                self._output["backend"].clear()
         
         except Exception as e:
-            log_and_print(f"    ✗ Error checking backend: {e}", self.log_file)
+            self.log(f"    ✗ Error checking backend: {e}")
         
         return errors
     
-    def _check_frontend_errors(self) -> List[Dict[str, Any]]:
+    async def _check_frontend_errors(self) -> List[Dict[str, Any]]:
         """Check for React/Vite runtime errors."""
         errors = []
         
@@ -201,38 +458,37 @@ class KaizenRuntimeDebugger:
             return errors
         
         try:
-            # Check if process crashed
-            if self.frontend_process.poll() is not None:
-                stdout, stderr = self.frontend_process.communicate()
-                error_output = stderr if stderr else stdout
-                
-                if error_output:
-                    error_details = self._parse_react_error(error_output)
-                    if error_details:
-                        errors.append(error_details)
-                    else:
-                        # Fallback for unparseable errors
-                        errors.append({
-                            "type": "runtime_crash",
-                            "component": "frontend",
-                            "message": "Frontend server crashed",
-                            "details": error_output[-2000:],
-                            "severity": DefectSeverity.CRITICAL.value
-                        })
+            # A crash or a compile error reported by the running dev server
+            crashed = self.frontend_process.returncode is not None
+            error_output = await self._read_output("frontend", crashed)
+            
+            if error_output and (crashed or 'Failed to compile' in error_output or _JS_ERR_RE.search(error_output)):
+                error_details = self._parse_react_error(error_output)
+                if not error_details:
+                    # Fallback for unparseable errors, whether the server crashed or is still running
+                    error_details = {
+                        "type": "runtime_crash" if crashed else "runtime_error",
+                        "component": "frontend",
+                        "message": "Frontend server crashed" if crashed else "Frontend server reported an error",
+                        "details": error_output[-2000:],
+                        "severity": (DefectSeverity.CRITICAL if crashed else DefectSeverity.HIGH).value
+                    }
+                errors.append(error_details)
+                # Clear only once the error is recorded, so the next check scans new output only
+                self._output["frontend"].clear()
         
         except Exception as e:
-            log_and_print(f"    ✗ Error checking frontend: {e}", self.log_file)
+            self.log(f"    ✗ Error checking frontend: {e}")
         
         return errors
     
     def _parse_python_error(self, error_output: str) -> Optional[Dict[str, Any]]:
         """Parse Python traceback to extract error details."""
-        # Look for: File "path", line N
-        file_pattern = r'File "([^"]+)", line (\d+)'
-        error_pattern = r'(\w+Error): (.+?)(?:\n|$)'
+        tail = error_output[-_ERROR_TAIL:]
         
-        file_match = re.search(file_pattern, error_output)
-        error_match = re.search(error_pattern, error_output)
+        # Look for: File "path", line N
+        file_match = _PY_FILE_RE.search(tail)
+        error_match = _PY_ERR_RE.search(tail)
         
         if file_match and error_match:
             file_path = file_match.group(1)
@@ -257,7 +513,7 @@ class KaizenRuntimeDebugger:
                 "file": file_path,
                 "line": line_num,
                 "message": f"{error_type}: {error_msg}",
-                "details": error_output[-2000:],
+                "details": tail[-2000:],
                 "severity": severity
             }
         
@@ -265,14 +521,12 @@ class KaizenRuntimeDebugger:
     
     def _parse_react_error(self, error_output: str) -> Optional[Dict[str, Any]]:
         """Parse React/Vite error output."""
-        # React errors: ./src/App.jsx or src/App.jsx
-        file_pattern = r'(?:\.\/)?src[\/\\][\w\/\\.-]+\.(?:js|jsx|ts|tsx)'
-        line_pattern = r'Line (\d+):|line (\d+)|:(\d+):\d+'
-        error_pattern = r'(SyntaxError|TypeError|ReferenceError|Error): (.+?)(?:\n|$)'
+        tail = error_output[-_ERROR_TAIL:]
         
-        file_match = re.search(file_pattern, error_output)
-        line_match = re.search(line_pattern, error_output)
-        error_match = re.search(error_pattern, error_output)
+        # React errors: ./src/App.jsx or src/App.jsx
+        file_match = _JS_FILE_RE.search(tail)
+        line_match = _JS_LINE_RE.search(tail)
+        error_match = _JS_ERR_RE.search(tail)
         
         if file_match:
             file_path = file_match.group(0)
@@ -290,7 +544,7 @@ class KaizenRuntimeDebugger:
             if error_match:
                 error_type = error_match.group(1).lower().replace('error', '')
                 error_msg = f"{error_match.group(1)}: {error_match.group(2).strip()}"
-            elif 'Failed to compile' in error_output:
+            elif 'Failed to compile' in tail:
                 error_msg = "Failed to compile"
             
             # Determine severity
@@ -303,7 +557,7 @@ class KaizenRuntimeDebugger:
                 "component": "frontend",
                 "file": file_path,
                 "message": error_msg,
-                "details": error_output[-2000:],
+                "details": tail[-2000:],
                 "severity": severity
             }
             
@@ -326,15 +580,18 @@ class KaizenRuntimeDebugger:
         
         for component, component_errors in errors.items():
             for error in component_errors:
+                file_path = error.get('file')
+                file_name = os.path.basename(file_path) if file_path else 'unknown'
+                
                 # Create defect description
                 description = f"Runtime error: {error.get('message', 'Unknown error')}"
-                if error.get('file'):
-                    description += f" in {os.path.basename(error.get('file'))}"
+                if file_path:
+                    description += f" in {file_name}"
                 if error.get('line'):
                     description += f" at line {error.get('line')}"
                 
                 # Determine component path for ledger
-                component_path = f"{component}/{os.path.basename(error.get('file', 'unknown'))}"
+                component_path = f"{component}/{file_name}"
                 
                 # Get severity
                 severity_str = error.get('severity', DefectSeverity.HIGH.value)
@@ -348,203 +605,198 @@ class KaizenRuntimeDebugger:
                     description=description,
                     component=component_path,
                     severity=severity,
+                    detected_by="Kaizen Runtime Debugger",
                     category="runtime_error",
                     metadata={
                         "error_type": error.get('type'),
-                        "file": error.get('file'),
+                        "file": file_path,
                         "line": error.get('line'),
-                        "details": error.get('details', '')[:500]  # Truncate for storage
+                        "details": (error.get('details') or '')[:500]  # Truncate for storage
                     }
                 )
+                self._open_by_component.setdefault((component_path, 'runtime_error'), []).append(defect_id)
                 
                 total_recorded += 1
         
         if total_recorded > 0:
-            log_and_print(f"  [Defect Ledger] Recorded {total_recorded} runtime errors as defects", self.log_file)
+            self.log(f"  [Defect Ledger] Recorded {total_recorded} runtime errors as defects")
     
     async def fix_runtime_error(self, error: Dict[str, Any]) -> bool:
         """
         Use Kaizen's approach to fix a runtime error.
         Integrates with rate limiting and defect ledger.
+        Safe to run concurrently; at most two fixes are in flight at once.
         """
+        async with self._fix_sem:
+            return await self._fix_runtime_error(error)
+    
+    async def _fix_runtime_error(self, error: Dict[str, Any]) -> bool:
         error_type = error.get('type', 'unknown')
         component = error.get('component', 'unknown')
         file_path = error.get('file')
+        file_name = os.path.basename(file_path) if file_path else None
         line_num = error.get('line')
         
-        log_and_print(f"\n  [Kaizen Fix] Attempting to fix {error_type} error in {component}", self.log_file)
+        self.log(f"\n  [Kaizen Fix] Attempting to fix {error_type} error in {component}")
         
         # Check token budget
         remaining_tokens = self.rate_limiter.get_remaining_daily_tokens()
         if remaining_tokens < 3000:
-            log_and_print(f"    ⚠ Insufficient tokens for fix ({remaining_tokens} remaining)", self.log_file)
+            self.log(f"    ⚠ Insufficient tokens for fix ({remaining_tokens} remaining)")
             return False
         
         try:
-            # Stage 1: Analyze error (using Kaizen's agent system)
-            analysis_prompt = f"""You are a debugging expert in the Kaizen continuous improvement system.
-Analyze this runtime error and provide a concise analysis.
+            # Analyze the error and plan the fix in a single structured request.
+            # The request is cached by error signature, so the prompt is only built on a miss.
+            project_path = self.react_path if component == 'frontend' else self.flask_path
+            details = (error.get('details') or 'N/A')[:500]
+            cache_key = repr(("fix_plan", error_type, component, file_path, line_num, error.get('message'), details))
+            
+            def build_fix_prompt() -> str:
+                return f"""You are a debugging expert in the Kaizen continuous improvement system.
+Analyze this runtime error and provide the steps to fix it.
 
 Error Type: {error_type}
 Component: {component}
-File: {os.path.basename(file_path) if file_path else 'N/A'}
+File: {file_name or 'N/A'}
 Line: {line_num if line_num else 'N/A'}
 Message: {error.get('message', 'N/A')}
-Details: {error.get('details', 'N/A')[:500]}
+Details: {details}
+Project: {project_path}
 
-Provide a brief analysis:
-1. What is the root cause?
-2. What needs to be fixed?
-3. Is this a critical issue that blocks functionality?
+Respond with ONLY a JSON object in this format:
+{{
+  "analysis": "Root cause, what needs to be fixed and whether it blocks functionality (2-3 sentences)",
+  "steps": [
+    {{"type": "MODIFY_FILE", "description": "Specific code change"}},
+    {{"type": "FILESYSTEM", "description": "What the command does", "command": "exact command"}}
+  ]
+}}
 
-Keep your analysis concise (2-3 sentences)."""
+Provide 1-3 specific, actionable steps. "type" can be: MODIFY_FILE or FILESYSTEM.
+FILESYSTEM steps must include the exact command to run in the project directory,
+as a single program invocation without shell operators (&&, |, >)."""
             
-            agent = get_agent(temperature=0.2, max_tokens=1000)
-            analysis_response = invoke_with_rate_limit(
-                agent, 
-                [HumanMessage(content=analysis_prompt)], 
-                self.log_file,
-                estimated_tokens=800
-            )
+            agent = get_agent(temperature=0.2, max_tokens=1500)
+            fix_text = await _invoke_cached(agent, build_fix_prompt, self.log_file,
+                                            estimated_tokens=1500, cache_key=cache_key, cache_if=_has_fix_steps)
             
-            if not analysis_response:
-                log_and_print(f"    ✗ Failed to analyze error (token limit or API error)", self.log_file)
+            if not fix_text:
+                self.log(f"    ✗ Failed to analyze error (token limit or API error)")
                 return False
             
-            analysis = analysis_response.content.strip()
-            log_and_print(f"    Analysis: {analysis[:200]}...", self.log_file)
-            
-            # Stage 2: Generate fix steps
-            steps_prompt = f"""Based on this error analysis, provide the fix steps.
-
-Error: {error.get('message')}
-Analysis: {analysis}
-File: {file_path or 'N/A'}
-
-Provide 1-3 specific steps to fix this error. Each step should be:
-- A specific action (modify code, install package, fix import, etc.)
-- Clear and actionable
-
-Format:
-1. STEP_TYPE: Description
-2. STEP_TYPE: Description
-
-STEP_TYPE can be: MODIFY_FILE or FILESYSTEM"""
-            
-            steps_response = invoke_with_rate_limit(
-                agent,
-                [HumanMessage(content=steps_prompt)],
-                self.log_file,
-                estimated_tokens=1000
-            )
+            try:
+                fix_plan = json.loads(_strip_fences(fix_text))
+            except json.JSONDecodeError:
+                # Model ignored the JSON format; fall back to numbered step lines
+                fix_plan = _parse_step_lines(fix_text)
             
-            if not steps_response:
+            if not isinstance(fix_plan, dict):
+                self.log(f"    ✗ Could not parse fix plan")
                 return False
             
-            steps_text = steps_response.content.strip()
+            analysis = str(fix_plan.get('analysis', ''))
+            steps = [step for step in fix_plan.get('steps') or [] if isinstance(step, dict)]
             
-            # Parse and execute steps
-            step_lines = [line.strip() for line in steps_text.split('\n') if re.match(r'^\d+\.', line.strip())]
+            self.log(f"    Analysis: {analysis[:200]}...")
             
-            if not step_lines:
-                log_and_print(f"    ✗ No actionable steps found", self.log_file)
+            if not steps:
+                self.log(f"    ✗ No actionable steps found")
                 return False
             
-            log_and_print(f"    Found {len(step_lines)} fix steps", self.log_file)
+            self.log(f"    Found {len(steps)} fix steps")
             
             # Execute steps
             steps_executed = 0
-            for i, step_line in enumerate(step_lines[:3], 1):  # Limit to 3 steps per error
-                log_and_print(f"    [Step {i}] {step_line[:100]}", self.log_file)
+            for i, step in enumerate(steps[:3], 1):  # Limit to 3 steps per error
+                step_type = str(step.get('type', '')).strip().upper()
+                description = str(step.get('description', ''))
+                self.log(f"    [Step {i}] {step_type}: {description[:100]}")
+                
+                # Dispatch on the exact step type; anything else would waste an LLM call
+                if step_type not in _STEP_TYPES:
+                    self.log(f"      ✗ Unknown step type, skipped")
+                    continue
                 
-                # Determine step type
-                if "MODIFY_FILE" in step_line.upper() or "MODIFY" in step_line.upper():
-                    # File modification
+                if step_type == "MODIFY_FILE":
+                    # File modification (checked before any LLM call is made)
                     if file_path and os.path.exists(file_path):
                         fix_instruction = f"""Fix this runtime error:
 
 {error.get('message')}
-Step: {step_line}
+Step: {description}
 Analysis: {analysis}
 
 Make the necessary code changes to resolve this issue."""
                         
-                        result = await self._edit_file_chunked(file_path, fix_instruction, line_num)
+                        async with self._file_locks.setdefault(file_path, asyncio.Lock()):
+                            result = await self._edit_file_chunked(file_path, fix_instruction, line_num)
                         if result.get('success'):
                             steps_executed += 1
-                            log_and_print(f"      ✓ Modified {os.path.basename(file_path)}", self.log_file)
+                            self.log(f"      ✓ Modified {file_name}")
                         else:
-                            log_and_print(f"      ✗ Edit failed: {result.get('error', 'Unknown')}", self.log_file)
+                            self.log(f"      ✗ Edit failed: {result.get('error', 'Unknown')}")
                     else:
-                        log_and_print(f"      ✗ File not found: {file_path}", self.log_file)
+                        self.log(f"      ✗ File not found: {file_path}")
                 
-                elif "FILESYSTEM" in step_line.upper() or "INSTALL" in step_line.upper() or "RUN" in step_line.upper():
+                else:
                     # Filesystem operation
-                    command_prompt = f"""Provide the exact command for this step:
-
-Step: {step_line}
-Project: {self.react_path if component == 'frontend' else self.flask_path}
-
-Return ONLY the command, nothing else."""
+                    command = str(step.get('command') or '').strip().strip('`').strip('"').strip("'")
+                    if not command:
+                        self.log(f"      ✗ No command given")
+                        continue
                     
-                    command_response = invoke_with_rate_limit(
-                        agent,
-                        [HumanMessage(content=command_prompt)],
-                        self.log_file,
-                        estimated_tokens=500
-                    )
+                    try:
+                        argv = _command_argv(command)
+                    except ValueError as e:
+                        self.log(f"      ✗ Cannot run command: {e}")
+                        continue
                     
-                    if command_response:
-                        command = command_response.content.strip().strip('`').strip('"').strip("'")
-                        project_path = self.react_path if component == 'frontend' else self.flask_path
+                    try:
+                        result = await asyncio.to_thread(
+                            subprocess.run,
+                            argv,
+                            cwd=project_path,
+                            capture_output=True,
+                            text=True,
+                            timeout=60
+                        )
                         
-                        try:
-                            result = subprocess.run(
-                                command,
-                                shell=True,
-                                cwd=project_path,
-                                capture_output=True,
-                                text=True,
-                                timeout=60
-                            )
-                            
-                            if result.returncode == 0:
-                                steps_executed += 1
-                                log_and_print(f"      ✓ Command succeeded", self.log_file)
-                            else:
-                                log_and_print(f"      ✗ Command failed: {result.stderr[:100]}", self.log_file)
-                        except Exception as e:
-                            log_and_print(f"      ✗ Command error: {e}", self.log_file)
+                        if result.returncode == 0:
+                            steps_executed += 1
+                            self.log(f"      ✓ Command succeeded")
+                        else:
+                            self.log(f"      ✗ Command failed: {result.stderr[:100]}")
+                    except Exception as e:
+                        self.log(f"      ✗ Command error: {e}")
             
             # Record fix result
             if steps_executed > 0:
                 self.fixes_applied.append({
                     "error": error,
                     "steps_executed": steps_executed,
-                    "total_steps": len(step_lines)
+                    "total_steps": len(steps)
                 })
                 
                 # Mark related defects as resolved
                 if self.defect_ledger and file_path:
-                    component_path = f"{component}/{os.path.basename(file_path)}"
-                    open_defects = self.defect_ledger.get_open_defects()
-                    for defect in open_defects:
-                        if defect.get('component') == component_path and defect.get('category') == 'runtime_error':
-                            self.defect_ledger.update_defect_status(
-                                defect['id'],
-                                DefectStatus.RESOLVED,
-                                "Kaizen Runtime Debugger",
-                                f"Fixed via {steps_executed} steps"
-                            )
+                    component_path = f"{component}/{file_name}"
+                    for defect_id in self._open_by_component.pop((component_path, 'runtime_error'), []):
+                        self.defect_ledger.update_defect_status(
+                            defect_id,
+                            DefectStatus.RESOLVED,
+                            "Kaizen Runtime Debugger",
+                            f"Fixed via {steps_executed} steps"
+                        )
                 
-                log_and_print(f"    ✓ Fixed error ({steps_executed}/{len(step_lines)} steps)", self.log_file)
+                self.log(f"    ✓ Fixed error ({steps_executed}/{len(steps)} steps)")
                 return True
             else:
-                log_and_print(f"    ✗ No steps could be executed", self.log_file)
+                self.log(f"    ✗ No steps could be executed")
                 return False
         
         except Exception as e:
-            log_and_print(f"    ✗ Fix failed: {e}", self.log_file)
+            self.log(f"    ✗ Fix failed: {e}")
             return False
     
     async def _edit_file_chunked(self, file_path: str, instructions: str, error_line: int = None) -> Dict[str, Any]:
@@ -553,7 +805,7 @@ Return ONLY the command, nothing else."""
         """
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+                lines = f.read().splitlines(keepends=True)
             
             total_lines = len(lines)
             chunk_size = 50
@@ -589,66 +841,56 @@ Start your response with the fixed code immediately."""
             
             # Use Kaizen's agent system
             agent = get_agent(temperature=0.2, max_tokens=2000)
-            response = invoke_with_rate_limit(
-                agent,
-                [HumanMessage(content=edit_prompt)],
-                self.log_file,
-                estimated_tokens=1500
-            )
+            response_text = await _invoke_cached(agent, edit_prompt, self.log_file, estimated_tokens=1500)
             
-            if not response:
+            if not response_text:
                 return {"success": False, "error": "No response from agent"}
             
-            fixed_chunk = response.content.strip()
-            
             # Remove markdown code fences
-            if fixed_chunk.startswith('```'):
-                fixed_chunk = '\n'.join(fixed_chunk.split('\n')[1:-1])
-            
-            # Replace chunk in original lines
-            fixed_lines = fixed_chunk.split('\n')
-            new_lines = (
-                lines[:start_line] +
-                [line + '\n' if not line.endswith('\n') else line for line in fixed_lines] +
-                lines[end_line:]
-            )
+            fixed_chunk = _strip_fences(response_text)
             
-            # Write back
+            if not fixed_chunk.endswith('\n'):
+                fixed_chunk += '\n'
+            
+            # Write back, splicing the fixed chunk between the untouched slices
             with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(new_lines)
+                f.write(''.join(lines[:start_line]))
+                f.write(fixed_chunk)
+                f.write(''.join(lines[end_line:]))
             
             return {"success": True, "lines_modified": end_line - start_line}
         
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def stop_projects(self):
+    async def _stop_process(self, process: asyncio.subprocess.Process):
+        """Terminate a process, killing it if it has not exited within 5s."""
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), 5)
+        except ProcessLookupError:
+            pass  # Already exited
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    
+    async def stop_projects(self):
         """Stop both running projects."""
-        if self.frontend_process:
-            try:
-                self.frontend_process.terminate()
-                self.frontend_process.wait(timeout=5)
-            except:
-                self.frontend_process.kill()
-            self.frontend_process = None
-        
-        if self.backend_process:
-            try:
-                self.backend_process.terminate()
-                self.backend_process.wait(timeout=5)
-            except:
-                self.backend_process.kill()
-            self.backend_process = None
+        processes = [p for p in (self.frontend_process, self.backend_process) if p]
+        await asyncio.gather(*(self._stop_process(p) for p in processes))
+        self.frontend_process = None
+        self.backend_process = None
         
-        log_and_print("  [Kaizen Debugger] Stopped all projects", self.log_file)
+        self.log("  [Kaizen Debugger] Stopped all projects")
+        self.flush_log()
     
     def get_summary(self) -> Dict[str, Any]:
         """Get debugging summary."""
         return {
-            "errors_detected": len(self.errors_detected),
+            "errors_detected": self._errors_count,
             "fixes_applied": len(self.fixes_applied),
-            "frontend_running": self.frontend_process is not None and self.frontend_process.poll() is None,
-            "backend_running": self.backend_process is not None and self.backend_process.poll() is None
+            "frontend_running": self.frontend_process is not None and self.frontend_process.returncode is None,
+            "backend_running": self.backend_process is not None and self.backend_process.returncode is None
         }
 
 
@@ -676,70 +918,70 @@ async def run_kaizen_runtime_debugging_async(react_path: str, flask_path: str, d
     debugger = KaizenRuntimeDebugger(react_path, flask_path, defect_ledger, rate_limiter, log_file)
     
     # Start projects
-    start_results = debugger.start_projects()
+    start_results = await debugger.start_projects()
     if not start_results["frontend"] and not start_results["backend"]:
-        log_and_print("  ✗ Failed to start projects. Cannot proceed with runtime debugging.", log_file)
+        debugger.log("  ✗ Failed to start projects. Cannot proceed with runtime debugging.")
+        debugger.close_log()
         return {"success": False, "reason": "projects_failed_to_start"}
     
     iteration = 1
     total_fixes = 0
     
     while iteration <= max_iterations:
-        log_and_print(f"\n[Iteration {iteration}/{max_iterations}]", log_file)
+        debugger.log(f"\n[Iteration {iteration}/{max_iterations}]")
         
         # Check for errors
-        errors = debugger.check_runtime_errors()
+        errors = await debugger.check_runtime_errors()
         total_errors = len(errors["frontend"]) + len(errors["backend"])
         
         if total_errors == 0:
-            log_and_print(f"  ✓ No runtime errors detected. Debugging complete.", log_file)
+            if debugger.repeated_errors:
+                debugger.log(f"  ⚠ Only previously recorded errors remain. Stopping to prevent re-fixing them.")
+            else:
+                debugger.log(f"  ✓ No runtime errors detected. Debugging complete.")
             break
         
         # Record errors to defect ledger
         debugger.record_errors_to_ledger(errors)
         
-        log_and_print(f"  Found {total_errors} runtime errors", log_file)
-        
-        # Fix errors (limit to top 2 per component to save tokens)
-        fixes_this_iteration = 0
+        debugger.log(f"  Found {total_errors} runtime errors")
         
-        # Fix backend errors
-        for error in errors["backend"][:2]:
-            if await debugger.fix_runtime_error(error):
-                fixes_this_iteration += 1
-        
-        # Fix frontend errors
-        for error in errors["frontend"][:2]:
-            if await debugger.fix_runtime_error(error):
-                fixes_this_iteration += 1
+        # Fix errors (limit to top 2 per component to save tokens);
+        # backend and frontend fixes are independent, so run them concurrently
+        results = await asyncio.gather(
+            *(debugger.fix_runtime_error(error) for error in errors["backend"][:2] + errors["frontend"][:2]),
+            return_exceptions=True
+        )
+        fixes_this_iteration = sum(1 for result in results if result is True)
         
         if fixes_this_iteration > 0:
             total_fixes += fixes_this_iteration
-            log_and_print(f"  ✓ Applied {fixes_this_iteration} fixes. Restarting projects...", log_file)
+            debugger.log(f"  ✓ Applied {fixes_this_iteration} fixes. Restarting projects...")
             
             # Restart projects to test fixes
-            debugger.stop_projects()
-            time.sleep(2)
-            debugger.start_projects()
-            time.sleep(5)  # Wait for restart
+            # start_projects returns once the ports accept connections
+            await debugger.stop_projects()
+            await debugger.start_projects()
         else:
-            log_and_print(f"  ⚠ No fixes could be applied. Stopping to prevent infinite loop.", log_file)
+            debugger.log(f"  ⚠ No fixes could be applied. Stopping to prevent infinite loop.")
             break
         
         iteration += 1
+        debugger.flush_log()
     
     # Final summary
     summary = debugger.get_summary()
     summary["iterations"] = iteration - 1
     summary["total_fixes"] = total_fixes
     
-    log_and_print(f"\n[Kaizen Debugger Summary]", log_file)
-    log_and_print(f"  Errors detected: {summary['errors_detected']}", log_file)
-    log_and_print(f"  Fixes applied: {summary['total_fixes']}", log_file)
-    log_and_print(f"  Iterations: {summary['iterations']}", log_file)
+    debugger.log(f"\n[Kaizen Debugger Summary]")
+    debugger.log(f"  Errors detected: {summary['errors_detected']}")
+    debugger.log(f"  Fixes applied: {summary['total_fixes']}")
+    debugger.log(f"  Iterations: {summary['iterations']}")
     
     # Stop projects
-    debugger.stop_projects()
+    await debugger.stop_projects()
+    debugger.close_log()
     
     return summary
 
@@ -749,8 +991,6 @@ def run_kaizen_runtime_debugging(react_path: str, flask_path: str, defect_ledger
     """
     Synchronous wrapper for async runtime debugging.
     """
-    import asyncio
-    
     try:
         # Try to get existing event loop
         loop = asyncio.get_event_loop()
@@ -14,15 +14,55 @@ import sys
 import time
 import subprocess
 import re
+import copy
+import random
+import asyncio
+import atexit
+import queue
+import hashlib
+import sqlite3
+import shelve
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from itertools import chain, islice
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
+# Optional: the Groq SDK's typed 429 error carries the server's Retry-After headers
+try:
+    import groq
+except ImportError:
+    groq = None
+
+# Optional: faster JSON parsing/serialization (falls back to the json module)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: vectorized similarity scan for the design cache
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional: real tokenizer for rate-limit budgeting (falls back to ~4 chars per token)
+try:
+    import tiktoken
+    _token_encoder = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    tiktoken = None
+    _token_encoder = None
+
 # Import local modules
 from defect_ledger import DefectLedger, DefectSeverity, DefectStatus
-from rate_limiter import RateLimiter
+from rate_limiter import RateLimiter, AdaptiveBudgetGuard, TokenBucket
 
 # Load environment variables
 load_dotenv()
@@ -37,12 +77,87 @@ if not os.getenv("GROQ_API_KEY"):
 
 # Global rate limiter (100k daily limit for Groq on-demand tier)
 _rate_limiter = RateLimiter(
-    requests_per_minute=30, 
+    requests_per_minute=int(os.getenv("KAIZEN_MAX_RPM", "30")),
     requests_per_hour=1000, 
-    tokens_per_minute=100000,
+    tokens_per_minute=int(os.getenv("KAIZEN_MAX_TPM", "100000")),
     tokens_per_day=100000  # Groq on-demand daily limit
 )
 
+# Phase budget checks and verification concurrency follow observed per-call usage
+_budget_guard = AdaptiveBudgetGuard(_rate_limiter)
+
+# Paces optional calls (consistency check, consolidation): a tenth of the per-minute
+# token rate, refilled to a full burst at the start of each cycle
+_token_bucket = TokenBucket(capacity=_rate_limiter.tokens_per_minute // 10, refill_per_sec=_rate_limiter.tokens_per_minute / 600)
+
+# A prefetched PLAN response is reused while less than this share of open defects changed
+PLAN_PREFETCH_MAX_DRIFT = 0.2
+
+# Severity strings in LLM verdicts -> ledger severities
+_SEVERITY_MAP = MappingProxyType({severity.value: severity for severity in DefectSeverity})
+
+# ACT resolves its defects in one batched request: shared preamble plus a per-defect share
+ACT_MAX_BATCH = 4
+ACT_PROMPT_TOKENS = 3000
+ACT_TOKENS_PER_DEFECT = 500
+
+# Characters of a component's source that go into refinement prompts; files
+# are read only this far
+REFINE_CODE_CHARS = 2000
+
+# Verification prompts carry at most VERIFY_CODE_TOKENS tokens of code (files are
+# read only as far as that many tokens can reach) and get a small completion
+# budget, since the reply is a short defects list
+VERIFY_CODE_TOKENS = 300
+VERIFY_CODE_CHARS = VERIFY_CODE_TOKENS * 8
+VERIFY_MAX_TOKENS = 800
+VERIFY_TIMEOUT = 20  # Seconds before a hung verification call is abandoned
+
+# Endpoint verifications are batched: up to VERIFY_BATCH_MAX endpoints and
+# VERIFY_BATCH_CODE_TOKENS tokens of code per request, with a completion budget
+# that grows by VERIFY_TOKENS_PER_EXTRA_ENDPOINT for each endpoint after the first
+VERIFY_BATCH_MAX = 4
+VERIFY_BATCH_CODE_TOKENS = 1200
+VERIFY_TOKENS_PER_EXTRA_ENDPOINT = 400
+
+# Instructions shared by every verification request. They are sent as the
+# leading system message, byte-identical on every call, so provider-side prompt
+# caching can reuse the prefix; only the component and its code follow
+VERIFY_SYSTEM = """You are a Verification Agent inspecting generated web application code for defects: syntax, logic, error handling (try-except for DB ops), input validation, accessibility, security, performance, route functionality, data completeness, error responses, edge cases, code quality.
+
+Reply with JSON only. Each defect is {"description": str, "severity": "critical|high|medium|low|minor", "category": "syntax|logic|security|performance|quality", "line_number": int, "suggestion": str}.
+For a single COMPONENT reply {"defects": [defect, ...]}.
+For numbered ENDPOINT blocks reply {"results": [{"endpoint_index": int, "defects": [defect, ...]}]} with one result per endpoint (empty defects list if none)."""
+
+# Defects and improvements listed in a refinement prompt
+REFINE_PROMPT_DEFECTS = 5
+REFINE_PROMPT_IMPROVEMENTS = 3
+
+# Assumed cost of verifying a component that has not been measured yet
+VERIFY_DEFAULT_TOKENS = 2000
+
+# Upper bound on verifications in flight, under the adaptive AIMD limit
+VERIFY_MAX_CONCURRENCY = max(1, int(os.getenv("KAIZEN_VERIFY_CONCURRENCY", "8")))
+
+# Server-suggested retry delay in 429 error messages
+_RATE_LIMIT_WAIT_RE = re.compile(r'try again in ([\d.]+)s')
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's retry-after-ms / retry-after headers from an HTTP client error, if present."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
 # Global defect ledger (will be initialized in main)
 _defect_ledger: Optional[DefectLedger] = None
 
@@ -55,7 +170,101 @@ def get_defect_ledger() -> Optional[DefectLedger]:
     """Get the global defect ledger instance."""
     return _defect_ledger
 
+
+def _ledger_transaction():
+    """Batch the ledger writes of one PDCA phase into a single flush (no-op without a ledger)."""
+    return _defect_ledger.transaction() if _defect_ledger else nullcontext()
+
+def json_loads(data):
+    """Parse JSON text, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps_compact(data: Any) -> str:
+    """Serialize data to compact JSON for embedding in prompts."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"))
+
+
+def json_dumps_indent(data: Any) -> str:
+    """Serialize data to 2-space indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2)
+
+
+def write_json(filepath: str, data: Any):
+    """Write data as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def _file_lock(path: str) -> threading.Lock:
+    """Per-file lock for read-modify-write sequences shared by implementation agents."""
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def write_text_atomic(path: str, text: str):
+    """Write text to a temp file beside path and os.replace it in, so a crash never leaves a half-written file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 # Metrics tracking
+class CycleMemento:
+    """
+    Compact record of one component's defect state, carried between PDCA cycles
+    in place of the raw defect descriptions.
+    """
+    def __init__(self, component: str, severity: str, root_cause_1line: str, status: str = "open"):
+        self.component = component
+        self.severity = severity
+        self.root_cause_1line = root_cause_1line
+        self.status = status
+    
+    @classmethod
+    def from_defect(cls, defect: Dict[str, Any]) -> 'CycleMemento':
+        """Build a memento without an LLM call: first sentence of the description, capped at 100 chars."""
+        cause = defect.get('description', '').strip().split('\n', 1)[0].split('. ', 1)[0]
+        return cls(defect.get('component', ''), defect.get('severity', 'medium'), cause[:100], defect.get('status', 'open'))
+
+
+class CycleSnapshot:
+    """
+    Open defects and ledger statistics captured once per PDCA cycle and shared
+    by the phases that only read them (PLAN and DO).
+    """
+    def __init__(self, open_defects: List[Dict[str, Any]], stats: Dict[str, Any]):
+        self.open_defects = open_defects
+        self.stats = stats
+        self.critical_high = {d['component'] for d in open_defects if d['severity'] in ('critical', 'high')}
+    
+    @classmethod
+    def capture(cls, ledger: Optional[DefectLedger]) -> 'CycleSnapshot':
+        if not ledger:
+            return cls([], {})
+        return cls(ledger.get_open_defects(), ledger.get_statistics())
+
+
 class KaizenMetrics:
     """Track metrics for Kaizen methodology."""
     def __init__(self):
@@ -66,8 +275,18 @@ class KaizenMetrics:
         self.defects_found = 0
         self.defects_resolved = 0
         self.waste_eliminations = 0
-        self.start_time = datetime.now()
-        self.cycle_times = []
+        # Durations use the monotonic clock; wall-clock time is only needed for the saved report
+        self._start_monotonic = time.monotonic()
+        self._start_wall = datetime.now()
+        self._cycle_time_sum = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.mementos: List[CycleMemento] = []
+        self.pending_plan: Optional[Dict[str, Any]] = None
+        # component -> (time of last refinement, defect/improvement ids its prompt showed)
+        self.last_refined: Dict[str, Tuple[float, frozenset]] = {}
+        # component -> tokens its last verification call used
+        self.tokens_per_component: Dict[str, int] = {}
     
     def add_tokens(self, count: int):
         self.total_tokens += count
@@ -77,12 +296,11 @@ class KaizenMetrics:
     
     def record_pdca_cycle(self, cycle_time: float):
         self.pdca_cycles += 1
-        self.cycle_times.append(cycle_time)
+        self._cycle_time_sum += cycle_time
     
     def get_metrics(self) -> Dict[str, Any]:
-        end_time = datetime.now()
-        duration = (end_time - self.start_time).total_seconds()
-        avg_cycle_time = sum(self.cycle_times) / len(self.cycle_times) if self.cycle_times else 0
+        duration = time.monotonic() - self._start_monotonic
+        avg_cycle_time = self._cycle_time_sum / self.pdca_cycles if self.pdca_cycles else 0
         
         return {
             "total_tokens": self.total_tokens,
@@ -92,21 +310,382 @@ class KaizenMetrics:
             "defects_found": self.defects_found,
             "defects_resolved": self.defects_resolved,
             "waste_eliminations": self.waste_eliminations,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
             "duration_seconds": duration,
-            "average_cycle_time_seconds": avg_cycle_time,
-            "start_time": self.start_time.isoformat(),
-            "end_time": end_time.isoformat()
+            "average_cycle_time_seconds": avg_cycle_time
         }
     
     def save(self, filepath: str):
         metrics = self.get_metrics()
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(metrics, f, indent=2)
+        metrics["start_time"] = self._start_wall.isoformat()
+        metrics["end_time"] = datetime.now().isoformat()
+        write_json(filepath, metrics)
 
 _metrics = KaizenMetrics()
 
 
-def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: int = 3, estimated_tokens: int = 1000) -> Any:
+class LLMCache:
+    """
+    On-disk cache of deterministic LLM responses.
+    Keyed by a SHA-256 of (model, messages, temperature, max_tokens) and
+    stored in a SQLite file that is opened on first use. Set
+    KAIZEN_LLM_CACHE=false to always call the API.
+    """
+    # Above this temperature responses are too varied to reuse
+    MAX_TEMPERATURE = 0.2
+    
+    def __init__(self, cache_dir: str = ".llm_cache"):
+        self.cache_dir = cache_dir
+        self.enabled = os.getenv("KAIZEN_LLM_CACHE", "true").lower() == "true"
+        self._db = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.cache_dir, "responses.db"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        return self._db
+    
+    @classmethod
+    def cache_key(cls, agent, messages) -> Optional[str]:
+        """Return the cache key for a request, or None if it should not be cached."""
+        temperature = getattr(agent, 'temperature', None)
+        if temperature is None or temperature > cls.MAX_TEMPERATURE:
+            return None
+        payload = json.dumps({
+            "model": getattr(agent, 'model_name', None),
+            "messages": [(m.type, m.content) for m in messages],
+            "temperature": temperature,
+            "max_tokens": getattr(agent, 'max_tokens', None),
+            # json_mode and timeout are part of an agent's identity in get_agent
+            "model_kwargs": getattr(agent, 'model_kwargs', None) or {},
+            "timeout": getattr(agent, 'request_timeout', None)
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def put(self, key: str, content: str):
+        with self._lock:
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO responses (key, content) VALUES (?, ?)", (key, content))
+            db.commit()
+
+_llm_cache = LLMCache()
+
+
+class VerificationCache:
+    """
+    Persistent memo of verification verdicts keyed by a SHA-256 of the
+    inspected code, so unchanged components are not re-verified in later
+    cycles or runs. A bounded in-memory LRU sits in front of a shelve file
+    in the cache directory. Bump PROMPT_VERSION when the verification
+    prompts change. Set KAIZEN_VERIFY_CACHE=false to always re-verify.
+    """
+    PROMPT_VERSION = "4"
+    MAX_ENTRIES = 512
+    SYNC_EVERY = 16  # Verdicts stored between shelf syncs; the rest are synced on exit
+    
+    def __init__(self, cache_dir: str = ".llm_cache"):
+        self.cache_dir = cache_dir
+        self.enabled = os.getenv("KAIZEN_VERIFY_CACHE", "true").lower() == "true"
+        self._shelf = None
+        self._memory: OrderedDict = OrderedDict()
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+    
+    def _open(self):
+        if self._shelf is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._shelf = shelve.open(os.path.join(self.cache_dir, "verify"))
+        return self._shelf
+    
+    @classmethod
+    def key(cls, component_type: str, label: str, code: str) -> str:
+        payload = "\0".join((cls.PROMPT_VERSION, component_type, label, code))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return copy.deepcopy(self._memory[key])
+            shelf = self._open()
+            if key not in shelf:
+                return None
+            found = shelf[key]
+            self._remember(key, found)
+            return copy.deepcopy(found)
+    
+    def put(self, key: str, found_defects: List[Dict[str, Any]]):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, found_defects)
+            shelf = self._open()
+            shelf[key] = found_defects
+            self._unsynced += 1
+            if self._unsynced >= self.SYNC_EVERY:
+                shelf.sync()
+                self._unsynced = 0
+    
+    def close(self):
+        with self._lock:
+            if self._shelf is not None:
+                self._shelf.close()
+                self._shelf = None
+                self._unsynced = 0
+    
+    def _remember(self, key: str, found_defects: List[Dict[str, Any]]):
+        self._memory[key] = found_defects
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.MAX_ENTRIES:
+            self._memory.popitem(last=False)
+
+_verification_cache = VerificationCache()
+
+
+class SemanticCache:
+    """
+    Reuses an earlier application design when a new description and feature
+    list mean nearly the same thing. With sentence-transformers installed,
+    texts are embedded with all-MiniLM-L6-v2 and a lookup is a cosine-similarity
+    scan over all stored entries; without it only an exact match on the
+    normalized request text (case and whitespace folded) is reused, since
+    bag-of-words similarity cannot tell "users can" from "users cannot".
+    Entries persist as JSON under the cache directory and are re-embedded on load.
+    Set KAIZEN_DESIGN_CACHE=false to always design from scratch.
+    """
+    THRESHOLD = 0.95
+    MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+    
+    def __init__(self, cache_dir: str = ".llm_cache"):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, "designs.json")
+        self.enabled = os.getenv("KAIZEN_DESIGN_CACHE", "true").lower() == "true"
+        self._entries: Optional[List[Dict[str, Any]]] = None
+        self._vectors: List[List[float]] = []
+        self._model = None
+        self._model_checked = False
+    
+    @staticmethod
+    def _request_text(description: str, features: List[str]) -> str:
+        return description.strip() + "\n" + json.dumps(features)
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+    
+    def _get_model(self):
+        if not self._model_checked:
+            self._model_checked = True
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.MODEL_NAME)
+            except ImportError:
+                self._model = None
+        return self._model
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Return unit-length embeddings for the given texts (empty without sentence-transformers)."""
+        model = self._get_model()
+        if model is None:
+            return []
+        return model.encode(texts, normalize_embeddings=True).tolist()
+    
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                self._entries = json_loads(f.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = []
+        self._vectors = self._embed([entry["text"] for entry in self._entries]) if self._entries else []
+    
+    def get(self, description: str, features: List[str]) -> Optional[Tuple[Dict[str, Any], float, str]]:
+        """
+        Return (design, similarity, matched request text) for the closest stored
+        request above THRESHOLD (exact normalized match without an embedding model), or None.
+        """
+        if not self.enabled:
+            return None
+        self._load()
+        if not self._entries:
+            return None
+        
+        text = self._request_text(description, features)
+        if not self._vectors:
+            normalized = self._normalize(text)
+            for entry in reversed(self._entries):
+                if self._normalize(entry["text"]) == normalized:
+                    return copy.deepcopy(entry["design"]), 1.0, entry["text"]
+            return None
+        
+        query = self._embed([text])[0]
+        if np is not None:
+            similarities = (np.asarray(self._vectors) @ np.asarray(query)).tolist()
+        else:
+            similarities = [sum(a * b for a, b in zip(vector, query)) for vector in self._vectors]
+        
+        best = max(range(len(similarities)), key=similarities.__getitem__)
+        if similarities[best] < self.THRESHOLD:
+            return None
+        return copy.deepcopy(self._entries[best]["design"]), similarities[best], self._entries[best]["text"]
+    
+    def put(self, description: str, features: List[str], design: Dict[str, Any]):
+        """Store a design and persist the cache file (temp file + os.replace)."""
+        if not self.enabled:
+            return
+        self._load()
+        text = self._request_text(description, features)
+        self._entries.append({"text": text, "design": design})
+        self._vectors.extend(self._embed([text]))
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+_design_cache = SemanticCache()
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, otherwise estimate ~4 characters per token."""
+    if _token_encoder is not None:
+        return len(_token_encoder.encode(text, disallowed_special=()))
+    return len(text) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens (tiktoken when available, otherwise ~4 characters per token)."""
+    if _token_encoder is not None:
+        tokens = _token_encoder.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else _token_encoder.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def estimate_request_tokens(agent, messages) -> int:
+    """Worst-case token cost of a request: the prompt plus the agent's full completion budget."""
+    prompt_tokens = sum(count_tokens(m.content if isinstance(m.content, str) else str(m.content)) for m in messages)
+    return prompt_tokens + (getattr(agent, 'max_tokens', None) or 0)
+
+
+class _JsonObjectScanner:
+    """
+    Incremental brace-depth scanner for the first top-level JSON object in a
+    text fed in chunks. Braces inside string literals (including escaped
+    quotes) are ignored, so each character is looked at exactly once.
+    A balanced span is only a candidate: callers parse it and, if it is not
+    valid JSON, restart() just past its opening brace and re-feed the rest.
+    """
+    __slots__ = ('offset', 'start', 'depth', 'in_string', 'escaped')
+    
+    def __init__(self, offset: int = 0):
+        self.restart(offset)
+    
+    def restart(self, offset: int):
+        """Forget the current span and resume scanning at the given text offset."""
+        self.offset = offset  # Length of the text fed so far
+        self.start = -1  # Offset of the object's opening brace
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> int:
+        """Scan the next chunk; return the offset just past the object's closing brace, or -1 while it is open."""
+        for i, ch in enumerate(chunk):
+            if self.depth == 0:
+                if ch == '{':
+                    self.depth = 1
+                    self.start = self.offset + i
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+            elif ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    return self.offset + i + 1
+        self.offset += len(chunk)
+        return -1
+
+
+def _stream_until_json(agent, messages) -> AIMessage:
+    """
+    Stream a response and stop reading once the first JSON object in it is
+    complete and parses. Chunks go through a _JsonObjectScanner as they arrive,
+    so the end of a candidate object is spotted on the chunk that closes it; a
+    balanced span that is not valid JSON (e.g. "{app}" in leading prose) is
+    skipped and scanning resumes just past its opening brace. The returned
+    AIMessage holds just the object's text (or the whole response if no object
+    parses) and carries token usage in the same response_metadata shape as
+    agent.invoke.
+    """
+    scanner = _JsonObjectScanner()
+    parts: List[str] = []
+    total_tokens = 0
+    content = None
+    stream = agent.stream(messages)
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, 'usage_metadata', None)
+            if usage:
+                total_tokens = usage.get('total_tokens', 0) or total_tokens
+            parts.append(chunk.content)
+            end = scanner.feed(chunk.content)
+            while end >= 0:
+                text = ''.join(parts)
+                parts = [text]
+                try:
+                    json_loads(text[scanner.start:end])
+                except ValueError:
+                    resume = scanner.start + 1
+                    scanner.restart(resume)
+                    end = scanner.feed(text[resume:])
+                    continue
+                content = text[scanner.start:end]
+                break
+            if content is not None:
+                break
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+    
+    if content is None:
+        content = ''.join(parts)
+    if not total_tokens:
+        # Stopped before the server reported usage: estimate what was consumed
+        total_tokens = sum(count_tokens(str(m.content)) for m in messages) + count_tokens(content)
+    return AIMessage(content=content, response_metadata={'token_usage': {'total_tokens': total_tokens}})
+
+
+def _response_tokens(response) -> int:
+    """Total tokens reported in a response's metadata (0 when the provider reported none)."""
+    metadata = getattr(response, 'response_metadata', None)
+    if not metadata:
+        return 0
+    return (metadata.get('token_usage') or {}).get('total_tokens', 0)
+
+
+def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: int = 3, estimated_tokens: int = None, stream_json: bool = False, cache_if: Optional[Callable[[str], bool]] = None) -> Any:
     """
     Invoke agent with rate limiting and metrics tracking.
     Handles 429 rate limit errors with exponential backoff.
@@ -116,13 +695,30 @@ def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: i
         messages: List of messages
         log_file: Optional log file path
         max_retries: Maximum retry attempts for rate limit errors
-        estimated_tokens: Estimated tokens for this request
+        estimated_tokens: Estimated tokens for this request (defaults to estimate_request_tokens)
+        stream_json: Stream the response and stop once its first JSON object is complete
+        cache_if: Check that a reply is usable before it enters the LLM cache (e.g. _has_json_object);
+            a rejected reply is returned but not cached, so the same request is sent again next time
     
     Returns:
         Agent response or None if rate limit exceeded
     """
     global _rate_limiter, _metrics
     
+    # Identical deterministic requests are answered from the cache without touching the rate limiter
+    cache_key = _llm_cache.cache_key(agent, messages) if _llm_cache.enabled else None
+    if cache_key:
+        cached = _llm_cache.get(cache_key)
+        if cached is not None:
+            _metrics.cache_hits += 1
+            if log_file:
+                log_and_print("[LLM Cache] Hit", log_file)
+            return AIMessage(content=cached)
+        _metrics.cache_misses += 1
+    
+    if estimated_tokens is None:
+        estimated_tokens = estimate_request_tokens(agent, messages)
+    
     # Check if we can make the request (check daily limit first)
     remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
     if remaining_tokens < estimated_tokens:
@@ -131,8 +727,9 @@ def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: i
         # Raise exception instead of returning None - let caller handle it properly
         raise Exception(f"Daily token limit exceeded. Remaining: {remaining_tokens} tokens. Cannot proceed without sufficient tokens.")
     
-    # Wait if needed
+    # Wait if needed, then reserve per-minute capacity before sending
     wait_time = _rate_limiter.wait_if_needed()
+    wait_time += _rate_limiter.wait_for_capacity(estimated_tokens)
     if wait_time > 0 and log_file:
         log_and_print(f"[Rate Limiter] Waited {wait_time:.2f}s", log_file)
     
@@ -140,19 +737,20 @@ def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: i
     for attempt in range(max_retries):
         try:
             # Invoke agent
-            response = agent.invoke(messages)
+            response = _stream_until_json(agent, messages) if stream_json else agent.invoke(messages)
             
             # Track token usage
-            if hasattr(response, 'response_metadata') and response.response_metadata:
-                token_usage = response.response_metadata.get('token_usage', {})
-                if token_usage:
-                    total_tokens = token_usage.get('total_tokens', 0)
-                    if total_tokens:
-                        _rate_limiter.record_request(tokens_used=total_tokens)
-                        _metrics.add_tokens(total_tokens)
-                        _metrics.add_request()
-                        if log_file:
-                            log_and_print(f"[Tokens: {total_tokens}]", log_file)
+            total_tokens = _response_tokens(response)
+            if total_tokens:
+                _rate_limiter.record_request(tokens_used=total_tokens, reserved_tokens=estimated_tokens)
+                _budget_guard.record_call(total_tokens)
+                _metrics.add_tokens(total_tokens)
+                _metrics.add_request()
+                if log_file:
+                    log_and_print(f"[Tokens: {total_tokens}]", log_file)
+            
+            if cache_key and (cache_if is None or cache_if(response.content)):
+                _llm_cache.put(cache_key, response.content)
             
             return response
             
@@ -160,19 +758,25 @@ def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: i
             error_str = str(e)
             
             # Check if it's a rate limit error (429)
-            if '429' in error_str or 'rate_limit' in error_str.lower() or 'Rate limit' in error_str:
+            err_lc = error_str.lower()
+            is_groq_429 = groq is not None and isinstance(e, groq.RateLimitError)
+            if is_groq_429 or '429' in err_lc or 'rate_limit' in err_lc or 'rate limit' in err_lc:
                 _rate_limiter.record_rate_limit_error()
+                _budget_guard.record_rate_limit()
+                _token_bucket.drain()
                 
-                # Extract wait time from error message if available
-                wait_seconds = 60  # Default wait time
-                if 'try again in' in error_str:
-                    try:
-                        import re
-                        match = re.search(r'try again in ([\d.]+)s', error_str)
-                        if match:
+                # Prefer the server's Retry-After headers, then the wait time in the message
+                wait_seconds = _retry_after_seconds(e)
+                if wait_seconds is None:
+                    wait_seconds = 60  # Default wait time
+                    match = _RATE_LIMIT_WAIT_RE.search(error_str)
+                    if match:
+                        try:
                             wait_seconds = float(match.group(1)) + 5  # Add 5s buffer
-                    except:
-                        pass
+                        except ValueError:
+                            pass
+                # Jitter keeps concurrent implementation agents from retrying in lockstep
+                wait_seconds += random.uniform(0, 1)
                 
                 if attempt < max_retries - 1:
                     if log_file:
@@ -190,23 +794,190 @@ def invoke_with_rate_limit(agent, messages, log_file: str = None, max_retries: i
     return None
 
 
-def log_and_print(message: str, log_file: str = None):
-    """Helper to print and log simultaneously."""
+async def _run_all(funcs: List[Callable[[], Any]], max_concurrency: int) -> List[Any]:
+    """Run blocking callables in worker threads, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def run(func):
+        async with semaphore:
+            return await asyncio.to_thread(func)
+    
+    return await asyncio.gather(*(run(func) for func in funcs))
+
+
+def _run_parallel(funcs: List[Callable[[], Any]], max_concurrency: int = None) -> List[Any]:
+    """
+    Synchronous entry point for _run_all. Concurrency defaults to one worker per
+    implementation agent, capped by what the per-minute request limit can sustain.
+    """
+    if max_concurrency is None:
+        max_concurrency = max(1, min(3, _rate_limiter.requests_per_minute // 10))
+    return asyncio.run(_run_all(funcs, max_concurrency))
+
+
+# First fenced code block in an LLM reply; an unclosed fence runs to the end of the text
+_CODE_FENCE_RE = re.compile(r'```(?:jsx|javascript|js|python|py)?[ \t]*\n?(.*?)(?:```|\Z)', re.DOTALL)
+
+
+def _strip_code_fence(text: str) -> str:
+    """Return the body of the first fenced code block, or the text unchanged when it has none."""
+    match = _CODE_FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def _extract_first_json(text: str) -> Optional[Dict]:
+    """
+    Parse the first complete JSON object embedded in an LLM response.
+    A _JsonObjectScanner finds the balanced {...} span in one quote-aware pass,
+    so trailing prose, fences and braces inside strings are ignored; a span that
+    is not valid JSON is skipped and scanning resumes just past its opening
+    brace, the same way _stream_until_json does.
+    """
+    scanner = _JsonObjectScanner()
+    end = scanner.feed(text)
+    while end >= 0:
+        try:
+            return json_loads(text[scanner.start:end])
+        except ValueError:
+            resume = scanner.start + 1
+            scanner.restart(resume)
+            end = scanner.feed(text[resume:])
+    # No object closes and parses (e.g. a truncated response)
+    return None
+
+
+def _has_json_object(text: str) -> bool:
+    """cache_if check for replies that are only usable when they hold a JSON object."""
+    return _extract_first_json(text) is not None
+
+
+class BufferedLogger:
+    """
+    Long-lived, buffered append handle for one log file.
+    Lines are written to a 64 KB userspace buffer and reach the file on flush().
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, 'a', encoding='utf-8', buffering=64 * 1024)
+        self._lock = threading.Lock()
+    
+    def write(self, message: str):
+        with self._lock:
+            self.f.write(message + '\n')
+    
+    def flush(self):
+        # Lines still queued by worker threads belong before the flush
+        _log_queue.join()
+        with self._lock:
+            if not self.f.closed:
+                self.f.flush()
+    
+    def close(self):
+        _log_queue.join()
+        with self._lock:
+            if not self.f.closed:
+                self.f.close()
+
+# One logger per log file path, shared by every writer of that file
+_loggers: Dict[str, BufferedLogger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_logger(log_file: Union[str, BufferedLogger]) -> BufferedLogger:
+    """Return the shared BufferedLogger for a log file path (or the logger itself)."""
+    if isinstance(log_file, BufferedLogger):
+        return log_file
+    logger = _loggers.get(log_file)
+    if logger is None:
+        with _loggers_lock:
+            logger = _loggers.get(log_file)
+            if logger is None:
+                logger = _loggers[log_file] = BufferedLogger(log_file)
+    return logger
+
+
+# Worker threads hand their log lines to one writer thread instead of
+# contending for stdout and the log file locks
+_log_queue: queue.Queue = queue.Queue()
+_log_writer_thread: Optional[threading.Thread] = None
+_log_writer_lock = threading.Lock()
+
+
+def _emit_log(logger: Optional[BufferedLogger], message: str):
     print(message)
-    if log_file:
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(message + '\n')
+    if logger is not None:
+        logger.write(message)
+
+
+def _log_writer():
+    while True:
+        logger, message = _log_queue.get()
+        try:
+            _emit_log(logger, message)
+        except Exception:
+            pass  # A failed write must not stop the writer and leave join() waiting
+        finally:
+            _log_queue.task_done()
+
+
+def _start_log_writer():
+    global _log_writer_thread
+    with _log_writer_lock:
+        if _log_writer_thread is None:
+            _log_writer_thread = threading.Thread(target=_log_writer, name="kaizen-log-writer", daemon=True)
+            _log_writer_thread.start()
+
+
+def flush_logs():
+    """Flush every open log file."""
+    for logger in list(_loggers.values()):
+        logger.flush()
+
+
+@atexit.register
+def _close_logs():
+    for logger in list(_loggers.values()):
+        logger.close()
+
+
+def log_and_print(message: str, log_file: Union[str, BufferedLogger] = None):
+    """
+    Helper to print and log simultaneously.
+    Worker threads queue the line for the background writer; the main thread
+    first waits for queued lines, then writes directly, so its output stays in
+    order with its own print() calls.
+    """
+    logger = get_logger(log_file) if log_file else None
+    if threading.current_thread() is threading.main_thread():
+        _log_queue.join()
+        _emit_log(logger, message)
+    else:
+        _start_log_writer()
+        _log_queue.put((logger, message))
 
 
-def get_agent(model: str = "llama-3.3-70b-versatile", temperature: float = 0.3, max_tokens: int = 4000) -> ChatGroq:
-    """Get a ChatGroq agent instance."""
+def get_agent(model: str = "llama-3.3-70b-versatile", temperature: float = 0.3, max_tokens: int = 4000, timeout: Optional[float] = None, json_mode: bool = False) -> ChatGroq:
+    """
+    Get a ChatGroq agent instance.
+    Instances are cached per (model, temperature, max_tokens, timeout, json_mode) and shared by all callers,
+    worker threads included (the underlying HTTP client is thread-safe).
+    With json_mode the API is asked for a JSON object response (response_format=json_object);
+    the prompt must still mention JSON, and such responses cannot be streamed.
+    """
     # Optimized token limits: design needs more (6000), others capped at 4000
-    if max_tokens > 6000:
-        max_tokens = 6000
+    # Arguments are normalized first so keyword/positional calls and clamped
+    # limits share one cache entry
+    return _cached_agent(model, float(temperature), min(max_tokens, 6000), timeout, bool(json_mode))
+
+
+@lru_cache(maxsize=16)
+def _cached_agent(model: str, temperature: float, max_tokens: int, timeout: Optional[float], json_mode: bool) -> ChatGroq:
     return ChatGroq(
         model=model,
         temperature=temperature,
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
+        timeout=timeout,
+        model_kwargs={"response_format": {"type": "json_object"}} if json_mode else {}
     )
 
 
@@ -252,7 +1023,7 @@ Your job is to:
 Be thorough and ask specific questions. Don't accept vague descriptions - always clarify until you have enough detail to build a functional application.""")
     ]
     
-    # Initial greeting
+    # Initial greeting (the same agent serves the whole conversation)
     agent = get_agent()
     initial_response = invoke_with_rate_limit(
         agent,
@@ -273,7 +1044,6 @@ Be thorough and ask specific questions. Don't accept vague descriptions - always
         
         conversation_history.append(HumanMessage(content=user_input))
         
-        agent = get_agent()
         response = invoke_with_rate_limit(agent, conversation_history, log_file)
         print(f"\nAgent: {response.content}\n")
         conversation_history.append(response)
@@ -281,19 +1051,12 @@ Be thorough and ask specific questions. Don't accept vague descriptions - always
         # Try to extract JSON from response
         content = response.content.strip()
         if "{" in content and "detailed_description" in content:
-            try:
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = content[json_start:json_end]
-                    parsed = json.loads(json_str)
-                    if "detailed_description" in parsed and "features" in parsed:
-                        requirements = parsed
-                        requirements["is_finalized"] = True
-                        print("\n✓ Requirements finalized!")
-                        break
-            except json.JSONDecodeError:
-                pass
+            parsed = _extract_first_json(content)
+            if parsed and "detailed_description" in parsed and "features" in parsed:
+                requirements = parsed
+                requirements["is_finalized"] = True
+                print("\n✓ Requirements finalized!")
+                break
         
         log_and_print(f"User: {user_input}", log_file)
         log_and_print(f"Agent: {content}", log_file)
@@ -308,38 +1071,12 @@ Be thorough and ask specific questions. Don't accept vague descriptions - always
     return requirements
 
 
-def design_application_kaizen(description: str, features: List[str]) -> Dict[str, Any]:
-    """
-    Phase 2: Application design using Kaizen approach with Improvement Coordinator.
-    Uses chain-of-thought processing for better design quality.
-    """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    logs_dir = "logs"
-    os.makedirs(logs_dir, exist_ok=True)
-    log_file = os.path.join(logs_dir, f"kaizen_design_{timestamp}.log")
-    
-    print("\n" + "="*70)
-    print("KAIZEN: APPLICATION DESIGN (Improvement Coordinator)")
-    print("-" * 70)
-    
-    # Check token budget before design phase
-    global _rate_limiter
-    remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
-    if remaining_tokens < 15000:
-        log_and_print(f"  [WARNING] Low token budget for design phase: {remaining_tokens:,}", log_file)
-        if remaining_tokens < 8000:
-            raise Exception(f"Design phase cannot proceed - insufficient tokens. Remaining: {remaining_tokens}, needed: ~8000")
-    
-    # Improvement Coordinator designs the application
-    # Design phase needs more tokens because JSON can be large - use 6000 for design
-    coordinator_agent = get_agent(temperature=0.3, max_tokens=6000)  # Increased for complete JSON generation
-    
-    # Optimized design prompt - concise but complete
-    design_prompt = f"""Design a complete software application based ONLY on the provided requirements. Infer everything from the description - do not assume or add unmentioned features.
+# Coordinator design prompt; filled in with str.format(description=..., features_json=...)
+_DESIGN_PROMPT_TEMPLATE = """Design a complete software application based ONLY on the provided requirements. Infer everything from the description - do not assume or add unmentioned features.
 
 REQUIREMENTS:
 Description: {description}
-Features: {json.dumps(features, indent=2)}
+Features: {features_json}
 
 RULES:
 - Infer application type from description (do not assume)
@@ -420,94 +1157,139 @@ Return JSON in this format:
 
 Requirements: All pages need requirements and endpoints. All endpoints need request/response structures. UI theme from description or appropriate defaults. Data models match entities."""
 
+
+@lru_cache(maxsize=32)
+def _features_json(features: Tuple[str, ...]) -> str:
+    """Indented JSON of a feature list, memoized across design attempts and reruns."""
+    return json_dumps_indent(list(features))
+
+
+def design_application_kaizen(description: str, features: List[str]) -> Dict[str, Any]:
+    """
+    Phase 2: Application design using Kaizen approach with Improvement Coordinator.
+    Uses chain-of-thought processing for better design quality.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    logs_dir = "logs"
+    os.makedirs(logs_dir, exist_ok=True)
+    log_file = os.path.join(logs_dir, f"kaizen_design_{timestamp}.log")
+    
+    print("\n" + "="*70)
+    print("KAIZEN: APPLICATION DESIGN (Improvement Coordinator)")
+    print("-" * 70)
+    
+    # Reuse a design produced earlier for a near-identical request
+    cached = _design_cache.get(description, features)
+    if cached:
+        design, similarity, matched_text = cached
+        log_and_print(f"  [Semantic Cache] Reusing design from a similar request (similarity {similarity:.3f})", log_file)
+        log_and_print(f"  [Semantic Cache] Matched request: {matched_text[:300]}", log_file)
+        log_and_print(f"\n✓ Design complete: {len(design.get('frontend', {}).get('pages', []))} pages, {len(design.get('backend', {}).get('endpoints', []))} endpoints", log_file)
+        return design
+    
+    # Check token budget before design phase
+    global _rate_limiter
+    remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
+    if remaining_tokens < 15000:
+        log_and_print(f"  [WARNING] Low token budget for design phase: {remaining_tokens:,}", log_file)
+        if remaining_tokens < 8000:
+            raise Exception(f"Design phase cannot proceed - insufficient tokens. Remaining: {remaining_tokens}, needed: ~8000")
+    
+    # Improvement Coordinator designs the application
+    # Design phase needs more tokens because JSON can be large - use 6000 for design
+    coordinator_agent = get_agent(temperature=0.3, max_tokens=6000)  # Increased for complete JSON generation
+    
+    # Optimized design prompt - concise but complete
+    try:
+        features_json = _features_json(tuple(features))
+    except TypeError:  # Unhashable feature entries (e.g. dicts from a free-form requirements reply)
+        features_json = json_dumps_indent(features)
+    design_prompt = _DESIGN_PROMPT_TEMPLATE.format(description=description, features_json=features_json)
+
     log_and_print(f"\n[Improvement Coordinator] Designing application...", log_file)
     
     # Try up to 2 times to get valid JSON
     max_retries = 2
     for attempt in range(max_retries):
         try:
-            # Estimate tokens needed (prompt + response)
-            prompt_tokens = len(design_prompt) // 4
-            estimated_total = prompt_tokens + 5000  # Reduced from 6000
-            response = invoke_with_rate_limit(coordinator_agent, [HumanMessage(content=design_prompt)], log_file, estimated_tokens=estimated_total)
+            response = invoke_with_rate_limit(coordinator_agent, [HumanMessage(content=design_prompt)], log_file, stream_json=True)
             content = response.content.strip()
             
             log_and_print(f"\n[Improvement Coordinator Response] (Attempt {attempt + 1}/{max_retries})\n{content[:2000]}...", log_file)
             
             # Extract JSON from response
+            design = _extract_first_json(content)
+            if design is not None:
+                # Ensure structure is complete
+                if "frontend" not in design:
+                    design["frontend"] = {"pages": [], "is_complete": False}
+                if "backend" not in design:
+                    design["backend"] = {"endpoints": [], "is_complete": False}
+                
+                log_and_print(f"\n✓ Design complete: {len(design.get('frontend', {}).get('pages', []))} pages, {len(design.get('backend', {}).get('endpoints', []))} endpoints", log_file)
+                _design_cache.put(description, features, design)
+                return design
+            
             json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = content[json_start:json_end]
+            if json_start >= 0:
+                json_str = content[json_start:content.rfind("}") + 1]
                 
-                # Try to parse JSON
-                try:
-                    design = json.loads(json_str)
-                    
-                    # Ensure structure is complete
-                    if "frontend" not in design:
-                        design["frontend"] = {"pages": [], "is_complete": False}
-                    if "backend" not in design:
-                        design["backend"] = {"endpoints": [], "is_complete": False}
-                    
-                    log_and_print(f"\n✓ Design complete: {len(design.get('frontend', {}).get('pages', []))} pages, {len(design.get('backend', {}).get('endpoints', []))} endpoints", log_file)
-                    return design
-                except json.JSONDecodeError as parse_error:
-                    # Try to repair truncated JSON
-                    log_and_print(f"  [Attempt {attempt + 1}] JSON parse error: {parse_error}", log_file)
-                    
-                    # Check if JSON is truncated (common issue)
-                    if attempt < max_retries - 1:
-                        # Try to find where JSON was cut off and close it properly
-                        try:
-                            # Count open vs closed braces
-                            open_braces = json_str.count('{')
-                            close_braces = json_str.count('}')
-                            missing_braces = open_braces - close_braces
+                # No complete object parsed - try to repair truncated JSON
+                log_and_print(f"  [Attempt {attempt + 1}] JSON parse error: response holds no complete JSON object", log_file)
+                
+                # Check if JSON is truncated (common issue)
+                if attempt < max_retries - 1:
+                    # Try to find where JSON was cut off and close it properly
+                    try:
+                        # Count open vs closed braces
+                        open_braces = json_str.count('{')
+                        close_braces = json_str.count('}')
+                        missing_braces = open_braces - close_braces
+                        
+                        if missing_braces > 0:
+                            # Try to close the JSON structure
+                            repaired_json = json_str
+                            for _ in range(missing_braces):
+                                # Find the last incomplete structure and close it
+                                if '"pages"' in repaired_json and repaired_json.rstrip().endswith(','):
+                                    repaired_json = repaired_json.rstrip().rstrip(',') + '\n            ]'
+                                elif '"endpoints"' in repaired_json and repaired_json.rstrip().endswith(','):
+                                    repaired_json = repaired_json.rstrip().rstrip(',') + '\n            ]'
+                                elif '"data_models"' in repaired_json and repaired_json.rstrip().endswith(','):
+                                    repaired_json = repaired_json.rstrip().rstrip(',') + '\n        ]'
+                                repaired_json += '\n    }'
                             
-                            if missing_braces > 0:
-                                # Try to close the JSON structure
-                                repaired_json = json_str
-                                for _ in range(missing_braces):
-                                    # Find the last incomplete structure and close it
-                                    if '"pages"' in repaired_json and repaired_json.rstrip().endswith(','):
-                                        repaired_json = repaired_json.rstrip().rstrip(',') + '\n            ]'
-                                    elif '"endpoints"' in repaired_json and repaired_json.rstrip().endswith(','):
-                                        repaired_json = repaired_json.rstrip().rstrip(',') + '\n            ]'
-                                    elif '"data_models"' in repaired_json and repaired_json.rstrip().endswith(','):
-                                        repaired_json = repaired_json.rstrip().rstrip(',') + '\n        ]'
-                                    repaired_json += '\n    }'
+                            # Close remaining structures
+                            if '"backend"' in repaired_json:
+                                repaired_json += '\n    }'
+                            if '"frontend"' in repaired_json:
+                                repaired_json += '\n}'
+                            
+                            try:
+                                design = json_loads(repaired_json)
+                                log_and_print(f"  ✓ Repaired truncated JSON successfully", log_file)
                                 
-                                # Close remaining structures
-                                if '"backend"' in repaired_json:
-                                    repaired_json += '\n    }'
-                                if '"frontend"' in repaired_json:
-                                    repaired_json += '\n}'
+                                # Ensure structure is complete
+                                if "frontend" not in design:
+                                    design["frontend"] = {"pages": [], "is_complete": False}
+                                if "backend" not in design:
+                                    design["backend"] = {"endpoints": [], "is_complete": False}
                                 
-                                try:
-                                    design = json.loads(repaired_json)
-                                    log_and_print(f"  ✓ Repaired truncated JSON successfully", log_file)
-                                    
-                                    # Ensure structure is complete
-                                    if "frontend" not in design:
-                                        design["frontend"] = {"pages": [], "is_complete": False}
-                                    if "backend" not in design:
-                                        design["backend"] = {"endpoints": [], "is_complete": False}
-                                    
-                                    log_and_print(f"\n✓ Design complete (repaired): {len(design.get('frontend', {}).get('pages', []))} pages, {len(design.get('backend', {}).get('endpoints', []))} endpoints", log_file)
-                                    return design
-                                except json.JSONDecodeError:
-                                    pass  # Repair failed, will retry
-                        except Exception as repair_error:
-                            log_and_print(f"  [Repair attempt failed]: {repair_error}", log_file)
-                    
-                    # If repair failed or last attempt, request a more concise design
-                    if attempt < max_retries - 1:
-                        log_and_print(f"  [Retrying with request for more concise design...]", log_file)
-                        # Modify prompt to request more concise output
-                        concise_prompt = design_prompt + "\n\n**IMPORTANT**: Keep the JSON response concise but complete. Focus on essential pages and endpoints only. Avoid excessive detail in nested structures."
-                        design_prompt = concise_prompt
-                        continue
+                                log_and_print(f"\n✓ Design complete (repaired): {len(design.get('frontend', {}).get('pages', []))} pages, {len(design.get('backend', {}).get('endpoints', []))} endpoints", log_file)
+                                _design_cache.put(description, features, design)
+                                return design
+                            except json.JSONDecodeError:
+                                pass  # Repair failed, will retry
+                    except Exception as repair_error:
+                        log_and_print(f"  [Repair attempt failed]: {repair_error}", log_file)
+                
+                # If repair failed or last attempt, request a more concise design
+                if attempt < max_retries - 1:
+                    log_and_print(f"  [Retrying with request for more concise design...]", log_file)
+                    # Modify prompt to request more concise output
+                    concise_prompt = design_prompt + "\n\n**IMPORTANT**: Keep the JSON response concise but complete. Focus on essential pages and endpoints only. Avoid excessive detail in nested structures."
+                    design_prompt = concise_prompt
+                    continue
             
             # If we couldn't find JSON boundaries
             if attempt < max_retries - 1:
@@ -535,7 +1317,8 @@ def run_pdca_cycle(
     flask_path: str,
     description: str,
     cycle_number: int,
-    log_file: str
+    log_file: str,
+    prefetch_next: bool = False
 ) -> Dict[str, Any]:
     """
     Execute a single PDCA (Plan-Do-Check-Act) cycle.
@@ -547,16 +1330,21 @@ def run_pdca_cycle(
         description: Application description
         cycle_number: Current cycle number
         log_file: Log file path
+        prefetch_next: Start the next cycle's PLAN call in the background during ACT
     
     Returns:
         Cycle results dictionary
     """
-    global _defect_ledger, _metrics
+    global _metrics
+    
+    # One buffered logger for the whole cycle, flushed at each phase boundary
+    logger = get_logger(log_file)
     
     cycle_start = time.time()
-    log_and_print(f"\n{'='*70}", log_file)
-    log_and_print(f"PDCA CYCLE {cycle_number}", log_file)
-    log_and_print(f"{'='*70}", log_file)
+    _token_bucket.reset()
+    log_and_print(f"\n{'='*70}", logger)
+    log_and_print(f"PDCA CYCLE {cycle_number}", logger)
+    log_and_print(f"{'='*70}", logger)
     
     cycle_results = {
         'cycle_number': cycle_number,
@@ -566,75 +1354,86 @@ def run_pdca_cycle(
         'waste_eliminated': 0
     }
     
+    # Ledger state is unchanged until CHECK, so PLAN and DO share one snapshot
+    snapshot = CycleSnapshot.capture(_defect_ledger)
+    
     # PLAN Phase
-    log_and_print(f"\n[PLAN] Analyzing current state and planning improvements...", log_file)
-    plan_result = plan_phase(design, react_path, flask_path, cycle_number, log_file)
+    log_and_print(f"\n[PLAN] Analyzing current state and planning improvements...", logger)
+    with _ledger_transaction():
+        plan_result = plan_phase(design, react_path, flask_path, cycle_number, logger, snapshot=snapshot)
     cycle_results.update(plan_result)
+    logger.flush()
     
     # DO Phase
-    log_and_print(f"\n[DO] Implementing improvements...", log_file)
-    do_result = do_phase(design, react_path, flask_path, description, cycle_number, log_file)
+    log_and_print(f"\n[DO] Implementing improvements...", logger)
+    with _ledger_transaction():
+        do_result = do_phase(design, react_path, flask_path, description, cycle_number, logger, snapshot=snapshot)
     cycle_results.update(do_result)
+    logger.flush()
     
     # CHECK Phase
-    log_and_print(f"\n[CHECK] Verifying implementation and checking for defects...", log_file)
-    check_result = check_phase(design, react_path, flask_path, cycle_number, log_file)
+    log_and_print(f"\n[CHECK] Verifying implementation and checking for defects...", logger)
+    with _ledger_transaction():
+        check_result = check_phase(design, react_path, flask_path, cycle_number, logger)
     cycle_results.update(check_result)
     cycle_results['defects_found'] = check_result.get('defects_found', 0)
+    record_cycle_mementos(cycle_number, logger)
+    logger.flush()
     
     # INTEGRATION VALIDATION Phase (after DO, before ACT)
     if cycle_number == 1:  # Only in first cycle to ensure complete integration
-        log_and_print(f"\n[INTEGRATION VALIDATION] Validating frontend-backend integration...", log_file)
-        integration_defects = validate_frontend_backend_integration(design, react_path, flask_path, log_file)
+        log_and_print(f"\n[INTEGRATION VALIDATION] Validating frontend-backend integration...", logger)
+        with _ledger_transaction():
+            integration_defects = validate_frontend_backend_integration(design, react_path, flask_path, logger)
         if integration_defects > 0:
-            log_and_print(f"  ⚠ Found {integration_defects} integration issues - will be addressed in refinement", log_file)
+            log_and_print(f"  ⚠ Found {integration_defects} integration issues - will be addressed in refinement", logger)
+    
+    # Overlap the next cycle's PLAN call with ACT
+    if prefetch_next:
+        prefetch_next_plan(design, cycle_number + 1, logger)
     
     # ACT Phase
-    log_and_print(f"\n[ACT] Standardizing improvements and planning next cycle...", log_file)
-    act_result = act_phase(design, react_path, flask_path, cycle_number, log_file)
+    log_and_print(f"\n[ACT] Standardizing improvements and planning next cycle...", logger)
+    with _ledger_transaction():
+        act_result = act_phase(design, react_path, flask_path, cycle_number, logger)
     cycle_results.update(act_result)
     cycle_results['defects_resolved'] = act_result.get('defects_resolved', 0)
     cycle_results['improvements_applied'] = act_result.get('improvements_applied', 0)
+    logger.flush()
     
     # CROSS-TEAM CONSOLIDATION Phase (as per Kaizen methodology flowchart)
-    log_and_print(f"\n[CROSS-TEAM CONSOLIDATION] Consolidating results from all teams...", log_file)
-    consolidation_result = cross_team_consolidation(
-        design, react_path, flask_path, cycle_number, 
-        do_result, check_result, act_result, log_file
-    )
+    log_and_print(f"\n[CROSS-TEAM CONSOLIDATION] Consolidating results from all teams...", logger)
+    with _ledger_transaction():
+        consolidation_result = cross_team_consolidation(
+            design, react_path, flask_path, cycle_number, 
+            do_result, check_result, act_result, logger
+        )
     cycle_results.update(consolidation_result)
+    logger.flush()
     
     cycle_time = time.time() - cycle_start
     _metrics.record_pdca_cycle(cycle_time)
     
-    log_and_print(f"\n✓ Cycle {cycle_number} completed in {cycle_time:.2f}s", log_file)
-    log_and_print(f"  Defects found: {cycle_results['defects_found']}", log_file)
-    log_and_print(f"  Defects resolved: {cycle_results['defects_resolved']}", log_file)
-    log_and_print(f"  Improvements applied: {cycle_results['improvements_applied']}", log_file)
-    log_and_print(f"  Cross-team issues identified: {consolidation_result.get('cross_team_issues', 0)}", log_file)
+    log_and_print(f"\n✓ Cycle {cycle_number} completed in {cycle_time:.2f}s", logger)
+    log_and_print(f"  Defects found: {cycle_results['defects_found']}", logger)
+    log_and_print(f"  Defects resolved: {cycle_results['defects_resolved']}", logger)
+    log_and_print(f"  Improvements applied: {cycle_results['improvements_applied']}", logger)
+    log_and_print(f"  Cross-team issues identified: {consolidation_result.get('cross_team_issues', 0)}", logger)
+    
+    logger.flush()
     
     return cycle_results
 
 
-def plan_phase(design: Dict, react_path: str, flask_path: str, cycle_number: int, log_file: str) -> Dict:
-    """
-    PLAN phase: Analyze current state and establish improvement targets.
-    
-    True Kaizen: In Cycle 2+, focus on refining components with defects/improvements.
-    """
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
-    
-    coordinator = get_agent(temperature=0.2, max_tokens=1500)
-    
-    # Get current defect statistics
-    defect_stats = _defect_ledger.get_statistics() if _defect_ledger else {}
-    open_defects = _defect_ledger.get_open_defects() if _defect_ledger else []
+def _build_plan_prompt(design: Dict, cycle_number: int, snapshot: CycleSnapshot) -> str:
+    """Build the Improvement Coordinator's PLAN prompt for a cycle from a ledger snapshot."""
+    defect_stats = snapshot.stats
+    open_defects = snapshot.open_defects
     
     # Get components that need refinement (for Cycle 2+)
     pages = design.get("frontend", {}).get("pages", [])
     endpoints = design.get("backend", {}).get("endpoints", [])
-    components_to_refine = get_components_needing_refinement(pages, endpoints, cycle_number)
+    components_to_refine = get_components_needing_refinement(pages, endpoints, cycle_number, open_defects)
     
     if cycle_number == 1:
         plan_prompt = f"""You are the Improvement Coordinator in the PLAN phase of PDCA cycle {cycle_number} (INITIAL IMPLEMENTATION).
@@ -669,8 +1468,8 @@ CURRENT STATE:
 - Resolution rate: {defect_stats.get('resolution_rate', 0):.2%}
 - Components needing refinement: {len(components_to_refine.get('pages', []))} pages, {len(components_to_refine.get('endpoints', []))} endpoints
 
-OPEN DEFECTS:
-{json.dumps([{'id': d['id'], 'component': d['component'], 'severity': d['severity'], 'description': d['description'][:100]} for d in open_defects[:10]], indent=2)}
+DEFECT MEMENTOS (one line per component; full details stay in the defect ledger):
+{json_dumps_compact([m.__dict__ for m in (_metrics.mementos or [CycleMemento.from_defect(d) for d in open_defects])[-20:]])}
 
 COMPONENTS TO REFINE:
 Pages: {', '.join(components_to_refine.get('pages', [])[:5])}
@@ -692,42 +1491,133 @@ Return JSON with:
     "waste_opportunities": ["waste type", "description"],
     "refinement_priority": ["component1", "component2"]
 }}"""
+    return plan_prompt
+
+
+# Returned by plan_phase without an LLM call once a refinement cycle has nothing left to fix
+_CONVERGED_PLAN = {"targets": [], "focus_areas": ["convergence"], "waste_opportunities": [], "refinement_priority": []}
+
+
+def _plan_is_converged(design: Dict, cycle_number: int, snapshot: CycleSnapshot) -> bool:
+    """True for a refinement cycle with no open defects and no pending improvements to apply."""
+    if cycle_number == 1 or snapshot.open_defects:
+        return False
+    pages = design.get("frontend", {}).get("pages", [])
+    endpoints = design.get("backend", {}).get("endpoints", [])
+    components_to_refine = get_components_needing_refinement(pages, endpoints, cycle_number, snapshot.open_defects)
+    return not (components_to_refine.get('pages') or components_to_refine.get('endpoints'))
+
+
+def prefetch_next_plan(design: Dict, cycle_number: int, log_file: str):
+    """
+    Start the next cycle's PLAN call in a background thread, assuming the
+    currently open defects stay open. plan_phase picks the response up via
+    _take_prefetched_plan, or discards it if ACT changed the defect set too much.
+    """
+    global _metrics
+    snapshot = CycleSnapshot.capture(_defect_ledger)
+    if _plan_is_converged(design, cycle_number, snapshot):
+        return
+    plan_prompt = _build_plan_prompt(design, cycle_number, snapshot)
+    coordinator = get_agent(temperature=0.2, max_tokens=1500)
+    
+    result: Dict[str, Any] = {}
+    def run():
+        try:
+            result['response'] = invoke_with_rate_limit(coordinator, [HumanMessage(content=plan_prompt)], log_file, cache_if=_has_json_object)
+        except Exception as e:
+            result['error'] = e
+    
+    thread = threading.Thread(target=run, name=f"plan-prefetch-{cycle_number}", daemon=True)
+    thread.start()
+    _metrics.pending_plan = {
+        'cycle_number': cycle_number,
+        'defect_ids': {d['id'] for d in snapshot.open_defects},
+        'thread': thread,
+        'result': result
+    }
+    log_and_print(f"  [Prefetch] Planning cycle {cycle_number} in the background during ACT", log_file)
 
+
+def _take_prefetched_plan(cycle_number: int, snapshot: CycleSnapshot, log_file: str) -> Optional[Any]:
+    """
+    Return the prefetched PLAN response for this cycle if the open-defect set
+    changed by less than PLAN_PREFETCH_MAX_DRIFT since it was issued, else None.
+    """
+    global _metrics
+    pending, _metrics.pending_plan = _metrics.pending_plan, None
+    if not pending or pending['cycle_number'] != cycle_number:
+        return None
+    
+    current_ids = {d['id'] for d in snapshot.open_defects}
+    drift = len(current_ids ^ pending['defect_ids']) / max(1, len(current_ids | pending['defect_ids']))
+    if drift >= PLAN_PREFETCH_MAX_DRIFT:
+        log_and_print(f"  [Prefetch] Discarding prefetched plan ({drift:.0%} of open defects changed)", log_file)
+        return None
+    
+    pending['thread'].join()
+    if 'error' in pending['result']:
+        log_and_print(f"  [Prefetch] Prefetched plan failed, planning again: {str(pending['result']['error'])[:100]}", log_file)
+        return None
+    log_and_print(f"  [Prefetch] Using prefetched plan ({drift:.0%} of open defects changed)", log_file)
+    return pending['result'].get('response')
+
+
+def plan_phase(design: Dict, react_path: str, flask_path: str, cycle_number: int, log_file: str, snapshot: CycleSnapshot = None) -> Dict:
+    """
+    PLAN phase: Analyze current state and establish improvement targets.
+    
+    True Kaizen: In Cycle 2+, focus on refining components with defects/improvements.
+    """
+    global _metrics
+    
+    coordinator = get_agent(temperature=0.2, max_tokens=1500)
+    
+    # Get current defect statistics
+    if snapshot is None:
+        snapshot = CycleSnapshot.capture(_defect_ledger)
+    
+    # Nothing left to refine: skip the coordinator call entirely
+    if _plan_is_converged(design, cycle_number, snapshot):
+        _metrics.pending_plan = None
+        log_and_print(f"  ✓ No open defects or pending improvements - nothing to plan for refinement", log_file)
+        return copy.deepcopy(_CONVERGED_PLAN)
+    
+    plan_prompt = _build_plan_prompt(design, cycle_number, snapshot)
+    
     try:
-        response = invoke_with_rate_limit(coordinator, [HumanMessage(content=plan_prompt)], log_file, estimated_tokens=1000)  # Reduced from 2000
+        # Use the plan prefetched during the previous ACT phase if the defect state still matches
+        response = _take_prefetched_plan(cycle_number, snapshot, log_file)
+        if response is None:
+            response = invoke_with_rate_limit(coordinator, [HumanMessage(content=plan_prompt)], log_file, cache_if=_has_json_object)
         if not response:
             raise Exception("Plan phase failed - no response from coordinator. Cannot proceed without planning.")
         
         content = response.content.strip()
         
-        try:
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            if json_start >= 0:
-                plan_data = json.loads(content[json_start:json_end])
-                action = "refinement" if cycle_number > 1 else "implementation"
-                log_and_print(f"  ✓ Planned {len(plan_data.get('targets', []))} improvement targets for {action}", log_file)
-                return plan_data
-            else:
-                raise Exception("No JSON found in plan response")
-        except json.JSONDecodeError as e:
-            log_and_print(f"  [Error] Failed to parse plan data: {e}", log_file)
+        plan_data = _extract_first_json(content)
+        if plan_data is None:
+            log_and_print(f"  [Error] Failed to parse plan data: no JSON object found", log_file)
             log_and_print(f"  Response content: {content[:500]}", log_file)
-            raise Exception(f"Plan phase failed - invalid JSON response. Cannot proceed without valid plan. Error: {e}")
+            raise Exception("Plan phase failed - invalid JSON response. Cannot proceed without valid plan.")
+        action = "refinement" if cycle_number > 1 else "implementation"
+        log_and_print(f"  ✓ Planned {len(plan_data.get('targets', []))} improvement targets for {action}", log_file)
+        return plan_data
     except Exception as e:
         if 'token' in str(e).lower() or 'limit' in str(e).lower():
             raise Exception(f"Plan phase cannot proceed due to token limits: {e}")
         raise Exception(f"Plan phase failed: {e}")
 
 
-def do_phase(design: Dict, react_path: str, flask_path: str, description: str, cycle_number: int, log_file: str) -> Dict:
+def do_phase(design: Dict, react_path: str, flask_path: str, description: str, cycle_number: int, log_file: str, snapshot: CycleSnapshot = None) -> Dict:
     """
     DO phase: Implementation Group implements or refines components.
     
     True Kaizen: Cycle 1 implements, Cycle 2+ refines the SAME components.
     """
-    global _defect_ledger, _rate_limiter
-    _defect_ledger = get_defect_ledger()
+    global _rate_limiter
+    if snapshot is None:
+        snapshot = CycleSnapshot.capture(_defect_ledger)
     
     pages = design.get("frontend", {}).get("pages", [])
     endpoints = design.get("backend", {}).get("endpoints", [])
@@ -738,11 +1628,12 @@ def do_phase(design: Dict, react_path: str, flask_path: str, description: str, c
         'pages_refined': 0,
         'endpoints_implemented': 0,
         'endpoints_refined': 0,
+        'refinements_skipped': 0,
         'improvements_made': 0
     }
     
     # Get components that need refinement (have defects or improvements)
-    components_to_refine = get_components_needing_refinement(pages, endpoints, cycle_number)
+    components_to_refine = get_components_needing_refinement(pages, endpoints, cycle_number, snapshot.open_defects)
     
     if cycle_number == 1:
         # Cycle 1: Generate project scaffolding first, then implement components
@@ -780,43 +1671,29 @@ def do_phase(design: Dict, react_path: str, flask_path: str, description: str, c
         # Step 3: Implement all components with token budget awareness
         log_and_print(f"  [Step 3/3] Implementing components (token budget: {_rate_limiter.get_remaining_daily_tokens():,})...", log_file)
         
-        # Divide work among 3 implementation agents, but limit based on token budget
-        pages_per_agent = (len(pages) + 2) // 3
-        endpoints_per_agent = (len(endpoints) + 2) // 3
+        # Pages and endpoints form one shared work queue drained by concurrent implementation agents,
+        # so a heavy component only delays its own slot instead of a whole pre-assigned share
+        work = [("page", page) for page in pages] + [("endpoint", endpoint) for endpoint in endpoints]
+        endpoint_index = build_endpoint_index(endpoints)
+        log_and_print(f"  [Implementation Group] Implementing {len(pages)} pages and {len(endpoints)} endpoints...", log_file)
         
-        for agent_id in range(1, 4):
-            # Check token budget before each agent
+        def implement_item(kind: str, item: Dict, agent_id: int) -> Tuple[str, bool]:
+            # Check token budget before each component
             remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
-            if remaining_tokens < 5000:  # Stop if less than 5k tokens remaining
-                log_and_print(f"  [Token Budget] Stopping implementation - only {remaining_tokens:,} tokens remaining", log_file)
-                break
-            
-            agent_pages = pages[(agent_id-1)*pages_per_agent:agent_id*pages_per_agent]
-            agent_endpoints = endpoints[(agent_id-1)*endpoints_per_agent:agent_id*endpoints_per_agent]
-            
-            if agent_pages:
-                log_and_print(f"  [Implementation Agent {agent_id}] Implementing {len(agent_pages)} pages...", log_file)
-                for page in agent_pages:
-                    # Check token budget before each page
-                    if _rate_limiter.get_remaining_daily_tokens() < 3000:
-                        log_and_print(f"  [Token Budget] Skipping remaining pages - low token budget", log_file)
-                        break
-                    result = implement_page_kaizen(page, react_path, endpoints, description, agent_id, log_file, is_refinement=False, design=design)
-                    if result:
-                        implementation_results['pages_implemented'] += 1
-            
-            if agent_endpoints:
-                log_and_print(f"  [Implementation Agent {agent_id}] Implementing {len(agent_endpoints)} endpoints...", log_file)
-                # Determine MongoDB usage from design/description
-                use_mongodb = determine_db_usage(description, [], design)
-                for endpoint in agent_endpoints:
-                    # Check token budget before each endpoint
-                    if _rate_limiter.get_remaining_daily_tokens() < 2000:
-                        log_and_print(f"  [Token Budget] Skipping remaining endpoints - low token budget", log_file)
-                        break
-                    result = implement_endpoint_kaizen(endpoint, flask_path, description, agent_id, log_file, is_refinement=False, use_mongodb=use_mongodb)
-                    if result:
-                        implementation_results['endpoints_implemented'] += 1
+            if kind == "page":
+                if remaining_tokens < 3000:
+                    log_and_print(f"  [Token Budget] Skipping page {item.get('page_name', '')} - low token budget", log_file)
+                    return kind, False
+                return kind, implement_page_kaizen(item, react_path, endpoint_index, description, agent_id, log_file, is_refinement=False, design=design)
+            if remaining_tokens < 2000:
+                log_and_print(f"  [Token Budget] Skipping endpoint {item.get('path', '')} - low token budget", log_file)
+                return kind, False
+            return kind, implement_endpoint_kaizen(item, flask_path, description, agent_id, log_file, is_refinement=False, use_mongodb=use_mongodb)
+        
+        for kind, done in _run_parallel([lambda kind=kind, item=item, agent_id=i % 3 + 1: implement_item(kind, item, agent_id)
+                                         for i, (kind, item) in enumerate(work)]):
+            if done:
+                implementation_results['pages_implemented' if kind == "page" else 'endpoints_implemented'] += 1
         
         # After all pages are implemented, generate App.js with routing and shared components
         if implementation_results['pages_implemented'] > 0:
@@ -832,47 +1709,43 @@ def do_phase(design: Dict, react_path: str, flask_path: str, description: str, c
         if remaining_tokens < 20000:
             log_and_print(f"  [WARNING] Low token budget ({remaining_tokens:,}). Limiting refinement scope.", log_file)
         
-        # Get components with defects, prioritized by severity
-        components_with_defects = get_components_with_defects_prioritized(pages, endpoints, _defect_ledger)
+        # Sets make each membership test O(1) instead of a list scan per component
+        pages_refine_set = set(components_to_refine.get('pages', []))
+        endpoints_refine_set = set(components_to_refine.get('endpoints', []))
         
         # Match by page name (from defect ledger) to page object
-        pages_to_refine = []
-        for page in pages:
-            page_name = page.get('page_name', '')
-            if page_name in components_to_refine.get('pages', []):
-                pages_to_refine.append(page)
+        pages_to_refine = [page for page in pages if page.get('page_name', '') in pages_refine_set]
         
-        # Match endpoints by path
+        # Match endpoints by path (exact or partial): one alternation regex scans each path once
+        # instead of a substring test per refinement path
+        refine_path_re = re.compile('|'.join(re.escape(ep_path) for ep_path in endpoints_refine_set)) if endpoints_refine_set else None
         endpoints_to_refine = []
-        for endpoint in endpoints:
-            endpoint_path = endpoint.get('path', '')
-            if endpoint_path in components_to_refine.get('endpoints', []) or any(ep_path in endpoint_path for ep_path in components_to_refine.get('endpoints', [])):
-                endpoints_to_refine.append(endpoint)
+        if refine_path_re:
+            for endpoint in endpoints:
+                endpoint_path = endpoint.get('path', '')
+                if endpoint_path in endpoints_refine_set or refine_path_re.search(endpoint_path):
+                    endpoints_to_refine.append(endpoint)
+        
+        # Components whose last refinement already covered every open defect and pending
+        # improvement would repeat the same request; drop them before the budget cut so
+        # they do not hold refinement slots cycle after cycle
+        current_pages = [page for page in pages_to_refine
+                         if _component_refinement_is_current(f"frontend/{page.get('page_name', '')}", get_page_file_path(page, react_path))]
+        current_endpoints = [endpoint for endpoint in endpoints_to_refine
+                             if _component_refinement_is_current(f"backend/{endpoint.get('path', '')}", get_endpoint_file_path(endpoint, flask_path))]
+        if current_pages or current_endpoints:
+            pages_to_refine = [page for page in pages_to_refine if page not in current_pages]
+            endpoints_to_refine = [endpoint for endpoint in endpoints_to_refine if endpoint not in current_endpoints]
+            implementation_results['refinements_skipped'] += len(current_pages) + len(current_endpoints)
+            log_and_print(f"  [Skip] {len(current_pages)} pages and {len(current_endpoints)} endpoints unchanged since their last refinement", log_file)
         
         # Prioritize by defect severity - only refine components with critical/high defects first
         if _defect_ledger:
-            # Filter to only components with critical/high severity defects
-            critical_high_pages = []
-            critical_high_endpoints = []
-            
-            open_defects = _defect_ledger.get_open_defects()
-            critical_high_defects = [d for d in open_defects if d.get('severity') in ['critical', 'high']]
-            
-            # Get unique components with critical/high defects
-            critical_high_components = set()
-            for defect in critical_high_defects:
-                critical_high_components.add(defect.get('component', ''))
-            
-            # Filter pages and endpoints
-            for page in pages_to_refine:
-                page_name = page.get('page_name', '')
-                if f"frontend/{page_name}" in critical_high_components:
-                    critical_high_pages.append(page)
-            
-            for endpoint in endpoints_to_refine:
-                endpoint_path = endpoint.get('path', '')
-                if f"backend/{endpoint_path}" in critical_high_components:
-                    critical_high_endpoints.append(endpoint)
+            # Filter to only components with critical/high severity defects; the component set is
+            # built in the snapshot's single pass over open defects and shared by both filters
+            critical_high_components = snapshot.critical_high
+            critical_high_pages = [page for page in pages_to_refine if f"frontend/{page.get('page_name', '')}" in critical_high_components]
+            critical_high_endpoints = [endpoint for endpoint in endpoints_to_refine if f"backend/{endpoint.get('path', '')}" in critical_high_components]
             
             # Use critical/high priority components if available
             if critical_high_pages or critical_high_endpoints:
@@ -899,37 +1772,58 @@ def do_phase(design: Dict, react_path: str, flask_path: str, description: str, c
             pages_to_refine = pages_to_refine[:max(1, max_refinements - len(endpoints_to_refine))]
             endpoints_to_refine = endpoints_to_refine[:max(0, max_refinements - len(pages_to_refine))]
         
-        # Divide refinement work among agents
-        pages_per_agent = (len(pages_to_refine) + 2) // 3 if pages_to_refine else 0
-        endpoints_per_agent = (len(endpoints_to_refine) + 2) // 3 if endpoints_to_refine else 0
+        # Determine MongoDB usage from design/description once for all agents
+        use_mongodb = determine_db_usage(description, [], design) if endpoints_to_refine else False
         
-        for agent_id in range(1, 4):
-            agent_pages = pages_to_refine[(agent_id-1)*pages_per_agent:agent_id*pages_per_agent] if pages_to_refine else []
-            agent_endpoints = endpoints_to_refine[(agent_id-1)*endpoints_per_agent:agent_id*endpoints_per_agent] if endpoints_to_refine else []
-            
-            if agent_pages:
-                log_and_print(f"  [Implementation Agent {agent_id}] Refining {len(agent_pages)} pages...", log_file)
-                for page in agent_pages:
-                    result = implement_page_kaizen(page, react_path, endpoints, description, agent_id, log_file, is_refinement=True, design=design)
-                    if result:
-                        implementation_results['pages_refined'] += 1
-            
-            if agent_endpoints:
-                log_and_print(f"  [Implementation Agent {agent_id}] Refining {len(agent_endpoints)} endpoints...", log_file)
-                # Determine MongoDB usage from design/description
-                use_mongodb = determine_db_usage(description, [], design)
-                for endpoint in agent_endpoints:
-                    result = implement_endpoint_kaizen(endpoint, flask_path, description, agent_id, log_file, is_refinement=True, use_mongodb=use_mongodb)
-                    if result:
-                        implementation_results['endpoints_refined'] += 1
+        # Refinements share one work queue drained by concurrent implementation agents
+        work = [("page", page) for page in pages_to_refine] + [("endpoint", endpoint) for endpoint in endpoints_to_refine]
+        endpoint_index = build_endpoint_index(endpoints)
+        log_and_print(f"  [Implementation Group] Refining {len(pages_to_refine)} pages and {len(endpoints_to_refine)} endpoints...", log_file)
+        
+        def refine_item(kind: str, item: Dict, agent_id: int) -> Tuple[str, Optional[bool]]:
+            if kind == "page":
+                return kind, implement_page_kaizen(item, react_path, endpoint_index, description, agent_id, log_file, is_refinement=True, design=design)
+            return kind, implement_endpoint_kaizen(item, flask_path, description, agent_id, log_file, is_refinement=True, use_mongodb=use_mongodb)
+        
+        for kind, done in _run_parallel([lambda kind=kind, item=item, agent_id=i % 3 + 1: refine_item(kind, item, agent_id)
+                                         for i, (kind, item) in enumerate(work)]):
+            if done is None:
+                implementation_results['refinements_skipped'] += 1
+            elif done:
+                implementation_results['pages_refined' if kind == "page" else 'endpoints_refined'] += 1
     
     return implementation_results
 
 
+def _verification_weight(item: Dict) -> int:
+    """Expected tokens to verify a page or endpoint: its last measured cost, else a default."""
+    if 'page_name' in item:
+        component = f"frontend/{item['page_name']}"
+    else:
+        component = f"backend/{item.get('path', '')}"
+    return _metrics.tokens_per_component.get(component, VERIFY_DEFAULT_TOKENS)
+
+
+def _partition_by_weight(items: List[Dict], weight: Callable[[Dict], int], n_bins: int) -> List[List[Dict]]:
+    """
+    Longest-processing-time partition: visit items heaviest first and give
+    each to the currently lightest bin. Each bin keeps the input order.
+    """
+    loads = [0] * n_bins
+    assigned = [0] * len(items)
+    for index in sorted(range(len(items)), key=lambda i: weight(items[i]), reverse=True):
+        lightest = loads.index(min(loads))
+        assigned[index] = lightest
+        loads[lightest] += weight(items[index])
+    bins = [[] for _ in range(n_bins)]
+    for index, item in enumerate(items):
+        bins[assigned[index]].append(item)
+    return bins
+
+
 def check_phase(design: Dict, react_path: str, flask_path: str, cycle_number: int, log_file: str) -> Dict:
     """CHECK phase: Verification Group inspects and identifies defects."""
-    global _defect_ledger, _metrics, _rate_limiter
-    _defect_ledger = get_defect_ledger()
+    global _metrics, _rate_limiter
     
     # Check remaining token budget before verification
     remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
@@ -938,10 +1832,10 @@ def check_phase(design: Dict, react_path: str, flask_path: str, cycle_number: in
     log_and_print(f"  [Token Status] Remaining daily tokens: {remaining_tokens:,} ({stats.get('daily_token_percentage', 0):.1f}% used)", log_file)
     
     # If we're close to the limit, raise exception instead of skipping silently
-    if remaining_tokens < 10000:  # Less than 10k tokens remaining
+    if not _budget_guard.can_afford(2):  # One inspection per verification agent
         log_and_print(f"  [ERROR] Insufficient token budget for verification. Remaining: {remaining_tokens}", log_file)
         # Don't skip silently - raise exception so caller knows verification couldn't happen
-        raise Exception(f"Verification phase cannot proceed - insufficient tokens. Remaining: {remaining_tokens}, needed: ~10000")
+        raise Exception(f"Verification phase cannot proceed - insufficient tokens. Remaining: {remaining_tokens}, needed: ~{2 * _budget_guard.tokens_per_call()}")
     
     pages = design.get("frontend", {}).get("pages", [])
     endpoints = design.get("backend", {}).get("endpoints", [])
@@ -1008,8 +1902,11 @@ def check_phase(design: Dict, react_path: str, flask_path: str, cycle_number: in
     # In Cycle 2+, only verify components that were refined (not all components)
     if cycle_number > 1:
         # Only verify components that exist and were potentially refined
-        pages_to_verify = [p for p in pages if os.path.exists(get_page_file_path(p, react_path))]
-        endpoints_to_verify = [e for e in endpoints if os.path.exists(get_endpoint_file_path(e, flask_path))]
+        # One directory listing each instead of a stat per component
+        existing_pages = _file_names(os.path.join(react_path, "src", "pages"))
+        existing_routes = _file_names(os.path.join(flask_path, "routes"))
+        pages_to_verify = [p for p in pages if os.path.basename(get_page_file_path(p, react_path)) in existing_pages]
+        endpoints_to_verify = [e for e in endpoints if os.path.basename(get_endpoint_file_path(e, flask_path)) in existing_routes]
         
         # Limit verification to recently refined components
         log_and_print(f"  [Cycle {cycle_number}] Verifying {len(pages_to_verify)} pages and {len(endpoints_to_verify)} endpoints...", log_file)
@@ -1021,53 +1918,61 @@ def check_phase(design: Dict, react_path: str, flask_path: str, cycle_number: in
     # But limit the number of items to verify based on remaining tokens
     # In Cycle 1: Verify all, but limit to 2 items per agent
     # In Cycle 2+: Only verify if components were actually refined (skip if no changes)
+    # Each of the 2 agents gets an equal share of the calls the budget covers
     if cycle_number == 1:
-        max_items_per_agent = min(2, max(1, remaining_tokens // 4000))  # More conservative: 4k tokens per verification
+        max_items_per_agent = min(2, max(1, _budget_guard.affordable_calls() // 2))
     else:
         # In later cycles, only verify if there were actual refinements
-        max_items_per_agent = min(1, max(0, remaining_tokens // 5000))  # Even more conservative
+        max_items_per_agent = min(1, _budget_guard.affordable_calls() // 2)
         if max_items_per_agent == 0:
             log_and_print(f"  [Cycle {cycle_number}] No components to verify (no changes detected)", log_file)
             # This is OK - no changes means no verification needed
             return {"defects_found": 0, "skipped": False, "reason": "no_changes"}
     
-    for agent_id in range(1, 3):
-        # Check if we should continue
-        if _rate_limiter.get_remaining_daily_tokens() < 5000:
-            log_and_print(f"  [Verification Agent {agent_id}] Stopping verification due to low token budget", log_file)
-            break
-        
-        log_and_print(f"  [Verification Agent {agent_id}] Inspecting code (max {max_items_per_agent} items each)...", log_file)
-        
-        # Inspect frontend (limited)
-        agent_pages = pages_to_verify[:len(pages_to_verify)//2 + 1] if agent_id == 1 else pages_to_verify[len(pages_to_verify)//2:]
-        for page in agent_pages[:max_items_per_agent]:
-            if _rate_limiter.get_remaining_daily_tokens() < 2000:
-                log_and_print(f"    [Skipping] Low token budget for {page.get('page_name', 'Unknown')}", log_file)
-                break
-            try:
-                defects = verify_page_kaizen(page, react_path, agent_id, log_file)
-                defects_found += len(defects)
-            except Exception as e:
-                if '429' in str(e) or 'rate_limit' in str(e).lower():
-                    log_and_print(f"    [Rate Limit] Skipping verification due to rate limit", log_file)
-                    break
-                log_and_print(f"    [Error] {str(e)[:100]}", log_file)
-        
-        # Inspect backend (limited)
-        agent_endpoints = endpoints_to_verify[:len(endpoints_to_verify)//2 + 1] if agent_id == 1 else endpoints_to_verify[len(endpoints_to_verify)//2:]
-        for endpoint in agent_endpoints[:max_items_per_agent]:
-            if _rate_limiter.get_remaining_daily_tokens() < 2000:
-                log_and_print(f"    [Skipping] Low token budget for {endpoint.get('path', 'Unknown')}", log_file)
-                break
-            try:
-                defects = verify_endpoint_kaizen(endpoint, flask_path, agent_id, log_file)
-                defects_found += len(defects)
-            except Exception as e:
-                if '429' in str(e) or 'rate_limit' in str(e).lower():
-                    log_and_print(f"    [Rate Limit] Skipping verification due to rate limit", log_file)
-                    break
-                log_and_print(f"    [Error] {str(e)[:100]}", log_file)
+    # Split each kind between the 2 agents by expected verification cost, then
+    # inspect all shares concurrently. Each agent's endpoints go out as one
+    # batched task (pages stay one task each)
+    verification_tasks = []
+    for kind, items in (("page", pages_to_verify), ("endpoint", endpoints_to_verify)):
+        for agent_id, agent_items in enumerate(_partition_by_weight(items, _verification_weight, 2), start=1):
+            if kind == "page":
+                verification_tasks.extend(("page", [item], agent_id) for item in agent_items[:max_items_per_agent])
+            elif agent_items:
+                verification_tasks.append(("endpoint", agent_items[:max_items_per_agent], agent_id))
+    # Heaviest first, so long inspections do not start last and stretch the phase
+    verification_tasks.sort(key=lambda task: sum(map(_verification_weight, task[1])), reverse=True)
+    component_count = sum(len(task[1]) for task in verification_tasks)
+    
+    rate_limited = threading.Event()
+    
+    def verify_item(kind: str, items: List[Dict], agent_id: int) -> int:
+        name = items[0].get('page_name', 'Unknown') if kind == "page" else ", ".join(item.get('path', 'Unknown') for item in items)
+        if rate_limited.is_set():
+            return 0
+        if not _budget_guard.can_afford(1):
+            log_and_print(f"    [Skipping] Low token budget for {name}", log_file)
+            return 0
+        try:
+            if kind == "page":
+                return len(verify_page_kaizen(items[0], react_path, agent_id, log_file))
+            return len(verify_endpoints_kaizen(items, flask_path, agent_id, log_file))
+        except Exception as e:
+            if '429' in str(e) or 'rate_limit' in str(e).lower():
+                # Later tasks see the flag and skip instead of queuing behind the limit
+                rate_limited.set()
+                log_and_print(f"    [Rate Limit] Skipping verification due to rate limit", log_file)
+                return 0
+            log_and_print(f"    [Error] {str(e)[:100]}", log_file)
+            return 0
+    
+    if verification_tasks:
+        max_in_flight = max(1, min(VERIFY_MAX_CONCURRENCY, _budget_guard.concurrency, _budget_guard.affordable_calls()))
+        log_and_print(f"  [Verification Group] Inspecting {component_count} components in {len(verification_tasks)} requests (max {max_items_per_agent} per agent, {max_in_flight} in flight)...", log_file)
+        defects_found += sum(_run_parallel(
+            [lambda kind=kind, items=items, agent_id=agent_id: verify_item(kind, items, agent_id)
+             for kind, items, agent_id in verification_tasks],
+            max_concurrency=max_in_flight
+        ))
     
     _metrics.defects_found += defects_found
     
@@ -1101,15 +2006,14 @@ def check_phase(design: Dict, react_path: str, flask_path: str, cycle_number: in
 
 def act_phase(design: Dict, react_path: str, flask_path: str, cycle_number: int, log_file: str) -> Dict:
     """ACT phase: Integration Group ensures consistency and resolves defects."""
-    global _defect_ledger, _metrics, _rate_limiter
-    _defect_ledger = get_defect_ledger()
+    global _metrics, _rate_limiter
     
     # Check remaining token budget
     remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
-    if remaining_tokens < 5000:
+    if not _budget_guard.can_afford(1):
         log_and_print(f"  [ERROR] Insufficient token budget for ACT phase. Remaining: {remaining_tokens}", log_file)
         # Don't skip silently - raise exception so caller knows ACT couldn't happen
-        raise Exception(f"ACT phase cannot proceed - insufficient tokens. Remaining: {remaining_tokens}, needed: ~5000")
+        raise Exception(f"ACT phase cannot proceed - insufficient tokens. Remaining: {remaining_tokens}, needed: ~{_budget_guard.tokens_per_call()}")
     
     # Integration Group: 1 agent ensuring architectural consistency
     log_and_print(f"  [Integration Agent] Ensuring architectural consistency...", log_file)
@@ -1118,56 +2022,81 @@ def act_phase(design: Dict, react_path: str, flask_path: str, cycle_number: int,
     
     # Get open defects
     open_defects = _defect_ledger.get_open_defects() if _defect_ledger else []
-    critical_defects = [d for d in open_defects if d['severity'] == DefectSeverity.CRITICAL.value]
-    high_defects = [d for d in open_defects if d['severity'] == DefectSeverity.HIGH.value]
+    critical_defects = []
+    high_defects = []
+    for d in open_defects:
+        if d['severity'] == DefectSeverity.CRITICAL.value:
+            critical_defects.append(d)
+        elif d['severity'] == DefectSeverity.HIGH.value:
+            high_defects.append(d)
     
     defects_resolved = 0
     improvements_applied = 0
     
-    # Resolve critical and high priority defects (limit based on remaining tokens)
-    # More aggressive limiting: only resolve 1-2 defects per cycle
-    max_defects_to_resolve = min(2, max(1, remaining_tokens // 4000))  # Estimate 4k tokens per resolution, max 2
+    # Resolve critical and high priority defects in one request; the batch
+    # shrinks until its estimate fits the remaining budget
+    max_defects_to_resolve = min(ACT_MAX_BATCH, max(1, (remaining_tokens - ACT_PROMPT_TOKENS) // ACT_TOKENS_PER_DEFECT))
+    batch = list(islice(chain(critical_defects, high_defects), max_defects_to_resolve))
     
-    for defect in (critical_defects + high_defects)[:max_defects_to_resolve]:
-        # Check token budget before each resolution
-        if _rate_limiter.get_remaining_daily_tokens() < 2000:
-            log_and_print(f"    [Skipping] Low token budget for defect #{defect['id']}", log_file)
-            break
-        
-        log_and_print(f"    Resolving defect #{defect['id']}: {defect['description'][:50]}...", log_file)
+    if batch:
+        batch_labels = ", ".join(f"#{d['id']}" for d in batch)
+        log_and_print(f"    Resolving {len(batch)} defect(s): {batch_labels}", log_file)
         
         try:
-            resolve_prompt = f"""You are an Integration Agent resolving a defect.
+            defects_json = json_dumps_indent([
+                {'id': d['id'], 'component': d['component'], 'severity': d['severity'],
+                 'description': d['description'], 'category': d['category']}
+                for d in batch
+            ])
+            resolve_prompt = f"""You are an Integration Agent resolving defects.
 
-DEFECT:
-ID: {defect['id']}
-Component: {defect['component']}
-Severity: {defect['severity']}
-Description: {defect['description']}
-Category: {defect['category']}
+DEFECTS:
+{defects_json}
 
-Provide a solution to resolve this defect. Return JSON:
+Provide a solution for each defect you can resolve. Return JSON:
 {{
-    "solution": "detailed solution",
-    "code_changes": "specific code changes needed",
-    "verification_steps": ["step1", "step2"]
+    "resolutions": [
+        {{
+            "id": <defect id>,
+            "solution": "detailed solution",
+            "code_changes": "specific code changes needed",
+            "verification_steps": ["step1", "step2"]
+        }}
+    ]
 }}"""
 
-            response = invoke_with_rate_limit(integration_agent, [HumanMessage(content=resolve_prompt)], log_file, estimated_tokens=1500)  # Reduced from 3000
+            estimated_tokens = ACT_PROMPT_TOKENS + ACT_TOKENS_PER_DEFECT * len(batch)
+            resolve_agent = get_agent(temperature=0.2, max_tokens=1500 + ACT_TOKENS_PER_DEFECT * (len(batch) - 1))
+            response = invoke_with_rate_limit(resolve_agent, [HumanMessage(content=resolve_prompt)], log_file, estimated_tokens=estimated_tokens, cache_if=_has_json_object)
             if response:
-                # In a real implementation, we would apply the solution here
-                if _defect_ledger:
-                    _defect_ledger.update_defect_status(defect['id'], DefectStatus.RESOLVED, "Integration Agent")
-                defects_resolved += 1
-                _metrics.defects_resolved += 1
+                resolution_data = _extract_first_json(response.content)
+                if resolution_data is None:
+                    log_and_print(f"    [Warning] Failed to parse defect resolutions: no JSON object found", log_file)
+                else:
+                    batch_ids = {d['id'] for d in batch}
+                    resolved_ids = set()
+                    for resolution in resolution_data.get('resolutions', []):
+                        defect_id = resolution.get('id') if isinstance(resolution, dict) else None
+                        # The model may echo ids as strings
+                        try:
+                            defect_id = int(defect_id)
+                        except (TypeError, ValueError):
+                            continue
+                        if defect_id in batch_ids and defect_id not in resolved_ids:
+                            resolved_ids.add(defect_id)
+                            # In a real implementation, we would apply the solution here
+                            if _defect_ledger:
+                                _defect_ledger.update_defect_status(defect_id, DefectStatus.RESOLVED, "Integration Agent")
+                            defects_resolved += 1
+                            _metrics.defects_resolved += 1
         except Exception as e:
             if '429' in str(e) or 'rate_limit' in str(e).lower():
                 log_and_print(f"    [Rate Limit] Stopping defect resolution due to rate limit", log_file)
-                break
-            log_and_print(f"    [Error] Failed to resolve defect #{defect['id']}: {str(e)[:100]}", log_file)
+            else:
+                log_and_print(f"    [Error] Failed to resolve defects: {str(e)[:100]}", log_file)
     
     # Check for architectural consistency (only in Cycle 1, skip in later cycles to save tokens)
-    if cycle_number == 1 and _rate_limiter.get_remaining_daily_tokens() > 5000:
+    if cycle_number == 1 and _budget_guard.can_afford(1) and _token_bucket.try_acquire(1000):
         try:
             consistency_prompt = f"""You are an Integration Agent checking architectural consistency.
 
@@ -1209,15 +2138,14 @@ def cross_team_consolidation(
     - Identifies cross-team issues and dependencies
     - Feeds back to teams for next cycle planning
     """
-    global _defect_ledger, _rate_limiter
-    _defect_ledger = get_defect_ledger()
+    global _rate_limiter
     
     # Check token budget - Skip consolidation in Cycle 3+ to save tokens
     remaining_tokens = _rate_limiter.get_remaining_daily_tokens()
     if cycle_number > 2:
         log_and_print(f"  [Consolidation] Skipping in Cycle {cycle_number} to save tokens", log_file)
         return {"cross_team_issues": 0, "consolidation_feedback": []}
-    if remaining_tokens < 5000:
+    if not _budget_guard.can_afford(1) or not _token_bucket.try_acquire(1000):
         log_and_print(f"  [Consolidation] Skipping due to low token budget ({remaining_tokens} remaining)", log_file)
         return {"cross_team_issues": 0, "consolidation_feedback": []}
     
@@ -1228,7 +2156,8 @@ def cross_team_consolidation(
         "pages_implemented": do_result.get('pages_implemented', 0),
         "pages_refined": do_result.get('pages_refined', 0),
         "endpoints_implemented": do_result.get('endpoints_implemented', 0),
-        "endpoints_refined": do_result.get('endpoints_refined', 0)
+        "endpoints_refined": do_result.get('endpoints_refined', 0),
+        "refinements_skipped": do_result.get('refinements_skipped', 0)
     }
     
     verification_summary = {
@@ -1257,6 +2186,7 @@ RESULTS FROM TEAMS:
    - Pages refined: {implementation_summary['pages_refined']}
    - Endpoints implemented: {implementation_summary['endpoints_implemented']}
    - Endpoints refined: {implementation_summary['endpoints_refined']}
+   - Refinements skipped (nothing new since the last one): {implementation_summary['refinements_skipped']}
 
 2. Verification Group (Check Phase):
    - Defects found: {verification_summary['defects_found']}
@@ -1272,7 +2202,7 @@ CURRENT STATE:
 - Resolution rate: {defect_stats.get('resolution_rate', 0):.2%}
 
 OPEN DEFECTS (sample):
-{json.dumps([{'id': d['id'], 'component': d['component'], 'severity': d['severity'], 'description': d['description'][:80]} for d in open_defects[:5]], indent=2)}
+{json_dumps_indent([{'id': d['id'], 'component': d['component'], 'severity': d['severity'], 'description': d['description'][:80]} for d in open_defects[:5]])}
 
 Analyze and consolidate:
 1. Identify cross-team dependencies and issues
@@ -1306,54 +2236,50 @@ Return JSON:
 }}"""
 
     try:
-        response = invoke_with_rate_limit(consolidation_agent, [HumanMessage(content=consolidation_prompt)], log_file, estimated_tokens=1000)  # Reduced from 2000
+        response = invoke_with_rate_limit(consolidation_agent, [HumanMessage(content=consolidation_prompt)], log_file, estimated_tokens=1000, cache_if=_has_json_object)  # Reduced from 2000
         if not response:
             return {"cross_team_issues": 0, "consolidation_feedback": []}
         
         content = response.content.strip()
         
-        try:
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            if json_start >= 0:
-                consolidation_data = json.loads(content[json_start:json_end])
-                
-                cross_team_issues = consolidation_data.get('cross_team_issues', [])
-                feedback = consolidation_data.get('consolidation_feedback', [])
-                recommendations = consolidation_data.get('next_cycle_recommendations', [])
-                integration_status = consolidation_data.get('integration_status', 'unknown')
-                
-                log_and_print(f"  ✓ Consolidation complete:", log_file)
-                log_and_print(f"    Cross-team issues: {len(cross_team_issues)}", log_file)
-                log_and_print(f"    Feedback items: {len(feedback)}", log_file)
-                log_and_print(f"    Integration status: {integration_status}", log_file)
-                
-                # Log critical issues
-                critical_issues = [i for i in cross_team_issues if i.get('severity') == 'high']
-                if critical_issues:
-                    log_and_print(f"    ⚠ Critical cross-team issues found:", log_file)
-                    for issue in critical_issues[:3]:
-                        log_and_print(f"      - {issue.get('issue', 'Unknown')[:60]}...", log_file)
-                
-                # Add feedback to defect ledger as improvements
-                if _defect_ledger and feedback:
-                    for fb in feedback[:3]:  # Limit to top 3
-                        if fb.get('priority') in ['high', 'medium']:
-                            _defect_ledger.add_improvement(
-                                fb.get('feedback', ''),
-                                fb.get('for_team', 'system'),
-                                'consolidation_agent',
-                                fb.get('priority', 'medium')
-                            )
-                
-                return {
-                    "cross_team_issues": len(cross_team_issues),
-                    "consolidation_feedback": feedback,
-                    "next_cycle_recommendations": recommendations,
-                    "integration_status": integration_status
-                }
-        except json.JSONDecodeError as e:
-            log_and_print(f"  [Warning] Failed to parse consolidation data: {e}", log_file)
+        consolidation_data = _extract_first_json(content)
+        if consolidation_data is None:
+            log_and_print(f"  [Warning] Failed to parse consolidation data: no JSON object found", log_file)
+        else:
+            cross_team_issues = consolidation_data.get('cross_team_issues', [])
+            feedback = consolidation_data.get('consolidation_feedback', [])
+            recommendations = consolidation_data.get('next_cycle_recommendations', [])
+            integration_status = consolidation_data.get('integration_status', 'unknown')
+            
+            log_and_print(f"  ✓ Consolidation complete:", log_file)
+            log_and_print(f"    Cross-team issues: {len(cross_team_issues)}", log_file)
+            log_and_print(f"    Feedback items: {len(feedback)}", log_file)
+            log_and_print(f"    Integration status: {integration_status}", log_file)
+            
+            # Log critical issues
+            critical_issues = [i for i in cross_team_issues if i.get('severity') == 'high']
+            if critical_issues:
+                log_and_print(f"    ⚠ Critical cross-team issues found:", log_file)
+                for issue in critical_issues[:3]:
+                    log_and_print(f"      - {issue.get('issue', 'Unknown')[:60]}...", log_file)
+            
+            # Add feedback to defect ledger as improvements
+            if _defect_ledger and feedback:
+                for fb in feedback[:3]:  # Limit to top 3
+                    if fb.get('priority') in ['high', 'medium']:
+                        _defect_ledger.add_improvement(
+                            fb.get('feedback', ''),
+                            fb.get('for_team', 'system'),
+                            'consolidation_agent',
+                            fb.get('priority', 'medium')
+                        )
+            
+            return {
+                "cross_team_issues": len(cross_team_issues),
+                "consolidation_feedback": feedback,
+                "next_cycle_recommendations": recommendations,
+                "integration_status": integration_status
+            }
     except Exception as e:
         if '429' not in str(e) and 'rate_limit' not in str(e).lower():
             log_and_print(f"  [Error] Consolidation failed: {str(e)[:100]}", log_file)
@@ -1368,11 +2294,25 @@ def get_page_file_path(page: Dict, project_path: str) -> str:
     return os.path.join(project_path, "src", "pages", f"{component_name}.jsx")
 
 
+def _file_names(directory: str) -> set:
+    """Names of the regular files in a directory (empty if it does not exist)."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+
+@lru_cache(maxsize=1024)
+def endpoint_resource(path: str) -> str:
+    """Resource segment of an endpoint path (/api/auth/login -> auth), computed once per path."""
+    path_parts = path.strip('/').split('/')
+    return path_parts[1] if len(path_parts) > 1 else 'general'
+
+
 def get_endpoint_file_path(endpoint: Dict, project_path: str) -> str:
     """Get the file path for an endpoint."""
-    path = endpoint.get('path', '')
-    path_parts = path.strip('/').split('/')
-    resource = path_parts[1] if len(path_parts) > 1 else 'general'
+    resource = endpoint_resource(endpoint.get('path', ''))
     return os.path.join(project_path, "routes", f"{resource}_routes.py")
 
 
@@ -1386,22 +2326,72 @@ def get_components_with_defects_prioritized(pages: List[Dict], endpoints: List[D
     
     open_defects = defect_ledger.get_open_defects()
     
+    # Dicts double as insertion-ordered sets: O(1) dedupe, first-seen order kept
     components_by_severity = {
-        'critical': [],
-        'high': [],
-        'medium': [],
-        'low': []
+        'critical': {},
+        'high': {},
+        'medium': {},
+        'low': {}
     }
     
     for defect in open_defects:
-        severity = defect.get('severity', 'medium')
-        component = defect.get('component', '')
-        
-        if severity in components_by_severity:
-            if component not in components_by_severity[severity]:
-                components_by_severity[severity].append(component)
+        components = components_by_severity.get(defect.get('severity', 'medium'))
+        if components is not None:
+            components[defect.get('component', '')] = None
+    
+    return {severity: list(components) for severity, components in components_by_severity.items()}
+
+
+def record_cycle_mementos(cycle_number: int, log_file: str) -> List[CycleMemento]:
+    """
+    Compress the open defects after a CHECK phase into per-component mementos
+    with one short summarization call, so later PLAN prompts carry one line per
+    component instead of raw defect text. Earlier mementos whose component no
+    longer has open defects are marked resolved.
+    """
+    global _metrics
+    open_defects = _defect_ledger.get_open_defects() if _defect_ledger else []
+    
+    open_components = {d['component'] for d in open_defects}
+    for memento in _metrics.mementos:
+        if memento.status == "open" and memento.component not in open_components:
+            memento.status = "resolved"
+    
+    if not open_defects:
+        return []
+    
+    # Group by component, keeping the most severe defect first
+    severity_rank = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3, 'minor': 4}
+    by_component: Dict[str, List[Dict[str, Any]]] = {}
+    for defect in sorted(open_defects, key=lambda d: severity_rank.get(d.get('severity'), 5)):
+        by_component.setdefault(defect['component'], []).append(defect)
+    
+    mementos = {component: CycleMemento.from_defect(defects[0]) for component, defects in by_component.items()}
+    
+    summary_prompt = f"""Summarize the root cause of the open defects for each component in ONE short line (max 15 words).
+
+DEFECTS BY COMPONENT:
+{json_dumps_indent({component: [d['description'][:200] for d in defects[:3]] for component, defects in list(by_component.items())[:20]})}
+
+Return JSON only:
+{{"mementos": [{{"component": "component key as given", "root_cause": "one line"}}]}}"""
     
-    return components_by_severity
+    try:
+        agent = get_agent(temperature=0.1, max_tokens=500)
+        response = invoke_with_rate_limit(agent, [HumanMessage(content=summary_prompt)], log_file, cache_if=_has_json_object)
+        result = _extract_first_json(response.content) if response else None
+        for item in (result or {}).get('mementos', []):
+            memento = mementos.get(item.get('component'))
+            if memento and item.get('root_cause'):
+                memento.root_cause_1line = str(item['root_cause'])[:120]
+    except Exception as e:
+        # The ledger-derived one-liners are already usable
+        log_and_print(f"  [Mementos] Summarization skipped: {str(e)[:100]}", log_file)
+    
+    new_mementos = list(mementos.values())
+    _metrics.mementos = [m for m in _metrics.mementos if m.component not in mementos] + new_mementos
+    log_and_print(f"  ✓ Cycle {cycle_number}: compressed {len(open_defects)} open defects into {len(new_mementos)} mementos", log_file)
+    return new_mementos
 
 
 def validate_frontend_backend_integration(design: Dict, react_path: str, flask_path: str, log_file: str) -> int:
@@ -1413,8 +2403,6 @@ def validate_frontend_backend_integration(design: Dict, react_path: str, flask_p
     3. Frontend components don't call backend endpoints
     4. Buttons don't interact with backend/DB
     """
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
     
     if not _defect_ledger:
         return 0
@@ -1621,9 +2609,7 @@ def validate_frontend_backend_integration(design: Dict, react_path: str, flask_p
     for endpoint in endpoints:
         path = endpoint.get('path', '')
         method = endpoint.get('method', 'GET')
-        path_parts = path.strip('/').split('/')
-        resource = path_parts[1] if len(path_parts) > 1 else 'general'
-        route_file = os.path.join(flask_path, "routes", f"{resource}_routes.py")
+        route_file = get_endpoint_file_path(endpoint, flask_path)
         
         if not os.path.exists(route_file):
             if _defect_ledger:
@@ -1697,70 +2683,113 @@ def validate_frontend_backend_integration(design: Dict, react_path: str, flask_p
     return defects_found
 
 
-def get_components_needing_refinement(pages: List[Dict], endpoints: List[Dict], cycle_number: int) -> Dict[str, List[str]]:
+def get_components_needing_refinement(pages: List[Dict], endpoints: List[Dict], cycle_number: int, open_defects: List[Dict] = None) -> Dict[str, List[str]]:
     """
     Identify components that need refinement based on defects and improvements.
     True Kaizen: Focus refinement on components with issues.
+    Pass open_defects (e.g. from a CycleSnapshot) to avoid re-reading the ledger.
     
     Returns:
         Dict with 'pages' and 'endpoints' lists containing file paths that need refinement
     """
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
-    
-    components_to_refine = {
-        'pages': [],  # List of file paths
-        'endpoints': []  # List of file paths
-    }
     
     if not _defect_ledger or cycle_number == 1:
-        return components_to_refine
+        return {'pages': [], 'endpoints': []}
+    
+    # Dicts double as insertion-ordered sets: O(1) dedupe, first-seen order kept
+    pages_to_refine = {}  # Page names
+    endpoints_to_refine = {}  # Endpoint paths
     
     # Get open defects
-    open_defects = _defect_ledger.get_open_defects()
+    if open_defects is None:
+        open_defects = _defect_ledger.get_open_defects()
     
-    # Group defects by component and map to file paths
+    # Defects only count for pages that are still in the design
+    design_page_names = {page.get('page_name') for page in pages}
     for defect in open_defects:
         component = defect.get('component', '')
         if 'frontend/' in component:
             page_name = component.replace('frontend/', '')
-            # Find the page in design and get its file path
-            for page in pages:
-                if page.get('page_name') == page_name:
-                    file_path = get_page_file_path(page, "dummy")  # We'll extract just the filename
-                    if file_path not in components_to_refine['pages']:
-                        components_to_refine['pages'].append(page_name)  # Store page name for matching
-                    break
+            if page_name in design_page_names:
+                pages_to_refine[page_name] = None
         elif 'backend/' in component:
-            endpoint_path = component.replace('backend/', '')
-            if endpoint_path not in components_to_refine['endpoints']:
-                components_to_refine['endpoints'].append(endpoint_path)
+            endpoints_to_refine[component.replace('backend/', '')] = None
     
     # Get improvement suggestions
-    improvements = _defect_ledger.improvements
-    for improvement in improvements:
+    for improvement in _defect_ledger.improvements:
         if improvement.get('status') == 'pending':
             component = improvement.get('component', '')
             if 'frontend/' in component:
-                page_name = component.replace('frontend/', '')
-                if page_name not in components_to_refine['pages']:
-                    components_to_refine['pages'].append(page_name)
+                pages_to_refine[component.replace('frontend/', '')] = None
             elif 'backend/' in component:
-                endpoint_path = component.replace('backend/', '')
-                if endpoint_path not in components_to_refine['endpoints']:
-                    components_to_refine['endpoints'].append(endpoint_path)
+                endpoints_to_refine[component.replace('backend/', '')] = None
     
-    return components_to_refine
+    return {'pages': list(pages_to_refine), 'endpoints': list(endpoints_to_refine)}
+
+
+def _refinement_inputs(component_defects: List[Dict], improvement_suggestions: List[Dict]) -> frozenset:
+    """Ids of the defects and improvements a refinement prompt shows."""
+    return frozenset(
+        [('defect', d['id']) for d in component_defects[:REFINE_PROMPT_DEFECTS]] +
+        [('improvement', imp['id']) for imp in improvement_suggestions[:REFINE_PROMPT_IMPROVEMENTS]]
+    )
+
+
+def _refinement_issue_lines(component_defects: List[Dict], improvement_suggestions: List[Dict]) -> Tuple[str, str]:
+    """Defect and improvement bullet lists for a refinement prompt (empty strings when there are none)."""
+    defects_info = "\n".join([f"- {d['description']} (Severity: {d['severity']})" for d in component_defects[:REFINE_PROMPT_DEFECTS]])
+    improvements_info = "\n".join([f"- {imp['description']}" for imp in improvement_suggestions[:REFINE_PROMPT_IMPROVEMENTS]])
+    return defects_info, improvements_info
+
+
+def _refinement_is_current(component: str, component_file: str, component_defects: List[Dict], improvement_suggestions: List[Dict]) -> bool:
+    """
+    True when the component was refined before, its file has not been written
+    since, and every open defect and pending improvement was already in that
+    refinement's prompt, so another refinement would repeat the same request.
+    """
+    last = _metrics.last_refined.get(component)
+    if last is None:
+        return False
+    refined_at, seen = last
+    try:
+        if os.path.getmtime(component_file) > refined_at:
+            return False
+    except OSError:
+        return False
+    return (all(('defect', d['id']) in seen for d in component_defects) and
+            all(('improvement', imp['id']) in seen for imp in improvement_suggestions))
+
+
+def _component_refinement_is_current(component: str, component_file: str) -> bool:
+    """_refinement_is_current for a component, looking up its open defects and pending improvements in the ledger."""
+    if component not in _metrics.last_refined:
+        return False
+    component_defects = []
+    improvement_suggestions = []
+    if _defect_ledger:
+        component_defects = [d for d in _defect_ledger.get_open_defects(component=component) if d['status'] in ['open', 'in_progress']]
+        improvement_suggestions = _defect_ledger.get_pending_improvements(component)
+    return _refinement_is_current(component, component_file, component_defects, improvement_suggestions)
+
+
+def build_endpoint_index(endpoints: List[Dict]) -> Dict[Tuple[str, str], Dict]:
+    """Index endpoint specs by (path, method); the first spec wins on duplicates."""
+    endpoint_index = {}
+    for endpoint in endpoints:
+        endpoint_index.setdefault((endpoint.get('path'), endpoint.get('method')), endpoint)
+    return endpoint_index
 
 
-def implement_page_kaizen(page: Dict, project_path: str, all_endpoints: List[Dict], description: str, agent_id: int, log_file: str, is_refinement: bool = False, design: Dict = None) -> bool:
+def implement_page_kaizen(page: Dict, project_path: str, endpoint_index: Dict[Tuple[str, str], Dict], description: str, agent_id: int, log_file: str, is_refinement: bool = False, design: Dict = None) -> Optional[bool]:
     """
     Implementation Group agent implements or refines a frontend page with Kaizen principles.
     
     True Kaizen: Cycle 1 implements, Cycle 2+ refines the same component.
+    
+    Returns True on success, False on failure, and None when a refinement is
+    skipped because nothing changed since the last one.
     """
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
     page_name = page.get('page_name', 'Unknown')
     requirements = page.get('requirements', [])
     page_endpoints = page.get('backend_endpoints', [])
@@ -1772,12 +2801,7 @@ def implement_page_kaizen(page: Dict, project_path: str, all_endpoints: List[Dic
     application_type = design.get('application_type', 'Web Application') if design else 'Web Application'
     
     # Get full endpoint specs
-    endpoint_specs = []
-    for ep in page_endpoints:
-        for full_ep in all_endpoints:
-            if ep.get('path') == full_ep.get('path') and ep.get('method') == full_ep.get('method'):
-                endpoint_specs.append(full_ep)
-                break
+    endpoint_specs = [endpoint_index[key] for key in ((ep.get('path'), ep.get('method')) for ep in page_endpoints) if key in endpoint_index]
     
     component_file = get_page_file_path(page, project_path)
     existing_code = None
@@ -1786,7 +2810,7 @@ def implement_page_kaizen(page: Dict, project_path: str, all_endpoints: List[Dic
     if is_refinement and os.path.exists(component_file):
         try:
             with open(component_file, 'r', encoding='utf-8') as f:
-                existing_code = f.read()
+                existing_code = f.read(REFINE_CODE_CHARS)
         except Exception as e:
             log_and_print(f"    [Warning] Could not read existing code: {e}", log_file)
     
@@ -1798,15 +2822,17 @@ def implement_page_kaizen(page: Dict, project_path: str, all_endpoints: List[Dic
         component_defects = [d for d in open_defects if d['status'] in ['open', 'in_progress']]
         
         # Get improvement suggestions
-        for improvement in _defect_ledger.improvements:
-            if improvement.get('component') == f"frontend/{page_name}" and improvement.get('status') == 'pending':
-                improvement_suggestions.append(improvement)
+        improvement_suggestions = _defect_ledger.get_pending_improvements(f"frontend/{page_name}")
+    
+    # Nothing new since the last refinement and the file is untouched: skip the LLM call
+    if is_refinement and existing_code and _refinement_is_current(f"frontend/{page_name}", component_file, component_defects, improvement_suggestions):
+        log_and_print(f"    [Skip] {page_name} unchanged since its last refinement", log_file)
+        return None
     
     # Build prompt based on whether it's implementation or refinement
     if is_refinement and existing_code:
         # REFINEMENT: Improve existing code
-        defects_info = "\n".join([f"- {d['description']} (Severity: {d['severity']})" for d in component_defects[:5]])
-        improvements_info = "\n".join([f"- {imp['description']}" for imp in improvement_suggestions[:3]])
+        defects_info, improvements_info = _refinement_issue_lines(component_defects, improvement_suggestions)
         
         prompt = f"""You are an Implementation Agent in the Kaizen system. REFINE an existing React component to improve quality.
 
@@ -1817,7 +2843,7 @@ PAGE: {page_name}
 Description: {page.get('description', '')}
 
 CURRENT CODE (first 2000 chars):
-{existing_code[:2000]}
+{existing_code}
 
 DEFECTS TO FIX:
 {defects_info if defects_info else "No specific defects identified"}
@@ -1935,15 +2961,11 @@ Return ONLY complete React component code (JSX) with Tailwind, starting with imp
 
     try:
         agent = get_agent(max_tokens=3000)
-        response = invoke_with_rate_limit(agent, [HumanMessage(content=prompt)], log_file, estimated_tokens=1500)
+        response = invoke_with_rate_limit(agent, [HumanMessage(content=prompt)], log_file)
         component_code = response.content.strip()
         
         # Clean code blocks
-        if "```" in component_code:
-            component_code = component_code.split("```")[1]
-            if component_code.startswith("jsx") or component_code.startswith("javascript"):
-                component_code = component_code.split('\n', 1)[1]
-            component_code = component_code.split("```")[0]
+        component_code = _strip_code_fence(component_code)
         
         # Validate that we got actual component code
         if not component_code or len(component_code) < 100:
@@ -2325,8 +3347,7 @@ Return ONLY complete React component code (JSX) with Tailwind, starting with imp
         # **CRITICAL**: Fix import paths dynamically before saving
         component_code = fix_import_paths(component_code, component_file, project_path)
         
-        with open(component_file, 'w', encoding='utf-8') as f:
-            f.write(component_code)
+        write_text_atomic(component_file, component_code)
         
         # **CRITICAL**: After saving, check for missing imported components and generate them
         missing_components = detect_missing_imports(component_code, component_file, project_path)
@@ -2338,6 +3359,9 @@ Return ONLY complete React component code (JSX) with Tailwind, starting with imp
         action = "Refined" if is_refinement else "Implemented"
         log_and_print(f"    ✓ {action} {page_name}", log_file)
         
+        if is_refinement:
+            _metrics.last_refined[f"frontend/{page_name}"] = (time.time(), _refinement_inputs(component_defects, improvement_suggestions))
+        
         # Mark defects as resolved if this was a refinement
         if is_refinement and _defect_ledger and component_defects:
             for defect in component_defects[:3]:  # Mark top 3 as resolved
@@ -2617,11 +3641,7 @@ Return ONLY the complete React component code (JSX) with Tailwind CSS classes, n
         component_code = response.content.strip()
         
         # Clean code blocks
-        if "```" in component_code:
-            component_code = component_code.split("```")[1]
-            if component_code.startswith("jsx") or component_code.startswith("javascript"):
-                component_code = component_code.split('\n', 1)[1]
-            component_code = component_code.split("```")[0]
+        component_code = _strip_code_fence(component_code)
         
         # Ensure it has React import
         if "import React" not in component_code:
@@ -2636,8 +3656,7 @@ Return ONLY the complete React component code (JSX) with Tailwind CSS classes, n
         component_code = fix_import_paths(component_code, component_file, project_path)
         
         # Save component
-        with open(component_file, 'w', encoding='utf-8') as f:
-            f.write(component_code)
+        write_text_atomic(component_file, component_code)
         
         if log_file:
             log_and_print(f"  ✓ Auto-generated missing component: {component_name}.jsx", log_file)
@@ -2800,7 +3819,7 @@ def validate_python_syntax_and_patterns(code: str) -> Tuple[bool, Optional[str],
     return (True, None, pattern_issues)
 
 
-def implement_endpoint_kaizen(endpoint: Dict, project_path: str, description: str, agent_id: int, log_file: str, is_refinement: bool = False, use_mongodb: bool = False) -> bool:
+def implement_endpoint_kaizen(endpoint: Dict, project_path: str, description: str, agent_id: int, log_file: str, is_refinement: bool = False, use_mongodb: bool = False) -> Optional[bool]:
     """
     Implementation Group agent implements or refines a backend endpoint with Kaizen principles.
     
@@ -2808,9 +3827,11 @@ def implement_endpoint_kaizen(endpoint: Dict, project_path: str, description: st
     
     Args:
         use_mongodb: If True, use MongoDB for database operations instead of SQLite
+    
+    Returns:
+        True on success, False on failure, and None when a refinement is skipped
+        because nothing changed since the last one
     """
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
     path = endpoint.get('path', '')
     method = endpoint.get('method', 'GET')
     
@@ -2821,7 +3842,7 @@ def implement_endpoint_kaizen(endpoint: Dict, project_path: str, description: st
     if is_refinement and os.path.exists(endpoint_file):
         try:
             with open(endpoint_file, 'r', encoding='utf-8') as f:
-                existing_code = f.read()
+                existing_code = f.read(REFINE_CODE_CHARS)
         except Exception as e:
             log_and_print(f"    [Warning] Could not read existing code: {e}", log_file)
     
@@ -2833,21 +3854,23 @@ def implement_endpoint_kaizen(endpoint: Dict, project_path: str, description: st
         component_defects = [d for d in open_defects if d['status'] in ['open', 'in_progress']]
         
         # Get improvement suggestions
-        for improvement in _defect_ledger.improvements:
-            if improvement.get('component') == f"backend/{path}" and improvement.get('status') == 'pending':
-                improvement_suggestions.append(improvement)
+        improvement_suggestions = _defect_ledger.get_pending_improvements(f"backend/{path}")
+    
+    # Nothing new since the last refinement and the file is untouched: skip the LLM call
+    if is_refinement and existing_code and _refinement_is_current(f"backend/{path}", endpoint_file, component_defects, improvement_suggestions):
+        log_and_print(f"    [Skip] {method} {path} unchanged since its last refinement", log_file)
+        return None
     
     # Build prompt based on whether it's implementation or refinement
     if is_refinement and existing_code:
         # REFINEMENT: Improve existing code
-        defects_info = "\n".join([f"- {d['description']} (Severity: {d['severity']})" for d in component_defects[:5]])
-        improvements_info = "\n".join([f"- {imp['description']}" for imp in improvement_suggestions[:3]])
+        defects_info, improvements_info = _refinement_issue_lines(component_defects, improvement_suggestions)
         
         prompt = f"""REFINE existing Flask endpoint: fix defects and apply improvements while maintaining functionality.
 
 CONTEXT: {description}
 ENDPOINT: {json.dumps(endpoint, indent=2)}
-CURRENT CODE: {existing_code[:2000]}
+CURRENT CODE: {existing_code}
 DEFECTS: {defects_info if defects_info else "None"}
 IMPROVEMENTS: {improvements_info if improvements_info else "None"}
 
@@ -2897,14 +3920,11 @@ Return ONLY Python route handler code starting with @app.route."""
 
     try:
         agent = get_agent(max_tokens=3000)
-        response = invoke_with_rate_limit(agent, [HumanMessage(content=prompt)], log_file, estimated_tokens=1500)
+        response = invoke_with_rate_limit(agent, [HumanMessage(content=prompt)], log_file)
         code = response.content.strip()
         
         # Clean code blocks
-        if "```python" in code:
-            code = code.split("```python")[1].split("```")[0]
-        elif "```" in code:
-            code = code.split("```")[1].split("```")[0]
+        code = _strip_code_fence(code)
         
         # Validate that we got actual endpoint code
         if not code or len(code) < 50:
@@ -2962,13 +3982,10 @@ CRITICAL REQUIREMENTS:
 
 Return ONLY valid Python code starting with @app.route decorator."""
                 
-                retry_response = invoke_with_rate_limit(agent, [HumanMessage(content=retry_prompt)], log_file, estimated_tokens=2000)
+                retry_response = invoke_with_rate_limit(agent, [HumanMessage(content=retry_prompt)], log_file)
                 if retry_response:
                     retry_code = retry_response.content.strip()
-                    if "```python" in retry_code:
-                        retry_code = retry_code.split("```python")[1].split("```")[0]
-                    elif "```" in retry_code:
-                        retry_code = retry_code.split("```")[1].split("```")[0]
+                    retry_code = _strip_code_fence(retry_code)
                     code = retry_code
                     continue
             else:
@@ -3194,44 +4211,44 @@ Return ONLY valid Python code starting with @app.route decorator."""
         
         # Organize routes into separate files by resource
         # Extract resource from path (e.g., /api/auth/login -> auth, /api/products -> products)
-        path_parts = path.strip('/').split('/')
-        resource = path_parts[1] if len(path_parts) > 1 else 'general'
+        resource = endpoint_resource(path)
         
         route_file = os.path.join(project_path, "routes", f"{resource}_routes.py")
         routes_dir = os.path.dirname(route_file)
         os.makedirs(routes_dir, exist_ok=True)
         
-        # Check if route file exists
-        route_exists = os.path.exists(route_file)
+        # Agents implementing endpoints of the same resource share one route file
+        with _file_lock(route_file):
+            # Check if route file exists
+            route_exists = os.path.exists(route_file)
         
-        if route_exists:
-            # Read existing route file
-            with open(route_file, 'r', encoding='utf-8') as f:
-                existing_routes = f.read()
+            if route_exists:
+                # Read existing route file
+                with open(route_file, 'r', encoding='utf-8') as f:
+                    existing_routes = f.read()
             
-            # Check if this endpoint already exists
-            endpoint_signature = f"@app.route('{path}'"
-            if endpoint_signature in existing_routes and not is_refinement:
-                # Endpoint already exists, append as new version
-                with open(route_file, 'a', encoding='utf-8') as f:
-                    f.write(f"\n\n# {method} {path} - {'Refined' if is_refinement else 'New version'} by Implementation Agent {agent_id}\n")
-                    f.write(code.strip() + "\n")
+                # Check if this endpoint already exists
+                endpoint_signature = f"@app.route('{path}'"
+                if endpoint_signature in existing_routes and not is_refinement:
+                    # Endpoint already exists, append as new version
+                    with open(route_file, 'a', encoding='utf-8') as f:
+                        f.write(f"\n\n# {method} {path} - {'Refined' if is_refinement else 'New version'} by Implementation Agent {agent_id}\n")
+                        f.write(code.strip() + "\n")
+                else:
+                    # Append new endpoint
+                    with open(route_file, 'a', encoding='utf-8') as f:
+                        f.write(f"\n\n# {method} {path} - {'Refined' if is_refinement else 'Implemented'} by Implementation Agent {agent_id}\n")
+                        f.write(code.strip() + "\n")
             else:
-                # Append new endpoint
-                with open(route_file, 'a', encoding='utf-8') as f:
-                    f.write(f"\n\n# {method} {path} - {'Refined' if is_refinement else 'Implemented'} by Implementation Agent {agent_id}\n")
-                    f.write(code.strip() + "\n")
-        else:
-            # Create new route file
-            # Routes will be executed with app and db in namespace
-            route_file_content = f"""# {resource.upper()} Routes
+                # Create new route file
+                # Routes will be executed with app and db in namespace
+                route_file_content = f"""# {resource.upper()} Routes
 # Auto-generated by Kaizen Implementation Agents
 
 # {method} {path} - {'Refined' if is_refinement else 'Implemented'} by Implementation Agent {agent_id}
 {code.strip()}
 """
-            with open(route_file, 'w', encoding='utf-8') as f:
-                f.write(route_file_content)
+                write_text_atomic(route_file, route_file_content)
         
         # Update app.py to execute route files (making app and db available)
         app_py_path = os.path.join(project_path, "app.py")
@@ -3279,6 +4296,9 @@ if os.path.exists(route_files_dir):
         action = "Refined" if is_refinement else "Implemented"
         log_and_print(f"    ✓ {action} {method} {path}", log_file)
         
+        if is_refinement:
+            _metrics.last_refined[f"backend/{path}"] = (time.time(), _refinement_inputs(component_defects, improvement_suggestions))
+        
         # Mark defects as resolved if this was a refinement
         if is_refinement and _defect_ledger and component_defects:
             for defect in component_defects[:3]:  # Mark top 3 as resolved
@@ -3304,10 +4324,47 @@ if os.path.exists(route_files_dir):
         return False
 
 
+def _record_verification_defects(found_defects: List[Dict[str, Any]], component: str, agent_id: int) -> List[Dict]:
+    """
+    Add a verifier's defects to the ledger, skipping any whose description is
+    already open on the same component (e.g. a cached verdict seen again).
+    """
+    if not _defect_ledger:
+        return []
+    open_descriptions = {d['description'] for d in _defect_ledger.get_open_defects(component=component) if d['component'] == component}
+    
+    recorded = []
+    for defect in found_defects:
+        if not isinstance(defect, dict) or not defect.get('description') or defect['description'] in open_descriptions:
+            continue
+        severity = _SEVERITY_MAP.get(defect.get('severity', 'medium'), DefectSeverity.MEDIUM)
+        defect_id = _defect_ledger.add_defect(
+            defect['description'],
+            component,
+            severity,
+            f"Verification Agent {agent_id}",
+            defect.get('category', 'general'),
+            {'line_number': defect.get('line_number'), 'suggestion': defect.get('suggestion')}
+        )
+        open_descriptions.add(defect['description'])
+        recorded.append({"id": defect_id, "severity": defect.get('severity')})
+    return recorded
+
+
+def _read_verification_code(path: str) -> Optional[str]:
+    """
+    Head of a source file as it goes into a verification prompt, or None if the
+    file does not exist. A single open replaces an exists check plus open.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return truncate_to_tokens(f.read(VERIFY_CODE_CHARS), VERIFY_CODE_TOKENS)
+    except FileNotFoundError:
+        return None
+
+
 def verify_page_kaizen(page: Dict, project_path: str, agent_id: int, log_file: str) -> List[Dict]:
     """Verification Group agent inspects a frontend page for defects."""
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
     
     page_name = page.get('page_name', 'Unknown')
     component_name = page_name.replace(" ", "").replace("-", "")
@@ -3315,7 +4372,13 @@ def verify_page_kaizen(page: Dict, project_path: str, agent_id: int, log_file: s
     
     defects = []
     
-    if not os.path.exists(component_file):
+    try:
+        code = _read_verification_code(component_file)
+    except Exception as e:
+        log_and_print(f"    ⚠ Error verifying {page_name}: {e}", log_file)
+        return defects
+    
+    if code is None:
         if _defect_ledger:
             defect_id = _defect_ledger.add_defect(
                 f"Component file not found: {component_name}.jsx",
@@ -3327,65 +4390,34 @@ def verify_page_kaizen(page: Dict, project_path: str, agent_id: int, log_file: s
             defects.append({"id": defect_id, "severity": "critical"})
         return defects
     
-    # Read and verify code
+    # Verify code
     try:
-        with open(component_file, 'r', encoding='utf-8') as f:
-            code = f.read()
-        
-        verification_agent = get_agent(temperature=0.2, max_tokens=1500)
-        
-        verify_prompt = f"""Inspect this code for defects: syntax, logic, error handling, accessibility, performance, security, quality.
-
-COMPONENT: {page_name}
-CODE: {code[:1000]}
-
-Return JSON:
-{{
-    "defects": [
-        {{
-            "description": "defect description",
-            "severity": "critical|high|medium|low|minor",
-            "category": "syntax|logic|security|performance|quality",
-            "line_number": 10,
-            "suggestion": "how to fix"
-        }}
-    ]
-}}"""
+        # Unchanged code keeps its earlier verdict; skip the LLM call
+        cache_key = _verification_cache.key("page", page_name, code)
+        found_defects = _verification_cache.get(cache_key)
+        if found_defects is not None:
+            log_and_print(f"    [Verify Cache] Reusing verdict for unchanged {page_name}", log_file)
+        else:
+            verification_agent = get_agent(temperature=0.2, max_tokens=VERIFY_MAX_TOKENS, timeout=VERIFY_TIMEOUT, json_mode=True)
+            
+            verify_prompt = f"""COMPONENT: {page_name}
+CODE: {code}"""
 
-        response = invoke_with_rate_limit(verification_agent, [HumanMessage(content=verify_prompt)], log_file, estimated_tokens=1500)
-        if not response:
-            return defects
-        content = response.content.strip()
-        
-        try:
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            if json_start >= 0:
-                result = json.loads(content[json_start:json_end])
-                found_defects = result.get('defects', [])
-                
-                for defect in found_defects:
-                    severity_map = {
-                        'critical': DefectSeverity.CRITICAL,
-                        'high': DefectSeverity.HIGH,
-                        'medium': DefectSeverity.MEDIUM,
-                        'low': DefectSeverity.LOW,
-                        'minor': DefectSeverity.MINOR
-                    }
-                    severity = severity_map.get(defect.get('severity', 'medium'), DefectSeverity.MEDIUM)
-                    
-                    if _defect_ledger:
-                        defect_id = _defect_ledger.add_defect(
-                            defect['description'],
-                            f"frontend/{page_name}",
-                            severity,
-                            f"Verification Agent {agent_id}",
-                            defect.get('category', 'general'),
-                            {'line_number': defect.get('line_number'), 'suggestion': defect.get('suggestion')}
-                        )
-                        defects.append({"id": defect_id, "severity": defect.get('severity')})
-        except:
-            pass
+            response = invoke_with_rate_limit(verification_agent, [SystemMessage(content=VERIFY_SYSTEM), HumanMessage(content=verify_prompt)], log_file, estimated_tokens=1500, cache_if=_has_json_object)
+            if not response:
+                return defects
+            _metrics.tokens_per_component[f"frontend/{page_name}"] = _response_tokens(response) or VERIFY_DEFAULT_TOKENS
+            result = _extract_first_json(response.content.strip())
+            if result is None:
+                log_and_print(f"    [Warning] Failed to parse verification of {page_name}: no JSON object found", log_file)
+                log_and_print(f"    Response content: {response.content[:300]}", log_file)
+                return defects
+            found_defects = result.get('defects', [])
+            if not isinstance(found_defects, list):
+                found_defects = []
+            _verification_cache.put(cache_key, found_defects)
+        
+        defects.extend(_record_verification_defects(found_defects, f"frontend/{page_name}", agent_id))
     
     except Exception as e:
         log_and_print(f"    ⚠ Error verifying {page_name}: {e}", log_file)
@@ -3395,91 +4427,121 @@ Return JSON:
 
 def verify_endpoint_kaizen(endpoint: Dict, project_path: str, agent_id: int, log_file: str) -> List[Dict]:
     """Verification Group agent inspects a backend endpoint for defects."""
-    global _defect_ledger
-    _defect_ledger = get_defect_ledger()
-    
-    path = endpoint.get('path', '')
-    method = endpoint.get('method', 'GET')
-    path_parts = path.strip('/').split('/')
-    resource = path_parts[1] if len(path_parts) > 1 else 'general'
-    resource_file = os.path.join(project_path, "routes", f"{resource}_routes.py")
-    
+    return verify_endpoints_kaizen([endpoint], project_path, agent_id, log_file)
+
+
+def verify_endpoints_kaizen(endpoints: List[Dict], project_path: str, agent_id: int, log_file: str) -> List[Dict]:
+    """
+    Verification Group agent inspects several backend endpoints for defects.
+    Endpoints with unchanged code reuse their cached verdict; the rest are
+    packed into as few LLM calls as VERIFY_BATCH_MAX and VERIFY_BATCH_CODE_TOKENS
+    allow, so the shared instructions are sent once per batch.
+    """
     defects = []
+    pending = []  # (label, component, code, verdict cache key) awaiting an LLM verdict
+    codes: Dict[str, Optional[str]] = {}  # Route file -> code; endpoints of one resource share a file
     
-    if not os.path.exists(resource_file):
-        if _defect_ledger:
-            defect_id = _defect_ledger.add_defect(
-                f"Route file not found: {resource}_routes.py",
-                f"backend/{path}",
-                DefectSeverity.CRITICAL,
-                f"Verification Agent {agent_id}",
-                "missing_file"
-            )
-            defects.append({"id": defect_id, "severity": "critical"})
-        return defects
-    
-    # Read and verify code
-    try:
-        with open(resource_file, 'r', encoding='utf-8') as f:
-            code = f.read()
+    for endpoint in endpoints:
+        path = endpoint.get('path', '')
+        method = endpoint.get('method', 'GET')
+        resource = endpoint_resource(path)
+        resource_file = os.path.join(project_path, "routes", f"{resource}_routes.py")
         
-        verification_agent = get_agent(temperature=0.2, max_tokens=1500)
+        if resource_file not in codes:
+            try:
+                codes[resource_file] = _read_verification_code(resource_file)
+            except Exception as e:
+                log_and_print(f"    ⚠ Error verifying {method} {path}: {e}", log_file)
+                continue
+        code = codes[resource_file]
         
-        verify_prompt = f"""Inspect this endpoint code for defects: syntax, logic, error handling (try-except for DB ops), input validation, security, performance, route functionality, data completeness, error responses, edge cases.
-
-ENDPOINT: {method} {path}
-CODE: {code[:1000]}
+        if code is None:
+            if _defect_ledger:
+                defect_id = _defect_ledger.add_defect(
+                    f"Route file not found: {resource}_routes.py",
+                    f"backend/{path}",
+                    DefectSeverity.CRITICAL,
+                    f"Verification Agent {agent_id}",
+                    "missing_file"
+                )
+                defects.append({"id": defect_id, "severity": "critical"})
+            continue
+        
+        # Unchanged code keeps its earlier verdict; skip the LLM call
+        cache_key = _verification_cache.key("endpoint", f"{method} {path}", code)
+        found_defects = _verification_cache.get(cache_key)
+        if found_defects is not None:
+            log_and_print(f"    [Verify Cache] Reusing verdict for unchanged {method} {path}", log_file)
+            defects.extend(_record_verification_defects(found_defects, f"backend/{path}", agent_id))
+        else:
+            pending.append((f"{method} {path}", f"backend/{path}", code, cache_key))
+    
+    # Pack pending endpoints into batches; code shared with an earlier endpoint
+    # of the batch is not sent again, so it does not count against the budget
+    batch: List[tuple] = []
+    batch_tokens = 0
+    for entry in pending:
+        entry_tokens = 0 if any(entry[2] == queued[2] for queued in batch) else count_tokens(entry[2])
+        if batch and (len(batch) >= VERIFY_BATCH_MAX or batch_tokens + entry_tokens > VERIFY_BATCH_CODE_TOKENS):
+            defects.extend(_verify_endpoint_batch(batch, agent_id, log_file))
+            batch, batch_tokens = [], 0
+            entry_tokens = count_tokens(entry[2])
+        batch.append(entry)
+        batch_tokens += entry_tokens
+    if batch:
+        defects.extend(_verify_endpoint_batch(batch, agent_id, log_file))
+    
+    return defects
 
-Return JSON:
-{{
-    "defects": [
-        {{
-            "description": "defect description",
-            "severity": "critical|high|medium|low|minor",
-            "category": "syntax|logic|security|performance|quality",
-            "line_number": 10,
-            "suggestion": "how to fix"
-        }}
-    ]
-}}"""
 
-        response = invoke_with_rate_limit(verification_agent, [HumanMessage(content=verify_prompt)], log_file, estimated_tokens=1500)
+def _verify_endpoint_batch(batch: List[tuple], agent_id: int, log_file: str) -> List[Dict]:
+    """Verify a batch of (label, component, code, cache key) endpoints in one LLM call."""
+    labels = ", ".join(label for label, _, _, _ in batch)
+    defects = []
+    try:
+        blocks = []
+        first_index: Dict[str, int] = {}
+        for index, (label, _, code, _) in enumerate(batch, start=1):
+            if code in first_index:
+                blocks.append(f"=== ENDPOINT {index}: {label} ===\nCODE: same as ENDPOINT {first_index[code]}")
+            else:
+                first_index[code] = index
+                blocks.append(f"=== ENDPOINT {index}: {label} ===\nCODE: {code}")
+        endpoint_blocks = "\n\n".join(blocks)
+        
+        verification_agent = get_agent(
+            temperature=0.2,
+            max_tokens=VERIFY_MAX_TOKENS + VERIFY_TOKENS_PER_EXTRA_ENDPOINT * (len(batch) - 1),
+            timeout=VERIFY_TIMEOUT,
+            json_mode=True
+        )
+        
+        response = invoke_with_rate_limit(verification_agent, [SystemMessage(content=VERIFY_SYSTEM), HumanMessage(content=endpoint_blocks)], log_file, cache_if=_has_json_object)
         if not response:
             return defects
-        content = response.content.strip()
+        tokens_each = (_response_tokens(response) or VERIFY_DEFAULT_TOKENS * len(batch)) // len(batch)
+        for _, component, _, _ in batch:
+            _metrics.tokens_per_component[component] = tokens_each
+        result = _extract_first_json(response.content.strip())
+        if result is None:
+            log_and_print(f"    [Warning] Failed to parse verification of {labels}: no JSON object found", log_file)
+            log_and_print(f"    Response content: {response.content[:300]}", log_file)
+            return defects
         
-        try:
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            if json_start >= 0:
-                result = json.loads(content[json_start:json_end])
-                found_defects = result.get('defects', [])
-                
-                for defect in found_defects:
-                    severity_map = {
-                        'critical': DefectSeverity.CRITICAL,
-                        'high': DefectSeverity.HIGH,
-                        'medium': DefectSeverity.MEDIUM,
-                        'low': DefectSeverity.LOW,
-                        'minor': DefectSeverity.MINOR
-                    }
-                    severity = severity_map.get(defect.get('severity', 'medium'), DefectSeverity.MEDIUM)
-                    
-                    if _defect_ledger:
-                        defect_id = _defect_ledger.add_defect(
-                            defect['description'],
-                            f"backend/{path}",
-                            severity,
-                            f"Verification Agent {agent_id}",
-                            defect.get('category', 'general'),
-                            {'line_number': defect.get('line_number'), 'suggestion': defect.get('suggestion')}
-                        )
-                        defects.append({"id": defect_id, "severity": defect.get('severity')})
-        except:
-            pass
+        results = result.get('results', [])
+        for item in results if isinstance(results, list) else []:
+            index = item.get('endpoint_index') if isinstance(item, dict) else None
+            if not isinstance(index, int) or not 1 <= index <= len(batch):
+                continue
+            found_defects = item.get('defects', [])
+            if not isinstance(found_defects, list):
+                found_defects = []
+            _, component, _, cache_key = batch[index - 1]
+            _verification_cache.put(cache_key, found_defects)
+            defects.extend(_record_verification_defects(found_defects, component, agent_id))
     
     except Exception as e:
-        log_and_print(f"    ⚠ Error verifying {method} {path}: {e}", log_file)
+        log_and_print(f"    ⚠ Error verifying {labels}: {e}", log_file)
     
     return defects
 
@@ -3519,15 +4581,12 @@ Respond with JSON:
 }}"""
 
     try:
-        response = invoke_with_rate_limit(agent, [HumanMessage(content=db_analysis_prompt)], log_file)
+        response = invoke_with_rate_limit(agent, [HumanMessage(content=db_analysis_prompt)], log_file, cache_if=_has_json_object)
         content = response.content.strip()
         
         # Extract JSON
-        json_start = content.find("{")
-        json_end = content.rfind("}") + 1
-        if json_start >= 0 and json_end > json_start:
-            json_str = content[json_start:json_end]
-            result = json.loads(json_str)
+        result = _extract_first_json(content)
+        if result is not None:
             needs_db = result.get("needs_database", False)
             reasoning = result.get("reasoning", "No reasoning provided")
             
@@ -4179,14 +5238,12 @@ Return ONLY the Python function code, starting with the docstring and function d
         
         try:
             agent = get_agent(temperature=0.2, max_tokens=1500)
-            response = invoke_with_rate_limit(agent, [HumanMessage(content=seed_data_prompt)], log_file if log_file else None, estimated_tokens=1500)
+            response = invoke_with_rate_limit(agent, [HumanMessage(content=seed_data_prompt)], log_file if log_file else None, estimated_tokens=1500,
+                                              cache_if=lambda content: "def seed_database" in content)
             seed_function_code = response.content.strip()
             
             # Extract function code if wrapped in code blocks
-            if "```python" in seed_function_code:
-                seed_function_code = seed_function_code.split("```python")[1].split("```")[0]
-            elif "```" in seed_function_code:
-                seed_function_code = seed_function_code.split("```")[1].split("```")[0]
+            seed_function_code = _strip_code_fence(seed_function_code)
             
             # Ensure it has the proper structure
             if "def seed_database" not in seed_function_code:
@@ -4201,13 +5258,11 @@ DATA MODELS:
 Return ONLY the complete Python function starting with 'def seed_database(db):' and including all necessary code to seed the database with realistic sample data for these models."""
                 
                 try:
-                    retry_response = invoke_with_rate_limit(agent, [HumanMessage(content=retry_prompt)], log_file if log_file else None, estimated_tokens=2000)
+                    retry_response = invoke_with_rate_limit(agent, [HumanMessage(content=retry_prompt)], log_file if log_file else None, estimated_tokens=2000,
+                                                            cache_if=lambda content: "def seed_database" in content)
                     if retry_response:
                         seed_function_code = retry_response.content.strip()
-                        if "```python" in seed_function_code:
-                            seed_function_code = seed_function_code.split("```python")[1].split("```")[0]
-                        elif "```" in seed_function_code:
-                            seed_function_code = seed_function_code.split("```")[1].split("```")[0]
+                        seed_function_code = _strip_code_fence(seed_function_code)
                 except Exception as retry_e:
                     if log_file:
                         log_and_print(f"  Error: Retry also failed: {retry_e}", log_file)
@@ -4582,11 +5637,7 @@ Return ONLY the complete React component code (JSX) with Tailwind CSS classes, n
             component_code = response.content.strip()
             
             # Clean code blocks
-            if "```" in component_code:
-                component_code = component_code.split("```")[1]
-                if component_code.startswith("jsx") or component_code.startswith("javascript"):
-                    component_code = component_code.split('\n', 1)[1]
-                component_code = component_code.split("```")[0]
+            component_code = _strip_code_fence(component_code)
             
             # Add imports if missing
             if "import React" not in component_code:
@@ -4596,8 +5647,7 @@ Return ONLY the complete React component code (JSX) with Tailwind CSS classes, n
             component_code = fix_import_paths(component_code, component_file, react_path)
             
             # Save component file
-            with open(component_file, 'w', encoding='utf-8') as f:
-                f.write(component_code)
+            write_text_atomic(component_file, component_code)
             
             components_created += 1
             if log_file:
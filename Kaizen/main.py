@@ -101,7 +101,6 @@ from rate_limiter import RateLimiter
 
 def main():
     """Main orchestrator for Kaizen continuous improvement methodology."""
-    global _defect_ledger
     
     # Initialize logs directory
     logs_dir = "logs"
@@ -119,7 +118,7 @@ def main():
     print("="*70)
     
     # Initialize defect ledger
-    ledger_path = os.path.join(logs_dir, f"defect_ledger_{timestamp}.json")
+    ledger_path = os.path.join(logs_dir, f"defect_ledger_{timestamp}.jsonl")
     defect_ledger = DefectLedger(ledger_path)
     set_defect_ledger(defect_ledger)
     log_and_print(f"\n✓ Defect ledger initialized: {ledger_path}", main_log)
@@ -201,7 +200,8 @@ def main():
             flask_path,
             requirements["detailed_description"],
             cycle_num,
-            main_log
+            main_log,
+            prefetch_next=cycle_num < num_cycles
         )
         cycle_results.append(result)
         
@@ -256,6 +256,7 @@ def main():
     
     # Export defect report
     if defect_ledger:
+        defect_ledger.flush()
         report_path = os.path.join(logs_dir, f"defect_report_{timestamp}.txt")
         defect_ledger.export_report(report_path)
         log_and_print(f"✓ Defect report saved to: {report_path}", main_log)
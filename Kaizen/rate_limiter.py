@@ -3,12 +3,24 @@ Rate Limiter: Prevents API key limit exhaustion by managing request rates.
 Implements token bucket algorithm for rate limiting.
 """
 
+import math
 import time
+import threading
 from datetime import datetime, timedelta
+from functools import wraps
 from typing import Optional
 from collections import deque
 
 
+def _synchronized(method):
+    """Run a rate limiter or budget guard method while holding the instance lock."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class RateLimiter:
     """
     Token bucket rate limiter to prevent hitting API key limits.
@@ -45,10 +57,24 @@ class RateLimiter:
         self.daily_token_usage: deque = deque()  # (timestamp, tokens) for daily tracking
         self.total_tokens_used = 0
         
+        # Running totals of the two token windows, kept in step with the deques
+        # so checks never re-sum them while holding the lock
+        self._minute_tokens = 0
+        self._daily_tokens = 0
+        
+        # Per-minute capacity reserved *before* a request is sent, refilled
+        # continuously; the windows above only see requests once they finish
+        self._request_capacity = float(requests_per_minute)
+        self._token_capacity = float(tokens_per_minute)
+        self._capacity_updated = time.monotonic()
+        
         # Statistics
         self.total_requests = 0
         self.delayed_requests = 0
         self.rate_limit_errors = 0
+        
+        # Shared by agents running in worker threads
+        self._lock = threading.RLock()
     
     def _clean_old_requests(self):
         """Remove requests older than 1 hour and tokens older than 24 hours."""
@@ -67,12 +93,13 @@ class RateLimiter:
         
         # Clean token usage older than 1 minute
         while self.token_usage and self.token_usage[0][0] < one_minute_ago:
-            self.token_usage.popleft()
+            self._minute_tokens -= self.token_usage.popleft()[1]
         
         # Clean daily token usage older than 24 hours
         while self.daily_token_usage and self.daily_token_usage[0][0] < one_day_ago:
-            self.daily_token_usage.popleft()
+            self._daily_tokens -= self.daily_token_usage.popleft()[1]
     
+    @_synchronized
     def _calculate_wait_time(self) -> float:
         """
         Calculate how long to wait before next request.
@@ -96,7 +123,7 @@ class RateLimiter:
             wait_time = max(wait_time, 3600 - (now - oldest_in_hour) + 0.1)
         
         # Check daily token limit (most important for Groq)
-        current_daily_tokens = sum(tokens for _, tokens in self.daily_token_usage)
+        current_daily_tokens = self._daily_tokens
         if current_daily_tokens >= self.tokens_per_day * 0.95:  # Stop at 95% to be safe
             # Calculate wait until oldest daily token expires
             if self.daily_token_usage:
@@ -105,7 +132,7 @@ class RateLimiter:
                 wait_time = max(wait_time, wait_until_reset + 0.1)
         
         # Check per-minute token budget (secondary check)
-        current_minute_tokens = sum(tokens for _, tokens in self.token_usage)
+        current_minute_tokens = self._minute_tokens
         if current_minute_tokens >= self.tokens_per_minute:
             # Wait until oldest token usage expires
             if self.token_usage:
@@ -121,22 +148,71 @@ class RateLimiter:
         Returns:
             Actual wait time in seconds
         """
-        wait_time = self._calculate_wait_time()
+        with self._lock:
+            wait_time = self._calculate_wait_time()
+            if wait_time > 0:
+                self.delayed_requests += 1
         
+        # Sleep without the lock so other threads can still query the limiter
         if wait_time > 0:
-            self.delayed_requests += 1
             time.sleep(wait_time)
             return wait_time
         
         return 0.0
     
-    def record_request(self, tokens_used: int = 0):
+    def _refill_capacity(self):
+        now = time.monotonic()
+        elapsed = now - self._capacity_updated
+        self._capacity_updated = now
+        self._request_capacity = min(self.requests_per_minute, self._request_capacity + elapsed * self.requests_per_minute / 60)
+        self._token_capacity = min(self.tokens_per_minute, self._token_capacity + elapsed * self.tokens_per_minute / 60)
+    
+    def wait_for_capacity(self, estimated_tokens: int = 0) -> float:
+        """
+        Block until the per-minute request and token capacity can cover one
+        more request of estimated_tokens, then reserve it. Concurrent callers
+        are paced up front instead of all being sent and throttled with 429s.
+        
+        Args:
+            estimated_tokens: Tokens to reserve (settled against actual usage in record_request)
+        
+        Returns:
+            Time waited in seconds
+        """
+        # A request larger than a whole minute's budget would never fit
+        estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill_capacity()
+                if self._request_capacity >= 1 and self._token_capacity >= estimated_tokens:
+                    self._request_capacity -= 1
+                    self._token_capacity -= estimated_tokens
+                    if waited > 0:
+                        self.delayed_requests += 1
+                    return waited
+                sleep_time = max(
+                    (1 - self._request_capacity) * 60 / self.requests_per_minute,
+                    (estimated_tokens - self._token_capacity) * 60 / self.tokens_per_minute
+                )
+            # Sleep without the lock so other threads can still query the limiter
+            time.sleep(sleep_time)
+            waited += sleep_time
+    
+    @_synchronized
+    def record_request(self, tokens_used: int = 0, reserved_tokens: int = 0):
         """
         Record a completed request.
         
         Args:
             tokens_used: Number of tokens used in this request
+            reserved_tokens: Tokens reserved for it by wait_for_capacity; the
+                difference from tokens_used is returned to (or taken from) the capacity
         """
+        if reserved_tokens:
+            self._refill_capacity()
+            self._token_capacity = min(self.tokens_per_minute, self._token_capacity + reserved_tokens - tokens_used)
+        
         now = time.time()
         self.request_times.append(now)
         self.hourly_request_times.append(now)
@@ -145,8 +221,11 @@ class RateLimiter:
         if tokens_used > 0:
             self.token_usage.append((now, tokens_used))
             self.daily_token_usage.append((now, tokens_used))
+            self._minute_tokens += tokens_used
+            self._daily_tokens += tokens_used
             self.total_tokens_used += tokens_used
     
+    @_synchronized
     def can_make_request(self, estimated_tokens: int = 0) -> bool:
         """
         Check if a request can be made without waiting.
@@ -166,26 +245,32 @@ class RateLimiter:
             return False
         
         # Check daily token limit (most critical)
-        current_daily_tokens = sum(tokens for _, tokens in self.daily_token_usage)
+        current_daily_tokens = self._daily_tokens
         if current_daily_tokens + estimated_tokens >= self.tokens_per_day * 0.95:  # 95% safety margin
             return False
         
         # Check per-minute token budget
-        current_minute_tokens = sum(tokens for _, tokens in self.token_usage)
+        current_minute_tokens = self._minute_tokens
         if current_minute_tokens + estimated_tokens >= self.tokens_per_minute:
             return False
         
         return True
     
+    @_synchronized
     def get_daily_token_usage(self) -> int:
         """Get current daily token usage."""
         self._clean_old_requests()
-        return sum(tokens for _, tokens in self.daily_token_usage)
+        return self._daily_tokens
     
     def get_remaining_daily_tokens(self) -> int:
-        """Get remaining daily token budget."""
-        return max(0, self.tokens_per_day - self.get_daily_token_usage())
+        """
+        Get remaining daily token budget.
+        Lock-free read of the running total; entries that expired since the last
+        clean are still counted, so the value can only err on the low side.
+        """
+        return max(0, self.tokens_per_day - self._daily_tokens)
     
+    @_synchronized
     def get_statistics(self) -> dict:
         """
         Get rate limiter statistics.
@@ -195,8 +280,8 @@ class RateLimiter:
         """
         self._clean_old_requests()
         
-        daily_tokens = self.get_daily_token_usage()
-        remaining_daily = self.get_remaining_daily_tokens()
+        daily_tokens = self._daily_tokens
+        remaining_daily = max(0, self.tokens_per_day - daily_tokens)
         
         return {
             'total_requests': self.total_requests,
@@ -205,7 +290,7 @@ class RateLimiter:
             'requests_in_last_minute': len(self.request_times),
             'requests_in_last_hour': len(self.hourly_request_times),
             'total_tokens_used': self.total_tokens_used,
-            'tokens_in_last_minute': sum(tokens for _, tokens in self.token_usage),
+            'tokens_in_last_minute': self._minute_tokens,
             'tokens_per_day_limit': self.tokens_per_day,
             'daily_tokens_used': daily_tokens,
             'remaining_daily_tokens': remaining_daily,
@@ -213,18 +298,142 @@ class RateLimiter:
             'can_make_request': self.can_make_request()
         }
     
+    @_synchronized
     def record_rate_limit_error(self):
         """Record a rate limit error."""
         self.rate_limit_errors += 1
     
+    @_synchronized
     def reset(self):
         """Reset all counters (use with caution)."""
         self.request_times.clear()
         self.hourly_request_times.clear()
         self.token_usage.clear()
         self.daily_token_usage.clear()
+        self._minute_tokens = 0
+        self._daily_tokens = 0
+        self._request_capacity = float(self.requests_per_minute)
+        self._token_capacity = float(self.tokens_per_minute)
+        self._capacity_updated = time.monotonic()
         self.total_requests = 0
         self.delayed_requests = 0
         self.rate_limit_errors = 0
         self.total_tokens_used = 0
 
+
+
+class AdaptiveBudgetGuard:
+    """
+    Budget checks driven by the token usage actually observed per call.
+    
+    Keeps an exponential moving average and variance of tokens per call, so
+    "can we afford N more calls" is answered with mean + 2 sigma instead of a
+    fixed guess. Also tracks an AIMD concurrency limit: halved on every 429,
+    raised by one on every successful call.
+    """
+    
+    def __init__(
+        self,
+        rate_limiter: RateLimiter,
+        initial_tokens_per_call: int = 3000,
+        smoothing: float = 0.2,
+        min_concurrency: int = 1,
+        max_concurrency: int = 8
+    ):
+        """
+        Initialize the budget guard.
+        
+        Args:
+            rate_limiter: Rate limiter whose remaining daily budget is checked
+            initial_tokens_per_call: Assumed mean cost until calls are observed
+            smoothing: Weight of each new observation in the moving averages
+            min_concurrency: Lower bound of the AIMD concurrency limit
+            max_concurrency: Upper bound of the AIMD concurrency limit
+        """
+        self.rate_limiter = rate_limiter
+        self.smoothing = smoothing
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        
+        self.ema_tokens_per_call = float(initial_tokens_per_call)
+        self.ema_variance = (initial_tokens_per_call / 3) ** 2  # Start with a sigma of a third of the guess
+        self.concurrency = max_concurrency
+        
+        self._lock = threading.Lock()
+    
+    @_synchronized
+    def record_call(self, tokens_used: int):
+        """Fold one successful call's token usage into the averages (additive increase)."""
+        delta = tokens_used - self.ema_tokens_per_call
+        increment = self.smoothing * delta
+        self.ema_tokens_per_call += increment
+        self.ema_variance = (1 - self.smoothing) * (self.ema_variance + delta * increment)
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+    
+    @_synchronized
+    def record_rate_limit(self):
+        """Halve the concurrency limit after a 429 (multiplicative decrease)."""
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+    
+    def tokens_per_call(self) -> int:
+        """Pessimistic per-call cost: mean plus two standard deviations."""
+        return int(self.ema_tokens_per_call + 2 * math.sqrt(self.ema_variance))
+    
+    def can_afford(self, n_calls: int = 1) -> bool:
+        """Whether the remaining daily budget covers n_calls more calls."""
+        return n_calls * self.tokens_per_call() < self.rate_limiter.get_remaining_daily_tokens()
+    
+    def affordable_calls(self) -> int:
+        """Number of calls the remaining daily budget covers."""
+        return self.rate_limiter.get_remaining_daily_tokens() // max(1, self.tokens_per_call())
+
+
+class TokenBucket:
+    """
+    Token bucket for optional LLM work: the level refills continuously at
+    refill_per_sec up to capacity, and a call goes ahead only if it can take
+    its estimated tokens out. Bursts are bounded by capacity instead of a
+    fixed "remaining > N" cliff.
+    """
+    
+    def __init__(self, capacity: int, refill_per_sec: float, initial_burst: Optional[int] = None):
+        """
+        Initialize the bucket.
+        
+        Args:
+            capacity: Maximum level (largest burst)
+            refill_per_sec: Tokens added back per second
+            initial_burst: Starting level (defaults to capacity)
+        """
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.initial_burst = capacity if initial_burst is None else initial_burst
+        self.level = float(self.initial_burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._last_refill) * self.refill_per_sec)
+        self._last_refill = now
+    
+    @_synchronized
+    def try_acquire(self, tokens: int) -> bool:
+        """Take tokens from the bucket if it holds enough; never blocks."""
+        self._refill()
+        if self.level < tokens:
+            return False
+        self.level -= tokens
+        return True
+    
+    @_synchronized
+    def drain(self):
+        """Empty the bucket after a 429 so optional work backs off until it refills."""
+        self._refill()
+        self.level = 0.0
+    
+    @_synchronized
+    def reset(self):
+        """Restore the initial burst, e.g. at the start of a cycle."""
+        self.level = float(self.initial_burst)
+        self._last_refill = time.monotonic()